@@ -0,0 +1,93 @@
+"""Tick loop cost of streaming robot state to many control API subscribers.
+
+Subscribers connect from a separate process and only count what they receive.
+Reports ticks/second, the time the API observer adds to each tick, and how many
+state messages each subscriber got (fewer than ticks means updates coalesced).
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_api.py [--robots N] [--ticks N] [--subscribers 0,1,100,500]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.control_api import ControlClient, ControlServer
+from src.models.nav_graph import NavGraph
+from src.models.profiler import profiler
+from src.models.simulator import FleetSimulator
+
+def subscribe(address, count, ready, done, results):
+    """Subscriber process: open ``count`` streaming connections and read until told to stop"""
+    async def main():
+        clients = [await ControlClient.connect(address) for _ in range(count)]
+        await asyncio.gather(*(client.subscribe() for client in clients))
+        ready.set()
+        while not done.is_set():
+            await asyncio.sleep(0.05)
+        results.put([client.messages for client in clients])
+        for client in clients:
+            await client.close()
+    asyncio.run(main())
+
+def run(graph, robot_count, ticks, subscribers, address, seed=0):
+    rng = random.Random(seed)
+    graph.route_cache.clear()
+    simulator = FleetSimulator(graph, robot_speed=2.0)
+    vertex_count = len(graph.vertices)
+    for _ in range(robot_count):
+        simulator.spawn_robot_at_vertex(rng.randrange(vertex_count))
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+
+    simulator.add_observer(retask)
+    server = ControlServer(simulator, address).start()
+    process = None
+    messages = [0]
+    if subscribers:
+        ready, done = multiprocessing.Event(), multiprocessing.Event()
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(target=subscribe, args=(address, subscribers, ready, done, results))
+        process.start()
+        ready.wait()
+        simulator.tick()  # First tick publishes the full state
+    profiler.reset()
+    profiler.enable()
+    elapsed = simulator.run(ticks=ticks)
+    profiler.disable()
+    api = profiler.phases['api']
+    if process is not None:
+        done.set()
+        messages = results.get()
+        process.join()
+    server.stop()
+    return ticks / elapsed, api.total / api.count * 1000, api.percentile(99) * 1000, messages
+
+def main():
+    parser = argparse.ArgumentParser(description='Control API streaming benchmark')
+    parser.add_argument('--robots', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--subscribers', default='0,1,100,500')
+    parser.add_argument('--grid', type=int, default=50, help='Grid side length')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graph = NavGraph(write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid))
+        address = os.path.join(tmp, "bench.sock")
+        print(f"{args.robots} robots, {args.ticks} ticks as fast as possible")
+        print(f"{'subscribers':>12}{'ticks/s':>10}{'api ms/tick':>13}{'p99 ms':>9}{'msgs/subscriber':>17}")
+        for count in (int(n) for n in args.subscribers.split(',')):
+            rate, mean_ms, p99_ms, messages = run(graph, args.robots, args.ticks, count, address)
+            print(f"{count:>12}{rate:>10.1f}{mean_ms:>13.3f}{p99_ms:>9.3f}"
+                  f"{f'{min(messages)}-{max(messages)}' if count else '-':>17}")
+
+if __name__ == "__main__":
+    main()
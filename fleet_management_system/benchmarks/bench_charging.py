@@ -0,0 +1,67 @@
+"""Tick cost of the battery model and charging scheduler, and the robot time it costs.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_charging.py [--robots 100,1000,5000] [--ticks N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.charging import ChargingScheduler
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+
+def run(graph, robot_count, ticks, charging, drain, seed=0):
+    """Ticks per second, and the scheduler report (None without charging)"""
+    rng = random.Random(seed)
+    graph.route_cache.clear()
+    simulator = FleetSimulator(graph, robot_speed=2.0)
+    scheduler = ChargingScheduler(simulator, drain_per_unit=drain) if charging else None
+    vertex_count = len(graph.vertices)
+    for _ in range(robot_count):
+        robot = simulator.spawn_robot_at_vertex(rng.randrange(vertex_count))
+        # Start part-way through a shift so some robots need charging within the run
+        robot.battery = rng.uniform(0.3, 1.0)
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+
+    simulator.add_observer(retask)
+    elapsed = simulator.run(ticks=ticks)
+    return ticks / elapsed, scheduler.report() if scheduler else None
+
+def main():
+    parser = argparse.ArgumentParser(description='Charging scheduler benchmark')
+    parser.add_argument('--robots', default='100,1000,5000')
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--grid', type=int, default=100, help='Grid side length')
+    parser.add_argument('--charger-every', type=int, default=2, help='Charger spacing along the first row')
+    parser.add_argument('--drain', type=float, default=0.002, help='Battery fraction used per world unit')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid,
+                                charger_every=args.charger_every)
+        graph = NavGraph(path)
+    start = time.perf_counter()
+    graph.multi_source_distances(graph.chargers, reverse=True)
+    print(f"{len(graph.chargers)} chargers, {len(graph.vertices)} vertices: "
+          f"charger distances in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"{'robots':>8}{'ticks/s off':>13}{'ticks/s on':>12}{'overhead':>10}"
+          f"{'charging s':>12}{'queued s':>10}{'util lost':>11}")
+    for robot_count in (int(n) for n in args.robots.split(',')):
+        off, _ = run(graph, robot_count, args.ticks, False, args.drain)
+        on, report = run(graph, robot_count, args.ticks, True, args.drain)
+        print(f"{robot_count:>8}{off:>13.1f}{on:>12.1f}{(off / on - 1) * 100:>9.1f}%"
+              f"{report['charging_s']:>12.0f}{report['queued_s']:>10.0f}{report['utilization_lost']:>11.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Assignment latency and deadhead distance of the batch dispatcher vs greedy nearest-task.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_dispatcher.py [--grid N] [--cases 100x1000,500x5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import numpy as np
+
+from synthetic import write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+from src.models.dispatcher import TaskDispatcher
+
+def greedy_distance(cost):
+    """Each robot in turn claims its closest unclaimed task"""
+    free = np.ones(cost.shape[1], dtype=bool)
+    total = 0.0
+    for row in range(min(cost.shape)):
+        col = int(np.argmin(np.where(free, cost[row], np.inf)))
+        free[col] = False
+        total += cost[row, col]
+    return total
+
+def bench_case(graph, robots, tasks, seed=0):
+    rng = random.Random(seed)
+    vertex_count = len(graph.vertices)
+    simulator = FleetSimulator(graph)
+    for _ in range(robots):
+        simulator.spawn_robot_at_vertex(rng.randrange(vertex_count))
+    dispatcher = TaskDispatcher(simulator, window=tasks)
+    queued = dispatcher.submit_many([(rng.randrange(vertex_count), rng.randrange(vertex_count))
+                                     for _ in range(tasks)])
+
+    origins = [simulator.nearest_vertex(r.x, r.y) for r in simulator.robots]
+    baseline = greedy_distance(graph.distance_matrix(origins, [t.pickup for t in queued]))
+
+    start = time.perf_counter()
+    assigned = dispatcher.dispatch(simulator.idle_robots())
+    latency_ms = (time.perf_counter() - start) * 1000
+    return assigned, latency_ms, dispatcher.total_assigned_distance, baseline
+
+def main():
+    parser = argparse.ArgumentParser(description='Task dispatcher benchmark')
+    parser.add_argument('--grid', type=int, default=40, help='Grid side length')
+    parser.add_argument('--cases', default='50x50,200x200,100x1000,500x5000',
+                        help='Comma-separated ROBOTSxTASKS pairs')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid)
+        graph = NavGraph(path, precompute=True)
+
+    print(f"{'robots':>8}{'tasks':>8}{'assigned':>10}{'latency ms':>12}"
+          f"{'optimal dist':>14}{'greedy dist':>13}{'saved':>8}")
+    for case in args.cases.split(','):
+        robots, tasks = (int(part) for part in case.split('x'))
+        assigned, latency_ms, optimal, greedy = bench_case(graph, robots, tasks)
+        saved = 1 - optimal / greedy if greedy > 0 else 0.0
+        print(f"{robots:>8}{tasks:>8}{assigned:>10}{latency_ms:>12.1f}"
+              f"{optimal:>14.1f}{greedy:>13.1f}{saved:>7.0%}")
+
+if __name__ == "__main__":
+    main()
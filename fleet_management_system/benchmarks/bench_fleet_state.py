@@ -0,0 +1,58 @@
+"""Per-tick cost of the per-object Robot.update() loop vs the vectorized FleetState.step().
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_fleet_state.py [--ticks N] [--fleets 1000,10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import synthetic  # noqa: F401  (puts the project root on sys.path)
+from src.models.robot import Robot
+from src.models.fleet_state import FleetState
+
+def random_path(rng, length):
+    return [(rng.uniform(0, 1000), rng.uniform(0, 1000)) for _ in range(length)]
+
+def build_fleets(count, seed=0):
+    rng = random.Random(seed)
+    objects = []
+    fleet = FleetState()
+    for _ in range(count):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        path = random_path(rng, 50)
+        robot = Robot(x, y)
+        robot.assign_task(0, path)
+        objects.append(robot)
+        fleet.add_robot(x, y, robot.speed).assign_task(0, path)
+    return objects, fleet
+
+def main():
+    parser = argparse.ArgumentParser(description='Fleet update benchmark')
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--fleets', default='1000,10000')
+    args = parser.parse_args()
+
+    print(f"{'robots':>8}{'objects ms/tick':>18}{'arrays ms/tick':>18}{'speedup':>10}")
+    for count in (int(c) for c in args.fleets.split(',')):
+        objects, fleet = build_fleets(count)
+
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            for robot in objects:
+                robot.update()
+        object_ms = (time.perf_counter() - start) / args.ticks * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            fleet.step()
+        array_ms = (time.perf_counter() - start) / args.ticks * 1000
+
+        print(f"{count:>8}{object_ms:>18.3f}{array_ms:>18.3f}{object_ms / array_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Graph file load time: JSON parse vs building the binary cache vs loading from it.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_graph_loading.py [--grids 50,150,300]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.graph_file import GraphFile
+
+def timed_open(path, use_cache):
+    start = time.perf_counter()
+    graph_file = GraphFile.open(path, use_cache=use_cache)
+    graph_file.level()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph loading benchmark')
+    parser.add_argument('--grids', default='50,150,300', help='Comma-separated grid side lengths')
+    args = parser.parse_args()
+
+    print(f"{'vertices':>10}{'lanes':>10}{'MB':>8}{'json ms':>10}{'cold ms':>10}{'cached ms':>11}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in (int(s) for s in args.grids.split(',')):
+            path = write_grid_graph(os.path.join(tmp, f"grid_{side}.json"), side, side)
+            json_ms = timed_open(path, use_cache=False)
+            cold_ms = timed_open(path, use_cache=True)  # Parses and writes the cache
+            cached_ms = timed_open(path, use_cache=True)
+            level = GraphFile.open(path).level()
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"{len(level):>10}{len(level.lanes):>10}{size_mb:>8.1f}{json_ms:>10.1f}"
+                  f"{cold_ms:>10.1f}{cached_ms:>11.1f}{json_ms / cached_ms:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Memory and neighbour-iteration cost of the CSR adjacency vs the original dict of lists.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_graph_memory.py [--grids 100,300,500]
+
+A 500 x 500 grid has 250k vertices and ~1M lanes as listed in the file.
+"""
+import argparse
+import heapq
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.graph_file import GraphFile
+from src.models.nav_graph import NavGraph
+
+def legacy_structures(level):
+    """The original vertices/lanes/adjacency_list layout, duplicates included"""
+    names = level.vertex_attributes["name"].tolist()
+    vertices = [(x, y, name) for (x, y), name in zip(level.vertex_xy.tolist(), names)]
+    lanes = [(start, end) for start, end in level.lanes.tolist()]
+    adjacency = {i: [] for i in range(len(vertices))}
+    for start, end in lanes:
+        length = math.hypot(vertices[start][0] - vertices[end][0], vertices[start][1] - vertices[end][1])
+        adjacency[start].append((end, length))
+        adjacency[end].append((start, length))
+    return vertices, lanes, adjacency
+
+def legacy_dijkstra(adjacency, root):
+    dist = [math.inf] * len(adjacency)
+    dist[root] = 0.0
+    heap = [(0.0, root)]
+    while heap:
+        d, current = heapq.heappop(heap)
+        if d > dist[current]:
+            continue
+        for neighbor, length in adjacency[current]:
+            candidate = d + length
+            if candidate < dist[neighbor]:
+                dist[neighbor] = candidate
+                heapq.heappush(heap, (candidate, neighbor))
+    return dist
+
+def measure(build):
+    """(result, bytes allocated and still held by build())"""
+    tracemalloc.start()
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph memory benchmark')
+    parser.add_argument('--grids', default='100,300,500', help='Comma-separated grid side lengths')
+    args = parser.parse_args()
+
+    print(f"{'vertices':>10}{'lanes':>10}{'dict MB':>10}{'csr MB':>9}{'smaller':>9}"
+          f"{'dict dijkstra ms':>18}{'csr dijkstra ms':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in (int(s) for s in args.grids.split(',')):
+            path = write_grid_graph(os.path.join(tmp, f"grid_{side}.json"), side, side)
+            level = GraphFile.open(path, cache_dir=tmp).level()
+            (_, _, adjacency), legacy_bytes = measure(lambda: legacy_structures(level))
+            graph = NavGraph(path, use_cache=False)
+            csr_bytes = graph.memory_bytes()
+
+            root = len(level) // 2
+            start = time.perf_counter()
+            legacy_dijkstra(adjacency, root)
+            legacy_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            graph._dijkstra_tree(root)
+            csr_ms = (time.perf_counter() - start) * 1000
+            del adjacency
+
+            print(f"{len(level):>10}{len(level.lanes):>10}{legacy_bytes / 1e6:>10.1f}{csr_bytes / 1e6:>9.1f}"
+                  f"{legacy_bytes / csr_bytes:>8.1f}x{legacy_ms:>18.1f}{csr_ms:>17.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Multi-robot planning time against the number of agents.
+
+Each row plans one batch of random tasks with distinct starts and goals.
+"conflicts" counts the (lane or vertex, tick) clashes left when every task is
+routed on its own, as plain shortest-path routing does; planned routes have none.
+"cost" is the sum of arrival ticks, "fell back" whether CBS ran out of time.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_mapf.py [--agents 10,50,100,200] [--grids 20,50] [--budget SECONDS]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import bundled_graph_path, write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.planner import MultiRobotPlanner, find_conflicts
+
+def random_tasks(graph, count, rng):
+    vertices = rng.sample(range(len(graph.vertices)), 2 * count)
+    return list(zip(vertices[:count], vertices[count:]))
+
+def run(label, graph, count, args, rng):
+    tasks = random_tasks(graph, count, rng)
+    independent = MultiRobotPlanner(graph).plan_independent(tasks)
+    clashes = len(find_conflicts(independent.plans))
+    for method in ('prioritized', 'cbs'):
+        if method == 'cbs' and count > args.cbs_agents:
+            continue
+        planner = MultiRobotPlanner(graph, method=method, cbs_max_agents=args.cbs_agents, time_budget=args.budget)
+        result = planner.plan(tasks)
+        assert not find_conflicts(result.plans), "planned routes collide"
+        print(f"{label:<14}{count:>7} {method:<12}{result.elapsed * 1000:>10.1f}{result.expansions:>12}"
+              f"{len(result.failed):>8}{result.cost:>8}{independent.cost:>8}{clashes:>11}"
+              f"{'yes' if result.fell_back else '':>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-robot planner benchmark')
+    parser.add_argument('--agents', default='10,50,100,200', help='Agent counts for the synthetic grids')
+    parser.add_argument('--grids', default='20,50', help='Synthetic grid side lengths')
+    parser.add_argument('--cbs-agents', type=int, default=8, help='Largest group planned with CBS')
+    parser.add_argument('--budget', type=float, default=1.0, help='CBS time budget in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graphs = [(f"nav_graph_{number}", NavGraph(bundled_graph_path(number)), (2, 4, 6)) for number in (1, 2, 3)]
+        for side in (int(n) for n in args.grids.split(',')):
+            graph = NavGraph(write_grid_graph(os.path.join(tmp, f"grid_{side}.json"), side, side))
+            counts = sorted({4, 8, *(int(n) for n in args.agents.split(","))})
+            graphs.append((f"grid_{side}x{side}", graph, counts))
+
+    print(f"{'graph':<14}{'agents':>7} {'method':<12}{'plan ms':>10}{'expansions':>12}"
+          f"{'failed':>8}{'cost':>8}{'alone':>8}{'conflicts':>11}{'fell back':>11}")
+    for label, graph, counts in graphs:
+        for count in counts:
+            if 2 * count <= len(graph.vertices):
+                run(label, graph, count, args, rng)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cost of the built-in profiler instrumentation, disabled and enabled.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_profiler.py [--robots N] [--ticks N] [--repeats N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.profiler import Profiler, profiler
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+
+def phase_call_ns(instance, calls=200000):
+    """Nanoseconds per ``with instance.phase(...)`` around an empty block"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        with instance.phase('empty'):
+            pass
+    return (time.perf_counter() - start) / calls * 1e9
+
+def run_ticks(graph, robot_count, ticks, seed=0):
+    rng = random.Random(seed)
+    graph.route_cache.clear()
+    simulator = FleetSimulator(graph, robot_speed=2.0, traffic_manager=TrafficManager())
+    vertex_count = len(graph.vertices)
+    for vertex in rng.sample(range(vertex_count), robot_count):
+        simulator.spawn_robot_at_vertex(vertex)
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+
+    simulator.add_observer(retask)
+    return ticks / simulator.run(ticks=ticks)
+
+def main():
+    parser = argparse.ArgumentParser(description='Profiler overhead benchmark')
+    parser.add_argument('--robots', type=int, default=200)
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--grid', type=int, default=30, help='Grid side length')
+    args = parser.parse_args()
+
+    disabled, enabled = Profiler(), Profiler()
+    enabled.enable()
+    print(f"phase() around an empty block: {phase_call_ns(disabled):.0f} ns disabled, "
+          f"{phase_call_ns(enabled):.0f} ns enabled")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid)
+        graph = NavGraph(path)
+
+    # Interleave the runs so drift on the machine hits both equally
+    rates = {False: [], True: []}
+    for _ in range(args.repeats):
+        for on in (False, True):
+            profiler.reset()
+            profiler.enabled = on
+            rates[on].append(run_ticks(graph, args.robots, args.ticks))
+    profiler.disable()
+
+    off, on = max(rates[False]), max(rates[True])
+    print(f"{args.robots} robots with traffic, best of {args.repeats}:")
+    print(f"{'profiler':>10}{'ticks/s':>12}")
+    print(f"{'off':>10}{off:>12.1f}")
+    print(f"{'on':>10}{on:>12.1f}   ({(off / on - 1) * 100:.1f}% slower)")
+
+if __name__ == "__main__":
+    main()
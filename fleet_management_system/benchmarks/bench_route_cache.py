@@ -0,0 +1,56 @@
+"""Route cache hit rate and find_path latency for a range of cache sizes.
+
+Queries mimic dispatch traffic: robots shuttle between a few dozen stations
+and hot pickup/dropoff vertices. A lane is closed and reopened every
+--churn queries to show the cost of invalidation.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_route_cache.py [--grid N] [--queries N] [--sizes 0,256,4096]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.nav_graph import NavGraph
+
+def run_queries(graph, queries, churn, seed=0):
+    rng = random.Random(seed)
+    vertex_count = len(graph.vertices)
+    hot = [rng.randrange(vertex_count) for _ in range(20)]
+    origins = [rng.randrange(vertex_count) for _ in range(50)]
+    start = time.perf_counter()
+    for i in range(queries):
+        if churn and i % churn == 0:
+            a = rng.randrange(vertex_count)
+            b = int(graph.neighbors(a)[0][0])
+            graph.block_lane(a, b)
+            graph.unblock_lane(a, b)
+        graph.find_path(rng.choice(origins), rng.choice(hot))
+    return (time.perf_counter() - start) / queries * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Route cache benchmark')
+    parser.add_argument('--grid', type=int, default=40, help='Grid side length')
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--churn', type=int, default=500, help='Queries between lane closures (0 disables)')
+    parser.add_argument('--sizes', default='0,100,400,1000,4096')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid)
+        print(f"{'capacity':>10}{'us/query':>10}{'hit rate':>10}{'evictions':>11}{'invalidated':>13}")
+        for size in (int(s) for s in args.sizes.split(',')):
+            graph = NavGraph(path, route_cache_size=size)
+            micros = run_queries(graph, args.queries, args.churn)
+            stats = graph.route_cache.stats()
+            print(f"{size:>10}{micros:>10.1f}{stats['hit_rate']:>9.0%}{stats['evictions']:>11}"
+                  f"{stats['invalidations']:>13}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Per-query routing latency: legacy BFS vs A* vs precomputed all-pairs lookup.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_routing.py [--queries N] [--skip-large]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import bundled_graph_path, write_grid_graph
+from src.models.nav_graph import NavGraph
+
+def legacy_bfs(graph, start_vertex, end_vertex):
+    """The original hop-count BFS that copied the path on every enqueue"""
+    queue = deque([(start_vertex, [start_vertex])])
+    visited = {start_vertex}
+    while queue:
+        current, path = queue.popleft()
+        if current == end_vertex:
+            return path
+        for neighbor, _ in graph.adjacency_list[current]:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                queue.append((neighbor, path + [neighbor]))
+    return None
+
+def time_queries(func, pairs):
+    """Mean microseconds per query"""
+    start = time.perf_counter()
+    for a, b in pairs:
+        func(a, b)
+    return (time.perf_counter() - start) / len(pairs) * 1e6
+
+def bench_graph(label, path, queries, rng):
+    load_start = time.perf_counter()
+    graph = NavGraph(path)
+    load_ms = (time.perf_counter() - load_start) * 1000
+    count = len(graph.vertices)
+    pairs = [(rng.randrange(count), rng.randrange(count)) for _ in range(queries)]
+
+    row = {
+        "graph": label,
+        "vertices": count,
+        "load_ms": load_ms,
+        "bfs_us": time_queries(lambda a, b: legacy_bfs(graph, a, b), pairs),
+        "astar_us": time_queries(graph.astar, pairs),
+        "precompute_ms": None,
+        "lookup_us": None,
+    }
+
+    pre_start = time.perf_counter()
+    if graph.precompute_all_pairs():
+        row["precompute_ms"] = (time.perf_counter() - pre_start) * 1000
+        row["lookup_us"] = time_queries(graph.lookup_path, pairs)
+    return row
+
+def format_value(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def main():
+    parser = argparse.ArgumentParser(description='Routing benchmark')
+    parser.add_argument('--queries', type=int, default=200, help='Random queries per graph')
+    parser.add_argument('--skip-large', action='store_true', help='Skip the 100k vertex grid')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = []
+    for number in (1, 2, 3):
+        rows.append(bench_graph(f"nav_graph_{number}", bundled_graph_path(number), args.queries, rng))
+
+    grids = [(20, 20), (50, 50), (100, 100), (200, 250)]
+    if not args.skip_large:
+        grids.append((316, 317))
+    with tempfile.TemporaryDirectory() as tmp:
+        for r, c in grids:
+            path = write_grid_graph(os.path.join(tmp, f"grid_{r}x{c}.json"), r, c)
+            rows.append(bench_graph(f"grid_{r}x{c}", path, args.queries, rng))
+
+    print(f"{'graph':<16}{'vertices':>10}{'load ms':>10}{'bfs us':>12}{'a* us':>12}{'table ms':>12}{'lookup us':>12}")
+    for row in rows:
+        print(f"{row['graph']:<16}{row['vertices']:>10}{row['load_ms']:>10.1f}"
+              f"{row['bfs_us']:>12.1f}{row['astar_us']:>12.1f}"
+              f"{format_value(row['precompute_ms'], '.1f'):>12}{format_value(row['lookup_us'], '.1f'):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Wall time of a scenario sweep with one worker vs a full process pool.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_scenarios.py [--runs N] [--jobs N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import bundled_graph_path
+from src.models.scenarios import DEFAULT_SCENARIO, run_sweep
+
+def main():
+    parser = argparse.ArgumentParser(description='Scenario runner scaling benchmark')
+    parser.add_argument('--runs', type=int, default=16, help='Runs in the sweep')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--duration', type=float, default=120.0, help='Simulated seconds per run')
+    args = parser.parse_args()
+
+    scenario = dict(DEFAULT_SCENARIO, robots=6, duration=args.duration)
+    graph_path = bundled_graph_path(1)
+
+    print(f"{'jobs':>6}{'runs':>6}{'wall s':>10}{'runs/s':>10}{'speedup':>10}")
+    baseline = None
+    for jobs in sorted({1, args.jobs}):
+        start = time.perf_counter()
+        rows = run_sweep(graph_path, scenario, repeats=args.runs, jobs=jobs)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{jobs:>6}{len(rows):>6}{elapsed:>10.2f}{len(rows) / elapsed:>10.2f}{baseline / elapsed:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Headless simulator throughput in ticks/second for growing fleets.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_simulator.py [--ticks N] [--fleets 100,1000,5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+
+def bench_fleet(graph, robot_count, ticks, seed=0):
+    rng = random.Random(seed)
+    simulator = FleetSimulator(graph, robot_speed=2.0)
+    vertex_count = len(graph.vertices)
+    for _ in range(robot_count):
+        simulator.spawn_robot_at_vertex(rng.randrange(vertex_count))
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+
+    retask(simulator)
+    elapsed = simulator.run(ticks=ticks)
+    return ticks / elapsed if elapsed > 0 else float('inf')
+
+def check_unroutable(path):
+    """A robot that cannot be routed stays idle and is never counted as a finished task"""
+    graph = NavGraph(path)
+    for neighbor in graph.neighbors(0)[0].tolist():
+        graph.block_lane(0, neighbor)
+    simulator = FleetSimulator(graph)
+    robot = simulator.spawn_robot_at_vertex(0)
+    assert not simulator.assign_task(robot, len(graph.vertices) - 1)
+    simulator.run(ticks=100)
+    assert simulator.completed_tasks == 0 and simulator.throughput() == 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulator throughput benchmark')
+    parser.add_argument('--ticks', type=int, default=100)
+    parser.add_argument('--fleets', default='100,1000,5000')
+    parser.add_argument('--grid', type=int, default=40, help='Grid side length')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid)
+        graph = NavGraph(path)
+        check_unroutable(path)
+
+    print(f"{'robots':>8}{'ticks/s':>12}{'robot-ticks/s':>16}")
+    for count in (int(c) for c in args.fleets.split(',')):
+        rate = bench_fleet(graph, count, args.ticks)
+        print(f"{count:>8}{rate:>12.1f}{rate * count:>16.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Snapshot cost and resume time for growing fleets.
+
+Each fleet drives short random trips on a grid under traffic control, with a
+backlog of queued dispatcher tasks, until the traffic tables have filled up.
+"tick ms" is the mean tick during that warm-up.
+"capture" is what the tick loop waits for when a SnapshotWriter takes a
+snapshot; "encode" and "write" happen on its background thread. "load" is
+load_snapshot() on a graph that is already loaded, as --resume does after
+reading the graph.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_snapshot.py [--fleets 1000,10000] [--grid 200] [--warmup 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.dispatcher import TaskDispatcher
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+from src.models.snapshot import capture, encode, load_snapshot, write_snapshot
+from src.models.traffic import TrafficManager
+
+def build_fleet(graph, side, robot_count, warmup, rng):
+    simulator = FleetSimulator(graph, robot_speed=2.0, traffic_manager=TrafficManager())
+    vertex_count = len(graph.vertices)
+    for vertex in rng.sample(range(vertex_count), robot_count):
+        simulator.spawn_robot_at_vertex(vertex)
+
+    def retask(sim):
+        # Trips of a few rows and columns keep routing out of the measurement
+        for robot in sim.idle_robots():
+            vertex = sim.nearest_vertex(robot.x, robot.y)
+            row = min(max(vertex // side + rng.randint(-8, 8), 0), side - 1)
+            col = min(max(vertex % side + rng.randint(-8, 8), 0), side - 1)
+            sim.assign_task(robot, row * side + col)
+
+    simulator.add_observer(retask)
+    # Robots are re-tasked before the dispatcher sees them, so these stay queued
+    dispatcher = TaskDispatcher(simulator)
+    dispatcher.submit_many([(rng.randrange(vertex_count), rng.randrange(vertex_count))
+                            for _ in range(3 * robot_count)])
+    elapsed = simulator.run(ticks=warmup)
+    return simulator, elapsed / warmup
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot and resume benchmark')
+    parser.add_argument('--fleets', default='1000,10000')
+    parser.add_argument('--grid', type=int, default=200, help='Grid side length')
+    parser.add_argument('--warmup', type=int, default=20, help='Ticks to run before snapshotting')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graph = NavGraph(write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid))
+        print(f"{'robots':>8}{'reservations':>14}{'tasks':>8}{'tick ms':>9}{'capture ms':>12}{'encode ms':>11}"
+              f"{'write ms':>10}{'size MB':>9}{'load ms':>9}")
+        for count in (int(c) for c in args.fleets.split(',')):
+            simulator, tick_seconds = build_fleet(graph, args.grid, count, args.warmup, rng)
+            path = os.path.join(tmp, f"fleet_{count}.npz")
+            start = time.perf_counter()
+            captured = capture(simulator)
+            captured_at = time.perf_counter()
+            arrays = encode(captured)
+            encoded_at = time.perf_counter()
+            write_snapshot(arrays, path)
+            written_at = time.perf_counter()
+            restored = load_snapshot(path, graph)
+            loaded_at = time.perf_counter()
+            assert len(restored.robots) == count
+            print(f"{count:>8}{len(simulator.traffic.reservations):>14}{simulator.dispatcher.pending():>8}"
+                  f"{tick_seconds * 1000:>9.1f}"
+                  f"{(captured_at - start) * 1000:>12.1f}{(encoded_at - captured_at) * 1000:>11.1f}"
+                  f"{(written_at - encoded_at) * 1000:>10.1f}{os.path.getsize(path) / 1e6:>9.2f}"
+                  f"{(loaded_at - written_at) * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
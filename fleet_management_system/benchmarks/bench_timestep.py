@@ -0,0 +1,75 @@
+"""Arrival times and cost per simulated second for different tick lengths.
+
+Every robot drives the same routes at every tick_interval; with motion in units
+per second, arrival times should match the route length / speed whatever the
+tick length, to within one tick.
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_timestep.py [--robots N] [--intervals 0.5,0.1,0.02]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+
+SPEED = 1.0
+
+def run_interval(graph, routes, tick_interval):
+    """Simulated arrival second of each robot, and wall seconds per simulated second"""
+    simulator = FleetSimulator(graph, tick_interval=tick_interval, robot_speed=SPEED)
+    robots = []
+    for start, goal in routes:
+        robot = simulator.spawn_robot_at_vertex(start)
+        simulator.assign_task(robot, goal)
+        robots.append(robot)
+
+    arrivals = np.full(len(robots), np.nan)
+
+    def record(sim):
+        for i, robot in enumerate(robots):
+            if np.isnan(arrivals[i]) and robot.status != robot.STATUS_MOVING:
+                arrivals[i] = sim.sim_time
+
+    simulator.add_observer(record)
+    elapsed = simulator.run(until=lambda sim: not np.isnan(arrivals).any())
+    return arrivals, elapsed / simulator.sim_time
+
+def main():
+    parser = argparse.ArgumentParser(description='Timestep independence benchmark')
+    parser.add_argument('--robots', type=int, default=200)
+    parser.add_argument('--intervals', default='0.5,0.1,0.02,0.005')
+    parser.add_argument('--grid', type=int, default=20, help='Grid side length')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid)
+        graph = NavGraph(path)
+
+    rng = random.Random(0)
+    vertex_count = len(graph.vertices)
+    routes = []
+    while len(routes) < args.robots:
+        start, goal = rng.randrange(vertex_count), rng.randrange(vertex_count)
+        if start != goal:
+            routes.append((start, goal))
+    # The robot finishes within the tick that covers the last of the route
+    expected = np.array([graph.path_length(graph.find_path(s, g)) / SPEED for s, g in routes])
+
+    print(f"{'tick s':>8}{'ticks/route':>13}{'max error s':>13}{'error/tick':>12}{'wall ms per sim s':>19}")
+    for interval in (float(i) for i in args.intervals.split(',')):
+        arrivals, cost = run_interval(graph, routes, interval)
+        error = np.abs(arrivals - expected).max()
+        print(f"{interval:>8.3f}{expected.mean() / interval:>13.0f}{error:>13.4f}"
+              f"{error / interval:>12.2f}{cost * 1000:>19.3f}")
+
+if __name__ == "__main__":
+    main()
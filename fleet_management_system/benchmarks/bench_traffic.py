@@ -0,0 +1,86 @@
+"""Compare traffic policies by throughput (tasks completed per simulated minute).
+
+Run from the fleet_management_system directory:
+    python benchmarks/bench_traffic.py [--robots N] [--minutes M] [--grid SIDE]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from synthetic import bundled_graph_path, write_grid_graph
+from src.models.nav_graph import NavGraph
+from src.models.fleet_state import MOVING
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+
+def shared_vertex_ticks(fleet):
+    """Number of driving robots on the exact same point as another one"""
+    n = fleet.size
+    active = fleet.status[:n] == MOVING
+    points = np.stack([fleet.x[:n][active], fleet.y[:n][active]], axis=1)
+    if len(points) < 2:
+        return 0
+    _, counts = np.unique(points, axis=0, return_counts=True)
+    return int((counts[counts > 1]).sum())
+
+def run_policy(graph, policy, robot_count, minutes, seed):
+    rng = random.Random(seed)
+    traffic = TrafficManager(policy=policy) if policy != 'none' else None
+    simulator = FleetSimulator(graph, robot_speed=5.0, traffic_manager=traffic)
+    vertex_count = len(graph.vertices)
+    for vertex in rng.sample(range(vertex_count), min(robot_count, vertex_count)):
+        simulator.spawn_robot_at_vertex(vertex)
+
+    overlaps = [0]
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+        overlaps[0] += shared_vertex_ticks(sim.fleet)
+
+    simulator.add_observer(retask)
+    retask(simulator)
+    elapsed = simulator.run(duration=minutes * 60)
+    return {
+        "policy": policy,
+        "throughput": simulator.throughput(),
+        "ms_per_tick": elapsed / simulator.tick_count * 1000,
+        "wait_ticks": traffic.wait_ticks if traffic else 0,
+        "reroutes": traffic.reroutes if traffic else 0,
+        "deadlocks": traffic.deadlocks if traffic else 0,
+        "swaps": traffic.task_swaps if traffic else 0,
+        "overlaps": overlaps[0],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Traffic policy benchmark')
+    parser.add_argument('--robots', type=int, default=200)
+    parser.add_argument('--minutes', type=float, default=2.0, help='Simulated minutes per run')
+    parser.add_argument('--grid', type=int, default=30, help='Grid side length')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        graphs = [
+            ("nav_graph_1", NavGraph(bundled_graph_path(1), precompute=True), 6),
+            (f"grid_{args.grid}x{args.grid}",
+             NavGraph(write_grid_graph(os.path.join(tmp, "grid.json"), args.grid, args.grid), precompute=True),
+             args.robots),
+        ]
+
+    print(f"{'graph':<14}{'policy':<10}{'robots':>7}{'tasks/min':>11}{'ms/tick':>9}"
+          f"{'waits':>9}{'reroutes':>10}{'deadlocks':>10}{'swaps':>7}{'overlaps':>10}")
+    for label, graph, robots in graphs:
+        for policy in ('none', 'wait', 'reroute'):
+            row = run_policy(graph, policy, robots, args.minutes, args.seed)
+            print(f"{label:<14}{policy:<10}{robots:>7}{row['throughput']:>11.1f}{row['ms_per_tick']:>9.3f}"
+                  f"{row['wait_ticks']:>9}{row['reroutes']:>10}{row['deadlocks']:>10}{row['swaps']:>7}{row['overlaps']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data"))
+
+def bundled_graph_path(number):
+    """Path of one of the bundled nav_graph_N.json files"""
+    return os.path.join(DATA_DIR, f"nav_graph_{number}.json")
+
+def write_grid_graph(path, rows, cols, spacing=1.0, charger_every=None):
+    """Write a rows x cols warehouse-style grid in the nav graph JSON format.
+
+    Vertex (0, 0) is a charger; with charger_every, so is every that-many-th
+    vertex along the first row.
+    """
+    vertices = []
+    for r in range(rows):
+        for c in range(cols):
+            attrs = {"name": f"v{r}_{c}"}
+            if r == 0 and (c == 0 or (charger_every and c % charger_every == 0)):
+                attrs["is_charger"] = True
+            vertices.append([c * spacing, r * spacing, attrs])
+
+    lanes = []
+    for r in range(rows):
+        for c in range(cols):
+            v = r * cols + c
+            if c + 1 < cols:
+                lanes.append([v, v + 1, {"speed_limit": 0}])
+                lanes.append([v + 1, v, {"speed_limit": 0}])
+            if r + 1 < rows:
+                lanes.append([v, v + cols, {"speed_limit": 0}])
+                lanes.append([v + cols, v, {"speed_limit": 0}])
+
+    with open(path, 'w') as file:
+        json.dump({"building_name": f"grid_{rows}x{cols}",
+                   "levels": {"l0": {"lanes": lanes, "vertices": vertices}}}, file)
+    return path
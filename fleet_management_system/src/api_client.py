@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+import asyncio
+import random
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.models.control_api import ControlClient
+
+async def run(args):
+    """Stand in for a warehouse management system: spawn robots, feed tasks, watch the fleet"""
+    rng = random.Random(args.seed)
+    client = await ControlClient.connect(args.address)
+    stats = await client.request("stats")
+    print(f"Connected to {args.address} at tick {stats['tick']}, {stats['robots']} robots already running")
+    vertex_count = (await client.request("graph"))["vertices"]
+
+    start = time.perf_counter()
+    spawned = await client.request("spawn", vertices=[rng.randrange(vertex_count) for _ in range(args.robots)])
+    print(f"Spawned {len(spawned['robots'])} robots in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    watchers = [client] + [await ControlClient.connect(args.address) for _ in range(args.subscribers - 1)]
+    await asyncio.gather(*(watcher.subscribe() for watcher in watchers))
+
+    submitted = 0
+    started = time.perf_counter()
+    deadline = started + args.duration
+    while time.perf_counter() < deadline:
+        if submitted < args.tasks:
+            count = min(args.batch, args.tasks - submitted)
+            tasks = [[rng.randrange(vertex_count), rng.randrange(vertex_count)] for _ in range(count)]
+            await client.request("submit", tasks=tasks)
+            submitted += count
+        await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - started
+
+    # Every subscriber's mirror should hold exactly the fleet the server reports
+    state = await client.request("state")
+    live = {row[0] for row in state["robots"]}
+    stats = await client.request("stats")
+    await asyncio.sleep(0.5)
+    messages = [watcher.messages for watcher in watchers]
+    received = sum(watcher.bytes_received for watcher in watchers)
+    in_sync = sum(set(watcher.robots) == live for watcher in watchers)
+    print(f"Submitted {submitted} tasks in batches of {args.batch}; "
+          f"{stats.get('dispatcher', {}).get('completed', 0)} completed after {elapsed:.1f}s")
+    print(f"{len(watchers)} subscribers: {min(messages)}-{max(messages)} state messages each "
+          f"({sum(messages) / len(watchers) / elapsed:.1f}/s), {received / len(watchers) / elapsed / 1024:.1f} KiB/s each, "
+          f"{in_sync}/{len(watchers)} mirrors match the {len(live)} live robots")
+    for watcher in watchers:
+        await watcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Local test client for the fleet control API')
+    parser.add_argument('--address', default='fleet.sock',
+                      help='Unix socket path or [host:]port the simulator was started with (--api)')
+    parser.add_argument('--robots', type=int, default=20,
+                      help='Robots to spawn at random vertices')
+    parser.add_argument('--tasks', type=int, default=200,
+                      help='Random pickup/dropoff tasks to submit')
+    parser.add_argument('--batch', type=int, default=50,
+                      help='Tasks per submit request')
+    parser.add_argument('--interval', type=float, default=1.0,
+                      help='Seconds between submit requests')
+    parser.add_argument('--subscribers', type=int, default=1,
+                      help='Connections streaming robot state at once')
+    parser.add_argument('--duration', type=float, default=10.0,
+                      help='Seconds to keep submitting and streaming')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,46 @@ import tkinter as tk
 from tkinter import Canvas, Frame, Label, Button, Listbox
 from src.models.nav_graph import NavGraph
 from src.models.robot import Robot
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+from src.models.fleet_state import STATUS_FREE, STATUS_NAMES
+from src.models.profiler import profiler
+import math
 import random
+import time
+
+import numpy as np
 
 class FleetGUI:
-    def __init__(self, root, graph):
+    STATUS_COLORS = {
+        Robot.STATUS_IDLE: 'green',
+        Robot.STATUS_MOVING: 'blue',
+        Robot.STATUS_WAITING: 'orange',
+        Robot.STATUS_CHARGING: 'purple',
+        Robot.STATUS_COMPLETE: 'gray'
+    }
+
+    REPLAY_SEEK_SECONDS = 10  # Simulated seconds skipped by the arrow keys in replay mode
+    PROFILE_PHASES = ('tick', 'tick.fleet_step', 'tick.traffic_before', 'tick.traffic_after',
+                      'route.find_path', 'route.nearest_vertex', 'render.update_robots',
+                      'render.frame', 'render.view', 'render.panel')
+
+    # Zoom and level of detail. Spacings are the median lane length on screen, in pixels
+    ZOOM_STEP = 1.25  # Scale change per mouse wheel notch or +/- key
+    MIN_ZOOM, MAX_ZOOM = 0.5, 100.0  # Relative to the zoom that fits the whole graph
+    LABEL_MIN_SPACING = 40  # Vertex names and robot status labels are hidden below this
+    VERTEX_MIN_SPACING = 12  # Vertex circles are hidden below this, leaving only the lanes
+    VIEW_MARGIN = 20  # Pixels beyond the canvas edges still drawn, so nothing pops in at the border
+    CLUSTER_CELL = 32  # Screen cell size in pixels for merging crowded robots
+    CLUSTER_MIN = 5  # Robots sharing a cell before they are drawn as one glyph with their count
+
+    def __init__(self, root, graph, panel_interval_ms=250, frame_interval_ms=33, replay=None,
+                 replay_speed=1.0, profile_overlay=False, simulator=None):
         self.root = root
         self.graph = graph
+        self.replay = replay  # Replay driving the simulator instead of live input
+        self.replay_speed = replay_speed
+        self.paused = False
         
         # Create main container
         self.main_container = Frame(root)
@@ -24,6 +58,19 @@ class FleetGUI:
         self.side_panel.pack(side=tk.RIGHT, fill=tk.Y)
         self.side_panel.pack_propagate(False)
         
+        if replay is not None:
+            self.replay_label = Label(self.side_panel, text="", font=("Arial", 10, "bold"), bg='lightgray')
+            self.replay_label.pack(fill=tk.X, padx=10, pady=5)
+            Label(self.side_panel, text="Space: pause   Left/Right: seek", font=("Arial", 9),
+                  bg='lightgray').pack(fill=tk.X, padx=10)
+
+        # Profiler overlay: phase percentiles and counters, refreshed with the panel
+        self.profile_label = None
+        if profile_overlay:
+            self.profile_label = Label(self.side_panel, text="", font=("Courier", 8), bg='lightgray',
+                                       justify=tk.LEFT, anchor='w')
+            self.profile_label.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+
         # Robot Info Section
         self.info_section = Frame(self.side_panel, bg='lightgray')
         self.info_section.pack(fill=tk.X, padx=10, pady=5)
@@ -35,6 +82,7 @@ class FleetGUI:
         
         # Initialize robot info labels
         self.info_labels = {}
+        self.info_values = {}  # Last options applied to each info label
         self.create_info_labels()
         
         # Robot List Section
@@ -52,19 +100,103 @@ class FleetGUI:
         self.delete_button.pack(pady=5)
         
         # Rest of the initialization
-        self.robots = []
-        self.vertex_map = {}
         self.margin = 50 
         self.scale_factor, self.offset_x, self.offset_y = self.calculate_scaling()
+        self.fit_scale = self.scale_factor
         self.selected_robot = None
         self.robot_colors = {}
+
+        # Only what is inside the view has canvas items; see draw_graph and layout_robots
+        self.lane_ends = self.undirected_lanes()
+        ends = self.graph.coords[self.lane_ends]
+        lengths = np.hypot(*(ends[:, 0] - ends[:, 1]).T)
+        self.lane_spacing = float(np.median(lengths)) if len(lengths) else 1.0
+        self.lane_items = {}  # lane index -> line item
+        self.vertex_items = {}  # vertex -> [circle, name text, name background]
+        self.vertex_label_boxes = {}  # vertex -> name background offsets, measured once
+        self.graph_detail = None  # (circles, labels) shown by the current vertex items
+        self.robot_sprites = {}  # robot id -> persistent canvas items, see create_robot_sprite
+        self.robot_labels = self.show_labels()  # Whether robot sprites carry status labels
+        self.drawn_slots = np.zeros(0, dtype=bool)  # Fleet slots that have their own sprite
+        self.cluster_items = []  # Reused (circle, count text, last options) glyphs
+        self.clusters_shown = 0
+        self.redraw_pending = False
+        self.pan_anchor = None
         self.draw_graph()
+
+        # Frames are drawn faster than ticks, interpolating robots between tick positions
+        self.frame_interval_ms = frame_interval_ms
+        self.frame_slots = None  # Fleet slots moving during the current tick, None once drawn at rest
+        self.last_tick_time = time.perf_counter()
+
+        # The side panel refreshes on its own, slower clock
+        self.panel_interval_ms = panel_interval_ms
+        self.panel_row_ids = []  # Robot id shown on each listbox row
+        self.panel_row_texts = {}  # robot id -> text currently shown for it
+
+        # The simulator owns the robots and the tick loop and works in world
+        # coordinates; the GUI observes it and maps positions to the screen
+        self.simulator = None
+        if replay is not None:
+            self.set_simulator(replay.simulator)
+            self.root.bind("<space>", self.toggle_pause)
+            self.root.bind("<Left>", lambda event: self.seek_replay(-self.REPLAY_SEEK_SECONDS))
+            self.root.bind("<Right>", lambda event: self.seek_replay(self.REPLAY_SEEK_SECONDS))
+        elif simulator is not None:
+            self.set_simulator(simulator)  # e.g. resumed from a snapshot
+        else:
+            self.set_simulator(FleetSimulator(graph, tick_interval=0.1, traffic_manager=TrafficManager()))
+        self.tick_wall_interval = self.simulator.tick_interval  # Wall seconds between tick callbacks
+
         self.canvas.bind("<Button-1>", self.handle_click)
-        self.update_robots()
+        # Wheel zooms around the pointer (Button-4/5 on X11), right or middle drag pans
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom(
+            self.ZOOM_STEP if event.delta > 0 else 1 / self.ZOOM_STEP, event.x, event.y))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom(self.ZOOM_STEP, event.x, event.y))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom(1 / self.ZOOM_STEP, event.x, event.y))
+        for button in (2, 3):
+            self.canvas.bind(f"<ButtonPress-{button}>", self.start_pan)
+            self.canvas.bind(f"<B{button}-Motion>", self.drag_pan)
+        self.root.bind("<plus>", lambda event: self.zoom(self.ZOOM_STEP))
+        self.root.bind("<equal>", lambda event: self.zoom(self.ZOOM_STEP))
+        self.root.bind("<minus>", lambda event: self.zoom(1 / self.ZOOM_STEP))
+        self.root.bind("<Key-0>", lambda event: self.reset_view())
+        self.canvas.bind("<Configure>", self.on_resize)
+        # The first tick runs from the event loop, after the caller has attached its observers
+        self.root.after(max(1, int(self.tick_wall_interval * 1000)), self.step_simulation)
+        self.animate()
+        self.refresh_panel()
+
+    @property
+    def robots(self):
+        return self.simulator.robots
+
+    def set_simulator(self, simulator):
+        """Observe a different simulator (e.g. after a replay seek), rebuilding every robot sprite"""
+        if self.simulator is not None:
+            self.simulator.remove_observer(self.on_simulation_tick)
+        for robot_id in list(self.robot_sprites):
+            self.delete_robot_sprite(robot_id)
+        self.robot_listbox.delete(0, tk.END)
+        self.panel_row_ids = []
+        self.panel_row_texts = {}
+        self.selected_robot = None
+        self.frame_slots = None
+        self.drawn_slots = np.zeros(0, dtype=bool)
+
+        self.simulator = simulator
+        simulator.add_observer(self.on_simulation_tick)
+        self.render_tracker = simulator.track_changes()
+        self.panel_tracker = simulator.track_changes()
+        for robot in simulator.robots:
+            self.add_robot_sprite(robot)
+        self.layout_robots()
+        self.update_robot_info()
+        self.update_robot_list()
 
     def create_info_labels(self):
         """Create labels for robot information display"""
-        fields = ['ID', 'Status', 'Current Location', 'Destination', 'Path Length']
+        fields = ['ID', 'Status', 'Current Location', 'Destination', 'Path Length', 'Battery']
         for field in fields:
             frame = Frame(self.robot_info_frame, bg='lightgray')
             frame.pack(fill=tk.X, pady=2)
@@ -73,6 +205,15 @@ class FleetGUI:
             label = Label(frame, text="--", font=("Arial", 10), bg='lightgray')
             label.pack(side=tk.LEFT, padx=5)
             self.info_labels[field] = label
+            self.info_values[field] = {'text': "--"}
+
+    def set_info_label(self, field, **options):
+        """Configure an info label only if one of its options actually changed"""
+        current = self.info_values[field]
+        changed = {key: value for key, value in options.items() if current.get(key) != value}
+        if changed:
+            self.info_labels[field].config(**changed)
+            current.update(changed)
 
     def update_robot_info(self):
         """Update the side panel with robot information"""
@@ -84,24 +225,16 @@ class FleetGUI:
             dest_vertex = robot.destination_vertex
             dest_name = self.graph.vertices[dest_vertex][2] if dest_vertex is not None else "None"
             
-            self.info_labels['ID'].config(text=robot.id)
-            self.info_labels['Status'].config(text=robot.status)
-            self.info_labels['Current Location'].config(text=current_name)
-            self.info_labels['Destination'].config(text=dest_name)
-            self.info_labels['Path Length'].config(text=str(robot.get_path_length()))
-            
+            self.set_info_label('ID', text=robot.id)
             # Update colors based on status
-            status_color = {
-                Robot.STATUS_IDLE: 'green',
-                Robot.STATUS_MOVING: 'blue',
-                Robot.STATUS_WAITING: 'orange',
-                Robot.STATUS_CHARGING: 'purple',
-                Robot.STATUS_COMPLETE: 'gray'
-            }
-            self.info_labels['Status'].config(fg=status_color.get(robot.status, 'black'))
+            self.set_info_label('Status', text=robot.status, fg=self.STATUS_COLORS.get(robot.status, 'black'))
+            self.set_info_label('Current Location', text=current_name)
+            self.set_info_label('Destination', text=dest_name)
+            self.set_info_label('Path Length', text=str(robot.get_path_length()))
+            self.set_info_label('Battery', text=f"{robot.battery:.0%}")
         else:
-            for label in self.info_labels.values():
-                label.config(text="--")
+            for field in self.info_labels:
+                self.set_info_label(field, text="--")
 
     def calculate_scaling(self):
         """ Calculate scaling factors to fit the graph within the canvas """
@@ -128,34 +261,175 @@ class FleetGUI:
         screen_y = y * self.scale_factor + self.offset_y
         return screen_x, screen_y
 
+    def screen_to_world(self, screen_x, screen_y):
+        """ Inverse of transform_coordinates """
+        return ((screen_x - self.offset_x) / self.scale_factor,
+                (screen_y - self.offset_y) / self.scale_factor)
+
+    def undirected_lanes(self):
+        """(start, end) vertex pairs with the two directions of a lane drawn once"""
+        pairs = np.sort(np.asarray(self.graph.lane_pairs, dtype=np.int64).reshape(-1, 2), axis=1)
+        return np.unique(pairs, axis=0)
+
+    def view_rect(self):
+        """World (x0, y0, x1, y1) covered by the canvas plus VIEW_MARGIN"""
+        x0, y0 = self.screen_to_world(-self.VIEW_MARGIN, -self.VIEW_MARGIN)
+        x1, y1 = self.screen_to_world(self.canvas_width + self.VIEW_MARGIN, self.canvas_height + self.VIEW_MARGIN)
+        return x0, y0, x1, y1
+
+    def show_labels(self):
+        return self.lane_spacing * self.scale_factor >= self.LABEL_MIN_SPACING
+
     def draw_graph(self):
-        # First create all vertex mappings
-        for i, (x, y, name) in enumerate(self.graph.vertices):
-            screen_x, screen_y = self.transform_coordinates(x, y)
-            self.vertex_map[i] = (screen_x, screen_y)
-
-        # Draw lanes first
-        for start, end in self.graph.lanes:
-            x1, y1 = self.vertex_map[start]
-            x2, y2 = self.vertex_map[end]
-            self.canvas.create_line(x1, y1, x2, y2, fill='gray', width=2)
-
-        # Draw vertices with better visibility
-        for i, (x, y, name) in enumerate(self.graph.vertices):
-            screen_x, screen_y = self.vertex_map[i]
-            
-            # Draw vertex circle
-            self.canvas.create_oval(screen_x - 8, screen_y - 8, screen_x + 8, screen_y + 8, 
-                                 fill='lightblue', outline='blue')
-            
-            # Draw vertex name with background
-            text = self.canvas.create_text(screen_x, screen_y - 15, text=name, 
-                                         font=("Arial", 10, "bold"))
-            bbox = self.canvas.bbox(text)
-            if bbox:
-                self.canvas.create_rectangle(bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2, 
-                                          fill='white', outline='')
-                self.canvas.tag_raise(text)
+        """Create, move or delete lane and vertex items so exactly those in view exist"""
+        canvas = self.canvas
+        x0, y0, x1, y1 = self.view_rect()
+        spacing = self.lane_spacing * self.scale_factor
+        detail = (spacing >= self.VERTEX_MIN_SPACING, spacing >= self.LABEL_MIN_SPACING)
+        if detail != self.graph_detail:
+            # Crossed a detail threshold: vertices get different items, start them over
+            for items in self.vertex_items.values():
+                canvas.delete(*items)
+            profiler.count('canvas_items_deleted', sum(len(items) for items in self.vertex_items.values()))
+            self.vertex_items = {}
+            self.graph_detail = detail
+        created = 0
+
+        # Lanes whose bounding box overlaps the view
+        ends = self.graph.coords[self.lane_ends]
+        low, high = ends.min(axis=1), ends.max(axis=1)
+        visible = np.flatnonzero((low[:, 0] <= x1) & (high[:, 0] >= x0) & (low[:, 1] <= y1) & (high[:, 1] >= y0))
+        screen = ends[visible] * self.scale_factor + (self.offset_x, self.offset_y)
+        kept = self.drop_items(self.lane_items, visible)
+        for lane, ((ax, ay), (bx, by)) in zip(visible.tolist(), screen.tolist()):
+            if lane in kept:
+                canvas.coords(self.lane_items[lane], ax, ay, bx, by)
+            else:
+                line = canvas.create_line(ax, ay, bx, by, fill='gray', width=2)
+                canvas.tag_lower(line)  # Lanes stay beneath everything else
+                self.lane_items[lane] = line
+                created += 1
+
+        # Vertices in view, as circles with their names when zoomed in far enough
+        circles, labels = detail
+        coords = self.graph.coords
+        visible = np.flatnonzero((coords[:, 0] >= x0) & (coords[:, 0] <= x1) & (coords[:, 1] >= y0) & (coords[:, 1] <= y1))
+        if not circles:
+            visible = visible[:0]
+        screen_x, screen_y = self.transform_coordinates(coords[visible, 0], coords[visible, 1])
+        kept = self.drop_items(self.vertex_items, visible)
+        names = self.graph.vertex_names
+        for vertex, x, y in zip(visible.tolist(), screen_x.tolist(), screen_y.tolist()):
+            if vertex in kept:
+                self.place_vertex(vertex, x, y)
+                continue
+            items = [canvas.create_oval(x - 8, y - 8, x + 8, y + 8, fill='lightblue', outline='blue')]
+            if labels:
+                # Vertex name with background
+                text = canvas.create_text(x, y - 15, text=names[vertex], font=("Arial", 10, "bold"))
+                box = self.vertex_label_boxes.get(vertex)
+                if box is None:
+                    bbox = canvas.bbox(text)
+                    box = (bbox[0] - 2 - x, bbox[1] - 2 - y, bbox[2] + 2 - x, bbox[3] + 2 - y) if bbox else None
+                    self.vertex_label_boxes[vertex] = box
+                if box is not None:
+                    items.append(canvas.create_rectangle(x + box[0], y + box[1], x + box[2], y + box[3],
+                                                         fill='white', outline=''))
+                    canvas.tag_raise(text)
+                items.insert(1, text)
+            self.vertex_items[vertex] = items
+            created += len(items)
+        if created:
+            profiler.count('canvas_items_created', created)
+            canvas.tag_raise('robots')  # New graph items went on top of the robots
+
+    def drop_items(self, items, visible):
+        """Delete the canvas items of keys in ``items`` that are not in ``visible``, returns the kept keys"""
+        visible = set(visible.tolist())
+        for key in [key for key in items if key not in visible]:
+            ids = items.pop(key)
+            if isinstance(ids, list):
+                self.canvas.delete(*ids)
+                profiler.count('canvas_items_deleted', len(ids))
+            else:
+                self.canvas.delete(ids)
+                profiler.count('canvas_items_deleted')
+        return items.keys() & visible
+
+    def place_vertex(self, vertex, x, y):
+        circle, *label = self.vertex_items[vertex]
+        self.canvas.coords(circle, x - 8, y - 8, x + 8, y + 8)
+        if label:
+            self.canvas.coords(label[0], x, y - 15)
+            if len(label) > 1:
+                x0, y0, x1, y1 = self.vertex_label_boxes[vertex]
+                self.canvas.coords(label[1], x + x0, y + y0, x + x1, y + y1)
+
+    def zoom(self, factor, x=None, y=None):
+        """Scale the view by factor keeping screen point (x, y) fixed, the canvas centre by default"""
+        if x is None:
+            x, y = self.canvas_width / 2, self.canvas_height / 2
+        scale = min(max(self.scale_factor * factor, self.fit_scale * self.MIN_ZOOM), self.fit_scale * self.MAX_ZOOM)
+        factor = scale / self.scale_factor
+        self.offset_x = x - (x - self.offset_x) * factor
+        self.offset_y = y - (y - self.offset_y) * factor
+        self.scale_factor = scale
+        self.schedule_redraw()
+
+    def pan(self, dx, dy):
+        """Move the view contents by (dx, dy) screen pixels"""
+        self.offset_x += dx
+        self.offset_y += dy
+        self.schedule_redraw()
+
+    def reset_view(self):
+        """Zoom back out to fit the whole graph"""
+        self.scale_factor, self.offset_x, self.offset_y = self.calculate_scaling()
+        self.schedule_redraw()
+
+    def start_pan(self, event):
+        self.pan_anchor = (event.x, event.y)
+
+    def drag_pan(self, event):
+        if self.pan_anchor is not None:
+            self.pan(event.x - self.pan_anchor[0], event.y - self.pan_anchor[1])
+        self.pan_anchor = (event.x, event.y)
+
+    def on_resize(self, event):
+        self.canvas_width, self.canvas_height = event.width, event.height
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Redraw the view once the pending events are handled, however many changed it"""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.root.after_idle(self.redraw_view)
+
+    def redraw_view(self):
+        """Bring the graph and robots in line with a new zoom, pan or canvas size"""
+        self.redraw_pending = False
+        with profiler.phase('render.view'):
+            self.draw_graph()
+            labels = self.show_labels()
+            if labels != self.robot_labels:
+                # Sprites gain or lose their status labels: recreate them
+                for robot_id in list(self.robot_sprites):
+                    self.delete_robot_sprite(robot_id)
+                self.drawn_slots[:] = False
+                self.robot_labels = labels
+            if self.simulator is None:
+                return
+            self.layout_robots()
+            # Drop cluster glyphs the new view no longer needs
+            for circle, text, _ in self.cluster_items[self.clusters_shown:]:
+                self.canvas.delete(circle, text)
+            profiler.count('canvas_items_deleted', 2 * (len(self.cluster_items) - self.clusters_shown))
+            del self.cluster_items[self.clusters_shown:]
+            if self.frame_slots is None:
+                alpha = 1.0
+            else:
+                alpha = (time.perf_counter() - self.last_tick_time) / self.tick_wall_interval
+            self.draw_frame(np.flatnonzero(self.drawn_slots), alpha)
 
     def get_random_color(self):
         """ Generate a random pastel color """
@@ -165,114 +439,293 @@ class FleetGUI:
         return f'#{r:02x}{g:02x}{b:02x}'
 
     def handle_click(self, event):
+        x, y = self.screen_to_world(event.x, event.y)
+        radius = 10 / self.scale_factor  # 10 pixels in world units
+
         # Check if clicked on a robot
-        for robot in self.robots:
-            if abs(event.x - robot.x) < 10 and abs(event.y - robot.y) < 10:
-                self.select_robot(robot)
-                return
+        robot = self.simulator.robot_at(x, y, radius)
+        if robot is not None:
+            self.select_robot(robot)
+            return
+        if self.replay is not None:
+            return  # A replay only takes its input from the log
 
         # Check if clicked on a vertex
-        for i, (screen_x, screen_y) in self.vertex_map.items():
-            if abs(event.x - screen_x) < 10 and abs(event.y - screen_y) < 10:
-                if self.selected_robot:
-                    self.assign_task(self.selected_robot, i)
-                else:
-                    self.spawn_robot(screen_x, screen_y)
-                break
+        vertex = self.simulator.vertex_at(x, y, radius)
+        if vertex is not None:
+            if self.selected_robot:
+                self.assign_task(self.selected_robot, vertex)
+            else:
+                self.spawn_robot(*self.simulator.vertex_positions[vertex])
 
     def spawn_robot(self, x, y):
-        robot = Robot(x, y)
-        self.robots.append(robot)
-        self.robot_colors[robot.id] = self.get_random_color()
-        
-        # Draw robot with unique color
-        self.canvas.create_oval(robot.x - 8, robot.y - 8, robot.x + 8, robot.y + 8, 
-                              fill=self.robot_colors[robot.id], outline='black')
-        
-        # Draw robot ID with background
-        text = self.canvas.create_text(robot.x, robot.y - 15, text=robot.id, 
-                                     font=("Arial", 8, "bold"))
-        bbox = self.canvas.bbox(text)
-        if bbox:
-            self.canvas.create_rectangle(bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2, 
-                                      fill='white', outline='')
-            self.canvas.tag_raise(text)
-        
-        # Set initial location
-        current_vertex = self.find_nearest_vertex(x, y)
-        if current_vertex is not None:
-            robot.set_initial_location(current_vertex)
+        """Spawn a robot at world coordinates (x, y)"""
+        robot = self.simulator.spawn_robot(x, y)
+        self.add_robot_sprite(robot)
         
         # Update robot list
         self.update_robot_list()
 
+    def add_robot_sprite(self, robot):
+        if robot.id not in self.robot_colors:
+            self.robot_colors[robot.id] = self.get_random_color()
+        x, y = self.transform_coordinates(robot.x, robot.y)
+        margin = self.VIEW_MARGIN
+        if -margin <= x <= self.canvas_width + margin and -margin <= y <= self.canvas_height + margin:
+            self.create_robot_sprite(robot)
+
+    def delete_robot_sprite(self, robot_id):
+        """Remove all visual elements of a robot"""
+        sprite = self.robot_sprites.pop(robot_id, None)
+        if sprite is None:
+            return  # Out of view or merged into a cluster, nothing drawn
+        # By item id: deleting by tag would search every item on the canvas
+        items = [sprite[key] for key in ('oval', 'text', 'background', 'highlight') if sprite[key] is not None]
+        self.canvas.delete(*items)
+        if sprite['slot'] < len(self.drawn_slots):
+            self.drawn_slots[sprite['slot']] = False
+        profiler.count('canvas_items_deleted', len(items))
+
+    def create_robot_sprite(self, robot):
+        """Create the canvas items a robot keeps while it is drawn on its own"""
+        rid = robot.id
+        x, y = self.transform_coordinates(robot.x, robot.y)
+        oval = self.canvas.create_oval(x - 8, y - 8, x + 8, y + 8,
+                                     fill=self.robot_colors[rid], outline='black',
+                                     tags=(f"robot_{rid}", "robots"))
+        background = text = None
+        if self.robot_labels:
+            background = self.canvas.create_rectangle(0, 0, 0, 0, fill='white', outline='',
+                                                    tags=(f"background_{rid}", f"status_{rid}", "robots"))
+            text = self.canvas.create_text(x, y - 15, text="",
+                                         font=("Arial", 8, "bold"), tags=(f"status_{rid}", "robots"))
+        highlight = self.canvas.create_oval(x - 10, y - 10, x + 10, y + 10,
+                                          outline='yellow', width=2,
+                                          state='normal' if robot is self.selected_robot else 'hidden',
+                                          tags=(f"highlight_{rid}", "robots"))
+        profiler.count('canvas_items_created', 4 if text is not None else 2)
+        self.robot_sprites[rid] = {
+            'oval': oval,
+            'background': background,
+            'text': text,
+            'highlight': highlight,
+            'label_box': (0, 0, 0, 0),  # Text background offsets relative to the robot
+            'position': (x, y),  # Screen position last drawn
+            'slot': robot.slot,
+        }
+        if robot.slot >= len(self.drawn_slots):
+            self.drawn_slots = np.concatenate([self.drawn_slots, np.zeros(robot.slot + 64, dtype=bool)])
+        self.drawn_slots[robot.slot] = True
+        self.render_tracker.reset(robot.slot)
+        self.draw_robot(robot, x, y, status_changed=True)
+
+    def layout_robots(self):
+        """Give robots in view their own sprite, or one glyph per crowded screen cell.
+
+        Robots outside the view have no canvas items at all. Where CLUSTER_MIN or
+        more share a CLUSTER_CELL they are drawn as a single circle showing their
+        count, coloured by their most common status; the selected robot is
+        always drawn on its own.
+        """
+        fleet = self.simulator.fleet
+        n = fleet.size
+        screen_x, screen_y = self.transform_coordinates(fleet.x[:n], fleet.y[:n])
+        margin = self.VIEW_MARGIN
+        status = fleet.status[:n]
+        inside = ((status != STATUS_FREE) & (screen_x >= -margin) & (screen_x <= self.canvas_width + margin)
+                  & (screen_y >= -margin) & (screen_y <= self.canvas_height + margin))
+        selected = self.selected_robot
+        if selected is not None and selected.slot < n and fleet.views[selected.slot] is selected:
+            selected_slot = selected.slot
+        else:
+            selected_slot = -1
+        candidates = np.flatnonzero(inside)
+        candidates = candidates[candidates != selected_slot]
+        if len(self.drawn_slots) < n:
+            self.drawn_slots = np.concatenate([self.drawn_slots, np.zeros(n - len(self.drawn_slots) + 64, dtype=bool)])
+
+        # Robots per screen cell
+        cell = self.CLUSTER_CELL
+        cell_x = np.floor_divide(screen_x[candidates] + margin, cell).astype(np.int64)
+        cell_y = np.floor_divide(screen_y[candidates] + margin, cell).astype(np.int64)
+        cells, group, counts = np.unique(cell_x * (1 << 20) + cell_y, return_inverse=True, return_counts=True)
+        crowded = counts[group] >= self.CLUSTER_MIN
+        own = candidates[~crowded]
+        if selected_slot >= 0 and inside[selected_slot]:
+            own = np.append(own, selected_slot)
+
+        # Sprites for exactly the robots drawn on their own
+        wanted = np.zeros(len(self.drawn_slots), dtype=bool)
+        wanted[own] = True
+        views = fleet.views
+        for robot_id, sprite in list(self.robot_sprites.items()):
+            slot = sprite['slot']
+            robot = views[slot] if slot < n else None
+            if not wanted[slot] or robot is None or robot.id != robot_id:
+                self.delete_robot_sprite(robot_id)
+        for slot in np.flatnonzero(wanted & ~self.drawn_slots).tolist():
+            robot = views[slot]
+            if robot.id not in self.robot_colors:
+                self.robot_colors[robot.id] = self.get_random_color()
+            self.create_robot_sprite(robot)
+
+        # One glyph per crowded cell, at its robots' mean position
+        big = np.flatnonzero(counts >= self.CLUSTER_MIN)
+        sizes = counts[big]
+        centre_x = np.bincount(group, weights=screen_x[candidates], minlength=len(cells))[big] / sizes
+        centre_y = np.bincount(group, weights=screen_y[candidates], minlength=len(cells))[big] / sizes
+        by_status = np.bincount(group * len(STATUS_NAMES) + status[candidates],
+                                minlength=len(cells) * len(STATUS_NAMES)).reshape(-1, len(STATUS_NAMES))
+        common = by_status[big].argmax(axis=1)
+        self.draw_clusters(centre_x.tolist(), centre_y.tolist(), sizes.tolist(), common.tolist())
+
+    def draw_clusters(self, xs, ys, sizes, statuses):
+        """Place cluster glyphs, reusing the canvas items of earlier ticks"""
+        canvas = self.canvas
+        for index, (x, y, size, status) in enumerate(zip(xs, ys, sizes, statuses)):
+            if index == len(self.cluster_items):
+                circle = canvas.create_oval(0, 0, 0, 0, outline='black', width=2, tags=("cluster", "robots"))
+                text = canvas.create_text(0, 0, font=("Arial", 8, "bold"), tags=("cluster", "robots"))
+                self.cluster_items.append((circle, text, {}))
+                profiler.count('canvas_items_created', 2)
+            circle, text, shown = self.cluster_items[index]
+            radius = min(self.CLUSTER_CELL / 2, 6 + 2 * math.sqrt(size))
+            canvas.coords(circle, x - radius, y - radius, x + radius, y + radius)
+            canvas.coords(text, x, y)
+            options = {'fill': self.STATUS_COLORS[STATUS_NAMES[status]], 'size': size,
+                       'state': 'normal'}
+            if options != shown:
+                canvas.itemconfig(circle, fill=options['fill'], state='normal')
+                canvas.itemconfig(text, text=str(size), fill='white', state='normal')
+                shown.clear()
+                shown.update(options)
+        for circle, text, shown in self.cluster_items[len(xs):self.clusters_shown]:
+            canvas.itemconfig(circle, state='hidden')
+            canvas.itemconfig(text, state='hidden')
+            shown.clear()
+        self.clusters_shown = len(xs)
+        profiler.count('clusters_drawn', len(xs))
+
+    def draw_robot(self, robot, x, y, status_changed):
+        """Move a robot's existing canvas items to screen (x, y); re-measure the label only if its text changed"""
+        sprite = self.robot_sprites[robot.id]
+        sprite['position'] = (x, y)
+        self.canvas.coords(sprite['oval'], x - 8, y - 8, x + 8, y + 8)
+        if sprite['text'] is not None:
+            self.canvas.coords(sprite['text'], x, y - 15)
+            if status_changed:
+                self.canvas.itemconfig(sprite['text'], text=f"{robot.id} - {robot.status}")
+                bbox = self.canvas.bbox(sprite['text'])
+                if bbox:
+                    sprite['label_box'] = (bbox[0] - 2 - x, bbox[1] - 2 - y, bbox[2] + 2 - x, bbox[3] + 2 - y)
+            x0, y0, x1, y1 = sprite['label_box']
+            self.canvas.coords(sprite['background'], x + x0, y + y0, x + x1, y + y1)
+        if robot is self.selected_robot:
+            self.canvas.coords(sprite['highlight'], x - 10, y - 10, x + 10, y + 10)
+
+    def set_highlight(self, robot, visible):
+        sprite = self.robot_sprites.get(robot.id)
+        if sprite is None:
+            return
+        if visible:
+            x, y = sprite['position']
+            self.canvas.coords(sprite['highlight'], x - 10, y - 10, x + 10, y + 10)
+        self.canvas.itemconfig(sprite['highlight'], state='normal' if visible else 'hidden')
+
     def select_robot(self, robot):
+        if self.selected_robot is not None and self.selected_robot is not robot:
+            self.set_highlight(self.selected_robot, False)
         self.selected_robot = robot
         # Highlight selected robot
-        self.canvas.create_oval(robot.x - 10, robot.y - 10, robot.x + 10, robot.y + 10, 
-                              outline='yellow', width=2)
+        self.set_highlight(robot, True)
+        if robot.id not in self.robot_sprites:
+            self.schedule_redraw()  # Take it out of its cluster glyph
         self.update_robot_info()
 
     def assign_task(self, robot, destination_vertex):
         """Assign a navigation task to the selected robot"""
-        if robot.status == Robot.STATUS_IDLE:
-            # Calculate path using navigation graph
-            start_vertex = self.find_nearest_vertex(robot.x, robot.y)
-            if start_vertex is not None and destination_vertex is not None:
-                path = self.graph.find_path(start_vertex, destination_vertex)
-                if path:
-                    # Convert path vertices to screen coordinates
-                    screen_path = [self.vertex_map[v] for v in path]
-                    # Assign task with path
-                    robot.assign_task(destination_vertex, screen_path)
-                else:
-                    robot.status = Robot.STATUS_WAITING
-                    robot.wait_time = 30  # Wait for 3 seconds
+        self.simulator.assign_task(robot, destination_vertex)
         
         self.selected_robot = None
         # Remove highlight
-        self.canvas.create_oval(robot.x - 10, robot.y - 10, robot.x + 10, robot.y + 10, 
-                              outline='black', width=1)
+        self.set_highlight(robot, False)
         self.update_robot_info()
 
     def find_nearest_vertex(self, x, y):
         """Find the nearest vertex to given coordinates"""
-        min_dist = float('inf')
-        nearest_vertex = None
-        for i, (vx, vy) in self.vertex_map.items():
-            dist = ((x - vx)**2 + (y - vy)**2)**0.5
-            if dist < min_dist:
-                min_dist = dist
-                nearest_vertex = i
-        return nearest_vertex
+        return self.simulator.nearest_vertex(x, y)
+
+    def robot_list_text(self, robot):
+        current_vertex = self.find_nearest_vertex(robot.x, robot.y)
+        location = self.graph.vertices[current_vertex][2] if current_vertex is not None else "Unknown"
+        return f"{robot.id} - {location} - {robot.status}"
 
     def update_robot_list(self):
-        """Update the robot list in the side panel"""
-        self.robot_listbox.delete(0, tk.END)
+        """Rewrite only the listbox rows whose robot changed, keeping selection and scroll"""
+        listbox = self.robot_listbox
+        selection = listbox.curselection()
+        selected_id = self.panel_row_ids[selection[0]] if selection and selection[0] < len(self.panel_row_ids) else None
+        scroll_top = listbox.yview()[0]
+        edited = False
+
+        # Drop rows of deleted robots
+        live_ids = {robot.id for robot in self.robots}
+        for index in range(len(self.panel_row_ids) - 1, -1, -1):
+            robot_id = self.panel_row_ids[index]
+            if robot_id not in live_ids:
+                listbox.delete(index)
+                del self.panel_row_ids[index]
+                del self.panel_row_texts[robot_id]
+                edited = True
+
+        # Append rows for new robots; removals reorder simulator.robots, so look them up by id
         for robot in self.robots:
-            current_vertex = self.find_nearest_vertex(robot.x, robot.y)
-            location = self.graph.vertices[current_vertex][2] if current_vertex is not None else "Unknown"
-            self.robot_listbox.insert(tk.END, f"{robot.id} - {location} - {robot.status}")
+            if robot.id in self.panel_row_texts:
+                continue
+            text = self.robot_list_text(robot)
+            listbox.insert(tk.END, text)
+            self.panel_row_ids.append(robot.id)
+            self.panel_row_texts[robot.id] = text
+            edited = True
+
+        # Rewrite rows whose location name or status changed
+        slots, _ = self.panel_tracker.poll()
+        if len(slots):
+            row_of = {robot_id: index for index, robot_id in enumerate(self.panel_row_ids)}
+            views = self.simulator.fleet.views
+            for slot in slots.tolist():
+                robot = views[slot]
+                index = row_of.get(robot.id)
+                if index is None:
+                    continue
+                text = self.robot_list_text(robot)
+                if text != self.panel_row_texts[robot.id]:
+                    listbox.delete(index)
+                    listbox.insert(index, text)
+                    self.panel_row_texts[robot.id] = text
+                    edited = True
+
+        if edited:
+            if selected_id in self.panel_row_texts:
+                listbox.selection_set(self.panel_row_ids.index(selected_id))
+            listbox.yview_moveto(scroll_top)
 
     def on_select_robot_from_list(self, event):
         """Handle robot selection from the list"""
         selection = self.robot_listbox.curselection()
-        if selection:
-            index = selection[0]
-            selected_robot = self.robots[index]
-            self.select_robot(selected_robot)
+        if selection and selection[0] < len(self.panel_row_ids):
+            robot_id = self.panel_row_ids[selection[0]]
+            selected_robot = next((robot for robot in self.robots if robot.id == robot_id), None)
+            if selected_robot is not None:
+                self.select_robot(selected_robot)
 
     def delete_selected_robot(self):
         """Delete the selected robot"""
-        if self.selected_robot:
-            # Remove all visual elements of the robot
-            self.canvas.delete(f"robot_{self.selected_robot.id}")
-            self.canvas.delete(f"status_{self.selected_robot.id}")
-            self.canvas.delete(f"highlight_{self.selected_robot.id}")  # Remove highlight if any
-            self.canvas.delete(f"background_{self.selected_robot.id}")  # Remove text background
+        if self.selected_robot and self.replay is None:
+            self.delete_robot_sprite(self.selected_robot.id)
             
             # Remove from lists and dictionaries
-            self.robots.remove(self.selected_robot)
+            self.simulator.remove_robot(self.selected_robot)
             del self.robot_colors[self.selected_robot.id]
             
             # Clear selection
@@ -280,46 +733,142 @@ class FleetGUI:
             self.update_robot_info()
             self.update_robot_list()
 
-    def update_robots(self):
-        """Update robot positions and statuses"""
+    def step_simulation(self):
+        """Drive the simulator at its fixed timestep from the Tk event loop"""
+        if self.replay is None:
+            self.simulator.tick()
+            self.tick_wall_interval = self.simulator.tick_interval
+        else:
+            self.step_replay()
+        self.root.after(max(1, int(self.tick_wall_interval * 1000)), self.step_simulation)
+
+    def step_replay(self):
+        """Advance the replay by replay_speed ticks per tick_interval of wall time"""
+        ticks = max(1, int(self.replay_speed))
+        self.tick_wall_interval = self.simulator.tick_interval * ticks / self.replay_speed
+        for _ in range(ticks):
+            if self.paused or self.replay.finished:
+                return
+            self.apply_replay_inputs(self.replay.step())
+
+    def apply_replay_inputs(self, events):
+        """Create and drop sprites for robots the replay spawned or removed"""
+        for event in events:
+            if event["e"] == "spawn":
+                self.add_robot_sprite(self.replay.robots[event["robot"]])
+            elif event["e"] == "remove" and event["robot"] in self.robot_sprites:
+                if self.selected_robot is not None and self.selected_robot.id == event["robot"]:
+                    self.selected_robot = None
+                self.delete_robot_sprite(event["robot"])
+
+    def toggle_pause(self, event=None):
+        self.paused = not self.paused
+
+    def seek_replay(self, seconds):
+        """Jump the replay by a number of simulated seconds, backwards if negative"""
+        simulator = self.simulator
+        target = simulator.tick_count + int(round(seconds / simulator.tick_interval))
+        if self.replay.seek(target):
+            self.set_simulator(self.replay.simulator)
+        else:
+            # Stepped forward in place: robots spawned or removed on the way need sprites synced
+            self.sync_robot_sprites()
+
+    def sync_robot_sprites(self):
+        """Add and drop sprites for robots spawned or removed behind the GUI's back"""
+        live = {robot.id for robot in self.robots}
+        for robot_id in [rid for rid in self.robot_sprites if rid not in live]:
+            self.delete_robot_sprite(robot_id)
+        if self.selected_robot is not None and self.selected_robot.id not in live:
+            self.selected_robot = None
         for robot in self.robots:
-            # Store previous position for movement detection
-            prev_x, prev_y = robot.x, robot.y
-            
-            # Update robot state
-            robot.update()
-            
-            # Check if robot has moved from spawn location
-            if (robot.x != prev_x or robot.y != prev_y) and not robot.has_moved_from_spawn:
-                # Clear any visual elements at spawn location
-                self.canvas.delete(f"robot_{robot.id}")
-                self.canvas.delete(f"status_{robot.id}")
-                self.canvas.delete(f"highlight_{robot.id}")
-                self.canvas.delete(f"background_{robot.id}")
-                robot.has_moved_from_spawn = True
-            
-            # Update robot visualization
-            self.canvas.delete(f"robot_{robot.id}")
-            self.canvas.create_oval(robot.x - 8, robot.y - 8, robot.x + 8, robot.y + 8, 
-                                  fill=self.robot_colors[robot.id], outline='black',
-                                  tags=f"robot_{robot.id}")
-            
-            # Update status text with background
-            status_text = f"{robot.id} - {robot.status}"
-            self.canvas.delete(f"status_{robot.id}")
-            text = self.canvas.create_text(robot.x, robot.y - 15, text=status_text,
-                                         font=("Arial", 8, "bold"),
-                                         tags=f"status_{robot.id}")
-            bbox = self.canvas.bbox(text)
-            if bbox:
-                self.canvas.create_rectangle(bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2,
-                                          fill='white', outline='',
-                                          tags=(f"background_{robot.id}", f"status_{robot.id}"))
-                self.canvas.tag_raise(text)
-
-        # Update side panel information
+            if robot.id not in self.robot_sprites:
+                self.add_robot_sprite(robot)
+
+    def on_simulation_tick(self, simulator):
+        """Simulator observer: start animating the robots moved by this tick"""
+        self.update_robots()
+
+    def animate(self):
+        """Draw a frame every frame_interval_ms, independent of the tick rate"""
+        if self.frame_slots is not None:
+            with profiler.phase('render.frame'):
+                alpha = (time.perf_counter() - self.last_tick_time) / self.tick_wall_interval
+                self.draw_frame(self.frame_slots, alpha)
+            if alpha >= 1:
+                self.frame_slots = None  # Everyone is drawn at their tick position
+        self.root.after(self.frame_interval_ms, self.animate)
+
+    def draw_frame(self, slots, alpha, status_changed=None):
+        """Draw the robots in ``slots`` at the fraction alpha of the way through the latest tick"""
+        if not len(slots):
+            return
+        profiler.count('robots_drawn', len(slots))
+        world_x, world_y = self.simulator.interpolated_positions(alpha, slots)
+        screen_x, screen_y = self.transform_coordinates(world_x, world_y)
+        if status_changed is None:
+            status_changed = [False] * len(slots)
+        else:
+            status_changed = status_changed.tolist()
+        views = self.simulator.fleet.views
+        for slot, x, y, changed in zip(slots.tolist(), screen_x.tolist(), screen_y.tolist(), status_changed):
+            robot = views[slot]
+            if robot is not None and robot.id in self.robot_sprites:
+                self.draw_robot(robot, x, y, changed)
+
+    def refresh_panel(self):
+        """Refresh the side panel at panel_interval_ms, independent of the tick rate"""
+        with profiler.phase('render.panel'):
+            self.update_panel()
+        if self.profile_label is not None:
+            self.update_profile_overlay()
+        self.root.after(self.panel_interval_ms, self.refresh_panel)
+
+    def update_panel(self):
+        if self.replay is not None:
+            simulator = self.simulator
+            end = self.replay.end_tick * simulator.tick_interval
+            state = " (paused)" if self.paused else " (end)" if self.replay.finished else ""
+            text = f"Replay {simulator.sim_time:.1f} s / {end:.1f} s{state}"
+            if self.replay.divergences:
+                text += f" - diverged at tick {self.replay.divergences[0]}"
+            self.replay_label.config(text=text)
         self.update_robot_info()
         self.update_robot_list()
 
-        # Schedule next update
-        self.root.after(100, self.update_robots)
+    def update_profile_overlay(self):
+        """Show p50/p95/p99 of the main phases and the counters in the side panel"""
+        if not profiler.enabled:
+            self.profile_label.config(text="Profiling off (run with --profile)")
+            return
+        lines = [f"{'ms':<20}{'p50':>6}{'p95':>6}{'p99':>6}"]
+        for name in self.PROFILE_PHASES:
+            stats = profiler.phases.get(name)
+            if stats is not None:
+                p50, p95, p99 = (stats.percentile(q) * 1000 for q in (50, 95, 99))
+                lines.append(f"{name:<20}{p50:>6.2f}{p95:>6.2f}{p99:>6.2f}")
+        for name, value in sorted(profiler.counters.items()):
+            lines.append(f"{name:<20}{value:>18}")
+        self.profile_label.config(text="\n".join(lines))
+
+    def update_robots(self):
+        """Pick up the robots that moved or changed status in the latest tick.
+
+        Every robot is drawn where the previous tick left it, which also puts
+        down any robot a late frame left short of its end position.
+        """
+        with profiler.phase('render.update_robots'):
+            self._update_robots()
+
+    def _update_robots(self):
+        slots, status_changed = self.render_tracker.poll()
+        self.last_tick_time = time.perf_counter()
+        # Robots out of view or in a cluster glyph have no sprite to move
+        self.layout_robots()
+        drawn = self.drawn_slots[slots]
+        slots, status_changed = slots[drawn], status_changed[drawn]
+        if self.frame_slots is not None:
+            self.draw_frame(np.setdiff1d(self.frame_slots, slots), 0.0)
+        # New tick: start from the previous position, with the new status label
+        self.draw_frame(slots, 0.0, status_changed)
+        self.frame_slots = slots
@@ -1,28 +1,225 @@
 import sys
 import os
 import argparse
+import atexit
+import random
+import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from models.nav_graph import NavGraph
-from gui.fleet_gui import FleetGUI
+from src.models.nav_graph import NavGraph
+from src.gui.fleet_gui import FleetGUI
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+from src.models.dispatcher import TaskDispatcher
+from src.models.charging import ChargingScheduler
+from src.models.control_api import ControlServer
+from src.models.event_log import EventLog, EventRecorder, Replay
+from src.models.profiler import profiler
+from src.models.snapshot import SnapshotWriter, load_snapshot
 import tkinter as tk
 
+def run_headless(graph, robot_count, ticks, seed, traffic, tasks=0, record=None, charging=False, api=None,
+                 snapshot=None, snapshot_every=60.0, simulator=None):
+    """Run a shift without a display, re-tasking idle robots at random
+    (or dispatching a batch of random pickup/dropoff tasks). With a control
+    API address the run is paced in real time so clients can drive it.
+    A ``simulator`` resumed from a snapshot carries on with its own robots,
+    traffic, tasks and charging instead of spawning a new fleet."""
+    rng = random.Random(seed)
+    vertex_count = len(graph.vertices)
+    if simulator is None:
+        traffic_manager = TrafficManager(policy=traffic) if traffic != 'none' else None
+        simulator = FleetSimulator(graph, traffic_manager=traffic_manager)
+        if charging:
+            ChargingScheduler(simulator)
+        recorder = EventRecorder(simulator, EventLog(record)) if record else None
+        for _ in range(robot_count):
+            simulator.spawn_robot_at_vertex(rng.randrange(vertex_count))
+    else:
+        recorder = None
+        robot_count = len(simulator.robots)
+    scheduler = simulator.charging
+
+    def retask(sim):
+        for robot in sim.idle_robots():
+            sim.assign_task(robot, rng.randrange(vertex_count))
+
+    dispatcher = simulator.dispatcher
+    if dispatcher is None and (tasks > 0 or api):
+        dispatcher = TaskDispatcher(simulator)
+    if dispatcher is not None:
+        dispatcher.submit_many([(rng.randrange(vertex_count), rng.randrange(vertex_count))
+                                for _ in range(tasks)])
+    else:
+        simulator.add_observer(retask)
+    writer = None
+    if snapshot:
+        writer = SnapshotWriter(simulator, snapshot, every=max(1, round(snapshot_every / simulator.tick_interval)))
+    server = None
+    if api:
+        server = ControlServer(simulator, api).start()
+        print(f"Control API listening on {server.address}")
+    try:
+        elapsed = simulator.run(ticks=ticks, realtime=server is not None)
+    finally:
+        if server is not None:
+            server.stop()
+    if dispatcher is not None:
+        # A task is a pickup and a dropoff route, so count the dispatcher's tasks rather than routes
+        minutes = simulator.sim_time / 60.0
+        rate = f"{dispatcher.tasks_completed / minutes if minutes > 0 else 0.0:.1f} tasks/simulated minute"
+    else:
+        rate = f"{simulator.throughput():.1f} route completions/simulated minute"
+    print(f"{robot_count} robots, {ticks} ticks in {elapsed:.3f}s "
+          f"({ticks / elapsed if elapsed > 0 else float('inf'):.1f} ticks/s), {rate}")
+    cache = graph.route_cache.stats()
+    print(f"Route cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%}), "
+          f"{cache['evictions']} evictions, {cache['size']}/{cache['capacity']} entries")
+    if dispatcher is not None:
+        report = dispatcher.report()
+        print(f"Dispatched {report['completed']}/{report['submitted']} tasks "
+              f"({report['queued']} queued, {report['active']} in progress) in {report['rounds']} rounds, "
+              f"assignment latency mean {report['latency_mean_ms']:.2f} ms / "
+              f"p95 {report['latency_p95_ms']:.2f} ms, "
+              f"mean queue wait {report['queue_wait_mean_ticks']:.0f} ticks")
+    if scheduler is not None:
+        report = scheduler.report()
+        print(f"Charging: {report['charges']} charges at {report['chargers']} chargers, "
+              f"{report['utilization_lost']:.1%} of robot time lost "
+              f"({report['charging_s']:.0f} s charging, {report['to_charger_s']:.0f} s driving to chargers, "
+              f"{report['queued_s']:.0f} s queued), {report['depletions']} batteries ran flat, "
+              f"mean battery {report['mean_battery']:.0%}")
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.log.events_written} events to {record}")
+    if writer is not None:
+        writer.close()
+        print(f"Snapshot of tick {writer.last_tick} written to {snapshot}")
+
+def resume(path, graph=None):
+    """Load a snapshot, reporting how long it took"""
+    start = time.perf_counter()
+    simulator = load_snapshot(path, graph)
+    print(f"Resumed {len(simulator.robots)} robots at tick {simulator.tick_count} "
+          f"({simulator.sim_time:.1f} s simulated) from {path} in {time.perf_counter() - start:.3f}s")
+    return simulator
+
+def run_replay_headless(replay, speed=None):
+    """Replay a log to its end and check it reproduces the recorded run"""
+    elapsed = replay.run(speed=speed)
+    simulator = replay.simulator
+    print(f"Replayed {simulator.tick_count - replay.start_tick} ticks ({simulator.sim_time:.1f} s simulated) "
+          f"in {elapsed:.3f}s: {len(simulator.robots)} robots, {len(replay.transitions)} status transitions logged")
+    if replay.divergences:
+        print(f"Replay diverged from the log at ticks {replay.divergences[:10]}")
+    else:
+        print(f"Replay matched all {len(replay.snapshots)} logged snapshots")
+
 def main():
     parser = argparse.ArgumentParser(description='Fleet Management System')
-    parser.add_argument('--graph', type=int, choices=[1, 2, 3], default=1,
-                      help='Select which navigation graph to use (1, 2, or 3)')
+    parser.add_argument('--graph', default='1',
+                      help='Bundled navigation graph (1, 2, or 3) or the path of a graph file')
+    parser.add_argument('--level', default=None,
+                      help='Level of the graph to load (defaults to the first one)')
+    parser.add_argument('--no-graph-cache', action='store_true',
+                      help='Always parse the graph JSON instead of using the binary cache')
+    parser.add_argument('--headless', action='store_true',
+                      help='Run the simulation without a display and report ticks/second')
+    parser.add_argument('--robots', type=int, default=10,
+                      help='Number of robots to spawn in headless mode')
+    parser.add_argument('--ticks', type=int, default=1000,
+                      help='Number of ticks to simulate in headless mode')
+    parser.add_argument('--seed', type=int, default=0,
+                      help='Random seed for headless mode')
+    parser.add_argument('--tasks', type=int, default=0,
+                      help='Submit this many random pickup/dropoff tasks to the dispatcher in headless mode')
+    parser.add_argument('--traffic', choices=['none', 'wait', 'reroute'], default='reroute',
+                      help='Traffic policy for headless mode')
+    parser.add_argument('--charging', action='store_true',
+                      help='Drain robot batteries and send low robots to the graph\'s chargers')
+    parser.add_argument('--api', metavar='ADDRESS', default=None,
+                      help='Serve the local control API on a Unix socket path or [host:]port '
+                           '(headless runs then tick in real time)')
+    parser.add_argument('--record', metavar='PATH', default=None,
+                      help='Record spawns, tasks and status changes to a JSON-lines event log (.gz to compress)')
+    parser.add_argument('--replay', metavar='PATH', default=None,
+                      help='Replay a recorded event log instead of running a live fleet (uses the graph in the log)')
+    parser.add_argument('--speed', type=float, default=None,
+                      help='Replay speed as a multiple of real time (default: 1 in the GUI, '
+                           'as fast as possible headless)')
+    parser.add_argument('--seek', type=float, default=0.0,
+                      help='Start the replay this many simulated seconds into the log')
+    parser.add_argument('--snapshot', metavar='PATH', default=None,
+                      help='Keep a snapshot of the whole fleet in PATH, written in the background, '
+                           'to carry on from with --resume')
+    parser.add_argument('--snapshot-every', type=float, default=60.0, metavar='SECONDS',
+                      help='Simulated seconds between snapshots (default 60); one is also written on exit')
+    parser.add_argument('--resume', metavar='PATH', default=None,
+                      help='Carry on from a snapshot instead of starting a new fleet (uses the graph in the '
+                           'snapshot; --robots, --traffic and --charging are ignored)')
+    parser.add_argument('--profile', action='store_true',
+                      help='Time the tick, routing and render phases, show them in the side panel '
+                           'and print a report on exit')
     args = parser.parse_args()
 
+    if args.resume and (args.record or args.replay):
+        parser.error("--resume cannot be combined with --record or --replay")
+
+    if args.profile:
+        profiler.enable()
+        atexit.register(lambda: print(profiler.report()))
+
+    if args.replay:
+        replay = Replay(args.replay)
+        replay.seek(int(round(args.seek / replay.simulator.tick_interval)))
+        if args.headless:
+            run_replay_headless(replay, args.speed)
+            return
+        root = tk.Tk()
+        root.title(f"Fleet Management System - replay of {os.path.basename(args.replay)}")
+        FleetGUI(root, replay.graph, replay=replay, replay_speed=args.speed or 1.0,
+                 profile_overlay=args.profile)
+        root.mainloop()
+        return
+
+    simulator = None
+    if args.resume:
+        simulator = resume(args.resume)
+        graph = simulator.graph
+        graph_path = graph.source.path
+    else:
+        if args.graph in ('1', '2', '3'):
+            graph_file = f"nav_graph_{args.graph}.json"
+            graph_path = os.path.abspath(os.path.join(os.path.dirname(__file__), f"../data/{graph_file}"))
+        else:
+            graph_path = os.path.abspath(args.graph)
+        graph = NavGraph(graph_path, precompute=True, level=args.level, use_cache=not args.no_graph_cache)
+
+    if args.headless:
+        run_headless(graph, args.robots, args.ticks, args.seed, args.traffic, args.tasks, args.record,
+                     args.charging, args.api, args.snapshot, args.snapshot_every, simulator)
+        return
+
     root = tk.Tk()
-    root.title(f"Fleet Management System - Graph {args.graph}")
-    
-    graph_file = f"nav_graph_{args.graph}.json"
-    graph_path = os.path.abspath(os.path.join(os.path.dirname(__file__), f"../data/{graph_file}"))
-    graph = NavGraph(graph_path)
+    root.title(f"Fleet Management System - {os.path.basename(graph_path)} ({graph.level})")
     
-    app = FleetGUI(root, graph)
+    app = FleetGUI(root, graph, profile_overlay=args.profile, simulator=simulator)
+    if args.charging and simulator is None:
+        ChargingScheduler(app.simulator)
+    recorder = EventRecorder(app.simulator, EventLog(args.record)) if args.record else None
+    writer = SnapshotWriter(app.simulator, args.snapshot,
+                            every=max(1, round(args.snapshot_every / app.simulator.tick_interval))) \
+        if args.snapshot else None
+    server = ControlServer(app.simulator, args.api, on_robots_changed=app.sync_robot_sprites).start() \
+        if args.api else None
     root.mainloop()
+    if server is not None:
+        server.stop()
+    if recorder is not None:
+        recorder.close()
+    if writer is not None:
+        writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,242 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from src.models.fleet_state import STATUS_FREE, IDLE, CHARGING
+from src.models.robot import Robot
+
+class ChargingScheduler:
+    """Battery model for every robot, and charger assignment for low robots.
+
+    Each robot's charge fraction lives in ``FleetState.battery``. After every
+    tick it drops by ``drain_per_unit`` per world unit driven and ``idle_drain``
+    per second, and charging robots gain ``charge_rate`` per second, all as
+    array operations over the fleet.
+
+    The distance from every vertex to its nearest charger comes from one
+    multi-source Dijkstra at start-up, so deciding whether an idle robot has to
+    charge, and where to, is an array lookup; only when a robot's nearest
+    charger is taken does a search run, stopping at the closest free one. Call
+    refresh_distances() after changing lane costs. An idle robot goes once its battery falls below
+    ``low_level`` plus what the trip to that charger costs, to the nearest
+    charger no other robot holds. When every charger is held it waits in the
+    queue of its nearest charger, and is sent on when that charger, or one with
+    an empty queue, frees up. Robots leave at ``full_level``; one that was
+    between legs of a dispatcher task picks the task up again from there.
+    """
+
+    def __init__(self, simulator, drain_per_unit=0.002, idle_drain=0.0001, charge_rate=0.01,
+                 low_level=0.25, full_level=0.95):
+        self.simulator = simulator
+        self.graph = simulator.graph
+        self.chargers = self.graph.chargers
+        if not self.chargers:
+            raise ValueError("The graph has no is_charger vertices to charge at")
+        self.drain_per_unit = drain_per_unit
+        self.idle_drain = idle_drain  # Per second, whatever the robot is doing short of charging
+        self.charge_rate = charge_rate  # Per second
+        self.low_level = low_level
+        self.full_level = full_level
+
+        self.refresh_distances()
+
+        self.holder = {charger: None for charger in self.chargers}  # charger -> robot id driving to or charging at it
+        self.queues = {charger: deque() for charger in self.chargers}  # Robots waiting for that charger
+        self.heading = {}  # robot id -> (robot, charger) for robots driving to a charger
+        self.plugged = {}  # robot id -> (robot, charger) for robots charging
+        self.queued = {}  # robot id -> (robot, charger, tick queued)
+        # Metrics
+        self.robot_ticks = 0
+        self.charging_ticks = 0
+        self.heading_ticks = 0
+        self.queued_ticks = 0
+        self.charges = 0
+        self.depletions = 0
+        self.queue_waits = []  # Ticks each queued robot waited for a charger
+        simulator.charging = self
+        # Ahead of the dispatcher, so robots that need charging are not handed a task first
+        simulator.observers.insert(0, self.on_tick)
+
+    def refresh_distances(self):
+        """Recompute charger distances from the graph's current lane costs"""
+        # Distance from every vertex to its nearest charger, and which one that is
+        self.charger_distance, self.nearest_charger = self.graph.multi_source_distances(
+            self.chargers, reverse=True)
+        reachable = self.charger_distance[np.isfinite(self.charger_distance)]
+        self.max_trip_energy = float(reachable.max()) * self.drain_per_unit if len(reachable) else 0.0
+
+    def settings(self):
+        """Constructor arguments that rebuild an identically configured scheduler"""
+        return {
+            'drain_per_unit': self.drain_per_unit,
+            'idle_drain': self.idle_drain,
+            'charge_rate': self.charge_rate,
+            'low_level': self.low_level,
+            'full_level': self.full_level,
+        }
+
+    def state(self):
+        """Copy of the charger assignments, queues and metrics, for a snapshot"""
+        return {
+            'settings': self.settings(),
+            'holder': list(self.holder.items()),
+            'queues': [(charger, [robot.id for robot in queue]) for charger, queue in self.queues.items()],
+            'heading': [(robot_id, charger) for robot_id, (_, charger) in self.heading.items()],
+            'plugged': [(robot_id, charger) for robot_id, (_, charger) in self.plugged.items()],
+            'queued': [(robot_id, charger, tick) for robot_id, (_, charger, tick) in self.queued.items()],
+            'metrics': (self.robot_ticks, self.charging_ticks, self.heading_ticks, self.queued_ticks,
+                        self.charges, self.depletions),
+            'queue_waits': list(self.queue_waits),
+        }
+
+    def restore(self, state):
+        """Take over the charger assignments and metrics of a state() copy"""
+        robots = {robot.id: robot for robot in self.simulator.robots}
+        self.holder = dict(state['holder'])
+        self.queues = {charger: deque(robots[robot_id] for robot_id in queue)
+                       for charger, queue in state['queues']}
+        self.heading = {robot_id: (robots[robot_id], charger) for robot_id, charger in state['heading']}
+        self.plugged = {robot_id: (robots[robot_id], charger) for robot_id, charger in state['plugged']}
+        self.queued = {robot_id: (robots[robot_id], charger, tick) for robot_id, charger, tick in state['queued']}
+        (self.robot_ticks, self.charging_ticks, self.heading_ticks, self.queued_ticks,
+         self.charges, self.depletions) = state['metrics']
+        self.queue_waits = list(state['queue_waits'])
+
+    def on_tick(self, simulator):
+        fleet = simulator.fleet
+        n = fleet.size
+        dt = simulator.tick_interval
+        status = fleet.status[:n]
+        battery = fleet.battery[:n]
+        live = status != STATUS_FREE
+        charging = status == CHARGING
+
+        had_charge = battery > 0
+        battery -= fleet.step_distance[:n] * self.drain_per_unit
+        battery[live & ~charging] -= self.idle_drain * dt
+        battery[charging] += self.charge_rate * dt
+        self.depletions += int(np.count_nonzero(live & had_charge & (battery <= 0)))
+        np.clip(battery, 0.0, 1.0, out=battery)
+
+        self.robot_ticks += int(np.count_nonzero(live))
+        self.charging_ticks += int(np.count_nonzero(charging))
+        self.heading_ticks += len(self.heading)
+        self.queued_ticks += len(self.queued)
+
+        for slot in np.flatnonzero(charging & (battery >= self.full_level)).tolist():
+            self._unplug(fleet.views[slot])
+        self._check_arrivals()
+        self._send_low_robots(status, battery)
+
+    def _unplug(self, robot):
+        entry = self.plugged.pop(robot.id, None)
+        robot.previous_status = robot.status
+        robot.status = Robot.STATUS_IDLE
+        if entry is not None:
+            self.charges += 1
+            self._release(entry[1])
+
+    def _release(self, charger):
+        """Free a charger and hand it to the next queued robot"""
+        self.holder[charger] = None
+        queue = self.queues[charger]
+        if not queue:
+            # Take over the longest queue elsewhere
+            queue = max(self.queues.values(), key=len)
+        if queue:
+            robot = queue.popleft()
+            _, _, since = self.queued.pop(robot.id)
+            self.queue_waits.append(self.simulator.tick_count - since)
+            robot.previous_status = robot.status
+            robot.status = Robot.STATUS_IDLE
+            robot.wait_time = 0
+            self._send(robot, charger)
+
+    def _send(self, robot, charger):
+        self.holder[charger] = robot.id
+        self.heading[robot.id] = (robot, charger)
+        self.simulator.assign_task(robot, charger)
+
+    def _check_arrivals(self):
+        """Plug in robots that reached their charger; re-send any that ended up elsewhere"""
+        for robot_id, (robot, charger) in list(self.heading.items()):
+            if robot.status != Robot.STATUS_IDLE:
+                continue
+            if self.simulator.nearest_vertex(robot.x, robot.y) == charger:
+                del self.heading[robot_id]
+                self.plugged[robot_id] = (robot, charger)
+                robot.previous_status = robot.status
+                robot.status = Robot.STATUS_CHARGING
+            else:
+                self.simulator.assign_task(robot, charger)
+
+    def _send_low_robots(self, status, battery):
+        # Only idle robots below the highest threshold any vertex could have need a closer look
+        idle = np.flatnonzero((status == IDLE) & (battery < self.low_level + self.max_trip_energy))
+        if not len(idle):
+            return
+        simulator = self.simulator
+        views = simulator.fleet.views
+        for slot in idle.tolist():
+            robot = views[slot]
+            vertex = simulator.nearest_vertex(robot.x, robot.y)
+            if vertex is None or not math.isfinite(self.charger_distance[vertex]):
+                continue
+            if battery[slot] < self.low_level + self.charger_distance[vertex] * self.drain_per_unit:
+                self._request(robot, vertex)
+
+    def _request(self, robot, vertex):
+        """Send a robot to the nearest free charger, or queue it at its nearest one"""
+        charger = int(self.nearest_charger[vertex])
+        if self.holder[charger] is None:
+            self._send(robot, charger)
+            return
+        free = [other for other, holder in self.holder.items() if holder is None]
+        if free:
+            best, _ = self.graph.nearest_of(vertex, free)
+            if best is not None:
+                self._send(robot, best)
+                return
+        self.queues[charger].append(robot)
+        self.queued[robot.id] = (robot, charger, self.simulator.tick_count)
+        # Parked until a charger frees up
+        robot.previous_status = robot.status
+        robot.status = Robot.STATUS_WAITING
+        robot.wait_time = math.inf
+
+    def hand_over(self, pairs):
+        """Follow route swaps made by traffic control, pairs of (from robot, to robot)"""
+        moved = [(self.heading.pop(giver.id, None), taker) for giver, taker in pairs]
+        for entry, taker in moved:
+            if entry is not None:
+                self.holder[entry[1]] = taker.id
+                self.heading[taker.id] = (taker, entry[1])
+
+    def remove_robot(self, robot):
+        for table in (self.heading, self.plugged):
+            entry = table.pop(robot.id, None)
+            if entry is not None:
+                self._release(entry[1])
+        entry = self.queued.pop(robot.id, None)
+        if entry is not None:
+            self.queues[entry[1]].remove(robot)
+
+    def report(self):
+        """Charging activity and the share of robot time it cost"""
+        dt = self.simulator.tick_interval
+        fleet = self.simulator.fleet
+        live = fleet.status[:fleet.size] != STATUS_FREE
+        lost = self.charging_ticks + self.heading_ticks + self.queued_ticks
+        waits = np.asarray(self.queue_waits) * dt
+        return {
+            'chargers': len(self.chargers),
+            'charges': self.charges,
+            'depletions': self.depletions,
+            'charging_s': self.charging_ticks * dt,
+            'to_charger_s': self.heading_ticks * dt,
+            'queued_s': self.queued_ticks * dt,
+            'utilization_lost': lost / self.robot_ticks if self.robot_ticks else 0.0,
+            'queue_wait_mean_s': float(waits.mean()) if len(waits) else 0.0,
+            'mean_battery': float(fleet.battery[:fleet.size][live].mean()) if live.any() else 0.0,
+        }
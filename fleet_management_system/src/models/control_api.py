@@ -0,0 +1,514 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+from src.models.dispatcher import TaskDispatcher
+from src.models.fleet_state import ChangeTracker, STATUS_FREE, STATUS_NAMES
+from src.models.profiler import profiler
+
+# Bump when requests, responses or stream messages change incompatibly
+PROTOCOL_VERSION = 1
+
+# Fields of each robot row in state messages
+ROBOT_FIELDS = ("id", "x", "y", "status", "battery")
+
+# Longest request line accepted, enough for bulk submissions of ~100k tasks
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+def _encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+def _rows(ids, x, y, status, battery):
+    """State rows from ROBOT_FIELDS columns"""
+    return [[robot_id, x, y, STATUS_NAMES[code], charge] for robot_id, x, y, code, charge in zip(
+        ids, np.round(x, 3).tolist(), np.round(y, 3).tolist(), status.tolist(), np.round(battery, 3).tolist())]
+
+def parse_address(address):
+    """(unix socket path, None) or (host, port) from "path.sock", "/path", "host:port" or "port" """
+    if os.sep in address or address.endswith(".sock"):
+        return address, None
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class _Client:
+    __slots__ = ('writer', 'handler', 'version', 'subscribed', 'task')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.handler = asyncio.current_task()  # Coroutine reading the client's requests
+        self.version = None  # Tick of the last state sent, None before the first (full) one
+        self.subscribed = False
+        self.task = None  # Streaming coroutine while subscribed
+
+
+class ControlServer:
+    """Local asyncio API for driving a simulator from other processes.
+
+    Clients connect over a Unix socket (or TCP on localhost) and exchange JSON
+    lines: requests ``{"id": 1, "op": "spawn", ...}`` are answered with
+    ``{"id": 1, "ok": true, "result": ...}`` or ``{"id": 1, "ok": false,
+    "error": "..."}``. Operations are spawn, assign, remove, submit (bulk
+    pickup/dropoff tasks), state, stats, graph, subscribe and unsubscribe.
+
+    The event loop runs on its own thread, so neither the Tk mainloop nor a
+    headless run ever waits on a socket. Requests are queued and applied by an
+    observer at the next tick, on the simulator's thread.
+
+    Subscribers get ``{"e": "state", ...}`` messages: a full state first, then
+    only robots that moved, changed status or were removed. Each tick the
+    simulator thread computes one delta for everyone; the server keeps the
+    latest row per robot and the ids changed in the last ``history`` ticks. A
+    client is sent everything changed since the version it last received, so a
+    slow client gets fewer, larger messages instead of a backlog, and clients
+    that are caught up share one encoded message per tick. A client more than
+    ``history`` ticks behind is sent a full state again.
+    """
+
+    def __init__(self, simulator, address="fleet.sock", history=50, on_robots_changed=None):
+        self.simulator = simulator
+        self.address = address
+        self.history = history
+        self.on_robots_changed = on_robots_changed  # Called on the simulator thread after spawns/removals
+        self.requests = queue.SimpleQueue()  # (request, concurrent future) for the simulator thread
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.clients = set()
+        self.requests_applied = 0
+        self.messages_sent = 0
+        self._vertex_names = None
+
+        # Simulator thread: change detection for the stream
+        self.tracker = None  # ChangeTracker, only while anyone is subscribed
+        self.slot_ids = []  # Robot id last published per fleet slot, None if none
+        self.slot_published = np.zeros(0, dtype=bool)  # Whether slot_ids holds a robot
+        self.robot_count = 0  # Robots ever spawned, as of the last publish
+        self.subscribers = 0  # Updated on the loop thread, read on the simulator thread
+
+        # Loop thread: latest published state
+        self.version = -1  # Tick of the latest published delta
+        self.rows = {}  # robot id -> row
+        self.changes = deque()  # (tick, ids changed, ids removed), oldest first
+        self.base = -1  # Clients at this version or later can be brought up to date from ``changes``
+        self._encoded = {}  # version a client is at -> encoded message bringing it up to date
+        self._published = None  # Future resolved by the next publish
+
+        simulator.add_observer(self.on_tick)
+
+    def start(self):
+        """Start the event loop thread and wait until the socket accepts connections"""
+        ready = concurrent.futures.Future()
+        self.thread = threading.Thread(target=self._run, args=(ready,), name="control-api", daemon=True)
+        self.thread.start()
+        ready.result()
+        return self
+
+    def _run(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._listen())
+        except Exception as error:
+            ready.set_exception(error)
+            return
+        ready.set_result(None)
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _listen(self):
+        self._published = self.loop.create_future()
+        path, port = parse_address(self.address)
+        if port is None:
+            if os.path.exists(path):
+                os.unlink(path)  # Stale socket left by an earlier run
+            self.server = await asyncio.start_unix_server(self._serve, path, limit=MAX_LINE_BYTES)
+        else:
+            self.server = await asyncio.start_server(self._serve, path, port, limit=MAX_LINE_BYTES)
+            if port == 0:
+                self.address = "%s:%d" % self.server.sockets[0].getsockname()[:2]
+
+    def stop(self):
+        """Close every connection and the socket, and end the loop thread"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.simulator.remove_observer(self.on_tick)
+        path, port = parse_address(self.address)
+        if port is None and os.path.exists(path):
+            os.unlink(path)
+        while not self.requests.empty():
+            self.requests.get_nowait()[1].set_exception(ConnectionError("Control server stopped"))
+
+    async def _shutdown(self):
+        self.server.close()
+        handlers = {client.handler for client in self.clients}
+        # Streams and requests still waiting; connection handlers end on their own once closed
+        others = [task for task in asyncio.all_tasks(self.loop)
+                  if task is not asyncio.current_task() and task not in handlers]
+        for task in others:
+            task.cancel()
+        await asyncio.gather(*others, return_exceptions=True)
+        for client in list(self.clients):
+            client.writer.close()
+        if handlers:
+            await asyncio.wait(handlers)
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        client = _Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._send(client, {"ok": False, "error": f"Request over {MAX_LINE_BYTES} bytes"})
+                    break
+                if not line:
+                    break
+                # Requests are queued in arrival order; answers go out as each completes
+                self.loop.create_task(self._handle(client, line))
+        except ConnectionError:
+            pass
+        finally:
+            self._unsubscribe(client)
+            self.clients.discard(client)
+            writer.close()
+
+    async def _handle(self, client, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests are JSON objects")
+        except ValueError as error:
+            await self._send(client, {"ok": False, "error": f"Bad request: {error}"})
+            return
+        op = request.get("op")
+        response = {"id": request.get("id")}
+        try:
+            if op == "subscribe":
+                self._subscribe(client)
+                result = {"protocol": PROTOCOL_VERSION, "fields": ROBOT_FIELDS}
+            elif op == "unsubscribe":
+                self._unsubscribe(client)
+                result = None
+            else:
+                # Everything else touches the simulator, so runs on its thread at the next tick
+                future = concurrent.futures.Future()
+                self.requests.put((request, future))
+                result = await asyncio.wrap_future(future)
+            response.update(ok=True, result=result)
+        except KeyError as error:
+            response.update(ok=False, error=f"Missing field {error}")
+        except (ValueError, TypeError, ConnectionError) as error:
+            response.update(ok=False, error=str(error))
+        await self._send(client, response)
+
+    async def _send(self, client, message):
+        client.writer.write(_encode(message))
+        self.messages_sent += 1
+        await client.writer.drain()
+
+    def _subscribe(self, client):
+        if client.subscribed:
+            return
+        client.subscribed = True
+        client.version = None
+        self.subscribers += 1
+        client.task = self.loop.create_task(self._stream(client))
+
+    def _unsubscribe(self, client):
+        if not client.subscribed:
+            return
+        client.subscribed = False
+        self.subscribers -= 1
+        client.task.cancel()
+        client.task = None
+
+    async def _stream(self, client):
+        """Send the client everything that changed since its last message, whenever anything has"""
+        try:
+            while True:
+                while client.version == self.version or self.version < 0:
+                    await asyncio.shield(self._published)
+                version = self.version
+                client.writer.write(self._message_since(client.version))
+                client.version = version
+                self.messages_sent += 1
+                # A slow reader holds only its own stream back; its next message covers the gap
+                await client.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def _message_since(self, since):
+        message = self._encoded.get(since)
+        if message is not None:
+            return message
+        if since is None or since < self.base:
+            message = {"e": "state", "tick": self.version, "full": True, "robots": list(self.rows.values())}
+        else:
+            changed, removed = set(), set()
+            for tick, ids, gone in reversed(self.changes):
+                if tick <= since:
+                    break
+                changed.update(ids)
+                removed.update(gone)
+            rows = self.rows
+            message = {"e": "state", "tick": self.version, "full": False,
+                       "robots": [rows[robot_id] for robot_id in changed if robot_id in rows],
+                       "removed": [robot_id for robot_id in removed if robot_id not in rows]}
+        message = self._encoded[since] = _encode(message)
+        return message
+
+    def _publish(self, tick, columns, removed, full):
+        """Take in the delta of one tick (loop thread)"""
+        rows = _rows(*columns)
+        if full:
+            self.rows = {row[0]: row for row in rows}
+            self.changes.clear()
+            self.base = tick
+        else:
+            for row in rows:
+                self.rows[row[0]] = row
+            for robot_id in removed:
+                self.rows.pop(robot_id, None)
+            self.changes.append((tick, [row[0] for row in rows], removed))
+            while len(self.changes) > self.history:
+                self.base = self.changes.popleft()[0]
+        self.version = tick
+        self._encoded = {}
+        published, self._published = self._published, self.loop.create_future()
+        published.set_result(None)
+
+    def on_tick(self, simulator):
+        """Apply queued requests, then hand this tick's changes to the subscribers"""
+        with profiler.phase('api'):
+            if not self.requests.empty():
+                self._apply_requests()
+            if self.subscribers > 0 and self.loop is not None:
+                self._publish_changes()
+            elif self.tracker is not None:
+                self.tracker = None  # Nobody listening; the next subscriber starts from a full state
+
+    def _apply_requests(self):
+        robots_by_id = None
+        fleet_changed = False
+        while not self.requests.empty():
+            request, future = self.requests.get_nowait()
+            op = request.get("op")
+            fleet = self.simulator.fleet
+            robots_before, spawned_before = len(self.simulator.robots), fleet.robot_count
+            try:
+                if op in ("assign", "remove") and robots_by_id is None:
+                    robots_by_id = {robot.id: robot for robot in self.simulator.robots}
+                result = self._apply(op, request, robots_by_id)
+            except (ValueError, KeyError, TypeError) as error:
+                future.set_exception(error)
+            else:
+                self.requests_applied += 1
+                future.set_result(result)
+            # Checked after failures too: a bulk op may have spawned or removed robots before raising
+            if len(self.simulator.robots) != robots_before or fleet.robot_count != spawned_before:
+                fleet_changed = True
+                robots_by_id = None
+        if fleet_changed and self.on_robots_changed is not None:
+            self.on_robots_changed()
+
+    def _apply(self, op, request, robots_by_id):
+        simulator = self.simulator
+        if op == "spawn":
+            if "vertices" in request:
+                vertices = [self._vertex(ref) for ref in request["vertices"]]
+                return {"robots": [simulator.spawn_robot_at_vertex(v).id for v in vertices]}
+            if "vertex" in request:
+                return {"robots": [simulator.spawn_robot_at_vertex(self._vertex(request["vertex"])).id]}
+            return {"robots": [simulator.spawn_robot(float(request["x"]), float(request["y"])).id]}
+        if op == "assign":
+            pairs = request["assignments"] if "assignments" in request else [(request["robot"], request["vertex"])]
+            resolved = [(self._robot(robots_by_id, robot_id), self._vertex(ref)) for robot_id, ref in pairs]
+            return {"routed": [simulator.assign_task(robot, vertex) for robot, vertex in resolved]}
+        if op == "remove":
+            ids = request["robots"] if "robots" in request else [request["robot"]]
+            if len(set(ids)) != len(ids):
+                raise ValueError("Robot ids to remove must be unique")
+            # Resolve every id before removing any, so a bad id removes nothing
+            robots = [self._robot(robots_by_id, robot_id) for robot_id in ids]
+            for robot in robots:
+                simulator.remove_robot(robot)
+                del robots_by_id[robot.id]
+            return {"removed": len(ids)}
+        if op == "submit":
+            goals = [(self._vertex(pickup), None if dropoff is None else self._vertex(dropoff))
+                     for pickup, dropoff in request["tasks"]]
+            dispatcher = simulator.dispatcher or TaskDispatcher(simulator)
+            return {"tasks": [task.id for task in dispatcher.submit_many(goals)]}
+        if op == "state":
+            fleet = simulator.fleet
+            slots = np.flatnonzero(fleet.status[:fleet.size] != STATUS_FREE)
+            return {"tick": simulator.tick_count, "robots": _rows(*self._columns(slots))}
+        if op == "graph":
+            graph = simulator.graph
+            return {"vertices": len(graph.vertices), "level": graph.level, "chargers": list(graph.chargers)}
+        if op == "stats":
+            stats = {"tick": simulator.tick_count, "sim_time": simulator.sim_time, "robots": len(simulator.robots),
+                     "clients": len(self.clients), "subscribers": self.subscribers,
+                     "requests_applied": self.requests_applied, "messages_sent": self.messages_sent}
+            if simulator.dispatcher is not None:
+                stats["dispatcher"] = simulator.dispatcher.report()
+            return stats
+        raise ValueError(f"Unknown op {op!r}")
+
+    def _robot(self, robots_by_id, robot_id):
+        robot = robots_by_id.get(robot_id)
+        if robot is None:
+            raise ValueError(f"No robot {robot_id!r}")
+        return robot
+
+    def _vertex(self, ref):
+        """Vertex id from an id or a vertex name"""
+        if isinstance(ref, str):
+            if self._vertex_names is None:
+                self._vertex_names = {str(name): i for i, name in enumerate(self.simulator.graph.vertex_names.tolist())}
+            if ref not in self._vertex_names:
+                raise ValueError(f"No vertex named {ref!r}")
+            return self._vertex_names[ref]
+        if isinstance(ref, bool) or not isinstance(ref, int) or not 0 <= ref < len(self.simulator.graph.vertices):
+            raise ValueError(f"{ref!r} is not a vertex of the graph")
+        return ref
+
+    def _columns(self, slots, ids=None):
+        """Copies of the ROBOT_FIELDS of fleet slots, for _rows() to turn into rows on any thread"""
+        fleet = self.simulator.fleet
+        if ids is None:
+            ids = [fleet.views[slot].id for slot in slots.tolist()]
+        return ids, fleet.x[slots], fleet.y[slots], fleet.status[slots], fleet.battery[slots]
+
+    def _publish_changes(self):
+        """Rows of robots that changed this tick and ids of robots gone, handed to the loop thread"""
+        fleet = self.simulator.fleet
+        n = fleet.size
+        full = self.tracker is None
+        if full:
+            self.tracker = ChangeTracker(fleet)
+            self.slot_ids = []
+            self.slot_published = np.zeros(0, dtype=bool)
+        if len(self.slot_ids) < n:
+            self.slot_ids.extend([None] * (n - len(self.slot_ids)))
+            self.slot_published = np.concatenate([self.slot_published, np.zeros(n - len(self.slot_published), dtype=bool)])
+        ids, published = self.slot_ids, self.slot_published
+        live = fleet.status[:n] != STATUS_FREE
+        removed = []
+        for slot in np.flatnonzero(published[:n] & ~live).tolist():
+            removed.append(ids[slot])
+            ids[slot] = None
+        if fleet.robot_count != self.robot_count:
+            # New robots; one may have taken over a slot without moving from where its predecessor stood
+            self.robot_count = fleet.robot_count
+            for slot in np.flatnonzero(live).tolist():
+                if ids[slot] != fleet.views[slot].id:
+                    self.tracker.reset(slot)
+        slots, _ = self.tracker.poll()
+        changed = []
+        views = fleet.views
+        for slot in slots.tolist():
+            robot_id = views[slot].id
+            if ids[slot] != robot_id:
+                if ids[slot] is not None:
+                    removed.append(ids[slot])
+                ids[slot] = robot_id
+            changed.append(robot_id)
+        published[:n] = live
+        if not full and not changed and not removed:
+            return
+        # Rows are built and encoded on the loop thread, off the tick
+        self.loop.call_soon_threadsafe(self._publish, self.simulator.tick_count,
+                                       self._columns(slots, changed), removed, full)
+
+
+class ControlClient:
+    """Asyncio client for a ControlServer.
+
+    request() sends one request and waits for its answer; several may be in
+    flight at once. After subscribe(), state messages keep ``robots`` (robot id
+    -> row dict) up to date in the background.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.pending = {}  # request id -> future
+        self.robots = {}
+        self.tick = None  # Tick of the latest state message
+        self.messages = 0  # State messages received
+        self.bytes_received = 0
+        self.updated = asyncio.Event()  # Set after every state message
+        self.listener = asyncio.get_running_loop().create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, address):
+        path, port = parse_address(address)
+        if port is None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE_BYTES)
+        else:
+            reader, writer = await asyncio.open_connection(path, port, limit=MAX_LINE_BYTES)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """Result of one request, raises ValueError with the server's error message"""
+        self.next_id += 1
+        future = self.pending[self.next_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(_encode({"id": self.next_id, "op": op, **fields}))
+        await self.writer.drain()
+        return await future
+
+    async def subscribe(self):
+        return await self.request("subscribe")
+
+    async def _listen(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                self.bytes_received += len(line)
+                message = json.loads(line)
+                if message.get("e") == "state":
+                    self._apply_state(message)
+                    continue
+                future = self.pending.pop(message.get("id"), None)
+                if future is None:
+                    continue
+                if message["ok"]:
+                    future.set_result(message["result"])
+                else:
+                    future.set_exception(ValueError(message["error"]))
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Control server closed the connection"))
+
+    def _apply_state(self, message):
+        if message["full"]:
+            self.robots = {}
+        for row in message["robots"]:
+            self.robots[row[0]] = dict(zip(ROBOT_FIELDS, row))
+        for robot_id in message.get("removed", ()):
+            self.robots.pop(robot_id, None)
+        self.tick = message["tick"]
+        self.messages += 1
+        self.updated.set()
+        self.updated.clear()
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
@@ -0,0 +1,296 @@
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.models.profiler import profiler
+
+# Stand-in for unreachable pairs so the solver only ever sees finite costs
+UNREACHABLE_COST = 1e12
+
+def solve_assignment(cost):
+    """Minimum-cost assignment for a rectangular cost matrix.
+
+    Shortest augmenting path Hungarian method with the inner column scan done
+    as array operations, O(n^2 m) for n = min(rows, cols). Returns
+    (rows, cols) index arrays of the matched pairs, ordered by row.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+
+    # Potentials and matching are 1-based with column 0 as the augmenting root
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.intp)  # match[col] = row + 1, 0 if free
+    way = np.zeros(m + 1, dtype=np.intp)
+    for row in range(1, n + 1):
+        match[0] = row
+        col = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = match[col]
+            free = ~used[1:]
+            slack = cost[current - 1] - u[current] - v[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = col
+            candidates = np.where(free, min_slack[1:], np.inf)
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+            visited = np.flatnonzero(used)
+            u[match[visited]] += delta
+            v[visited] -= delta
+            min_slack[1:][free] -= delta
+            col = next_col
+            if match[col] == 0:
+                break
+        # Flip the augmenting path back to the root
+        while col:
+            previous = way[col]
+            match[col] = match[previous]
+            col = previous
+
+    cols = np.flatnonzero(match[1:])
+    rows = match[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class Task:
+    """A pickup/dropoff job waiting in or travelling through the dispatcher"""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_TO_PICKUP = 'to_pickup'
+    STATUS_TO_DROPOFF = 'to_dropoff'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    __slots__ = ('id', 'pickup', 'dropoff', 'status', 'robot', 'submitted_tick',
+                 'assigned_tick', 'completed_tick')
+
+    def __init__(self, task_id, pickup, dropoff, now):
+        self.id = task_id
+        self.pickup = pickup
+        self.dropoff = dropoff
+        self.status = self.STATUS_QUEUED
+        self.robot = None
+        self.submitted_tick = now
+        self.assigned_tick = None
+        self.completed_tick = None
+
+    @property
+    def target(self):
+        """Vertex the assigned robot is currently heading for"""
+        return self.dropoff if self.status == self.STATUS_TO_DROPOFF else self.pickup
+
+
+class TaskDispatcher:
+    """Queue of pickup/dropoff tasks handed to idle robots in optimal batches.
+
+    After every tick, robots that became idle without a task are matched
+    against the oldest ``window`` queued tasks in one assignment that minimizes
+    the total distance driven to the pickups. Only the freed robots and the
+    still-queued tasks take part, so each round is an incremental re-plan and
+    robots already under way keep their jobs. Robots holding a task are moved on
+    to the dropoff, or re-sent if traffic or a failed route left them elsewhere.
+    """
+
+    def __init__(self, simulator, window=1000):
+        self.simulator = simulator
+        self.graph = simulator.graph
+        self.window = window  # Queued tasks considered per assignment round
+        self.queue = OrderedDict()  # task id -> Task, oldest first
+        self.active = {}  # robot id -> Task
+        self.tasks_submitted = 0
+        # Metrics
+        self.tasks_completed = 0
+        self.tasks_failed = 0
+        self.total_assigned_distance = 0.0
+        self.latencies = []  # Wall seconds per assignment round
+        self.queue_waits = []  # Ticks from submission to assignment
+        self.completion_ticks = []  # Ticks from submission to dropoff, per completed task
+        simulator.dispatcher = self
+        simulator.add_observer(self.on_tick)
+
+    def submit(self, pickup, dropoff=None):
+        """Queue one task, returns its Task record"""
+        return self.submit_many([(pickup, dropoff)])[0]
+
+    def submit_many(self, goals):
+        """Queue (pickup, dropoff) pairs in bulk; dropoff may be None"""
+        vertex_count = len(self.graph.vertices)
+        now = self.simulator.tick_count
+        tasks = []
+        for pickup, dropoff in goals:
+            if not 0 <= pickup < vertex_count or (dropoff is not None and not 0 <= dropoff < vertex_count):
+                raise ValueError(f"Task ({pickup}, {dropoff}) refers to a vertex outside the graph")
+            task = Task(self.tasks_submitted, pickup, dropoff, now)
+            self.tasks_submitted += 1
+            self.queue[task.id] = task
+            tasks.append(task)
+        return tasks
+
+    def cancel(self, task):
+        """Drop a task that has not been assigned yet"""
+        return self.queue.pop(task.id, None) is not None
+
+    def pending(self):
+        return len(self.queue)
+
+    def remove_robot(self, robot):
+        """Put the task of a removed robot back at the front of the queue"""
+        task = self.active.pop(robot.id, None)
+        if task is not None:
+            task.status = Task.STATUS_QUEUED
+            task.robot = None
+            self.queue[task.id] = task
+            self.queue.move_to_end(task.id, last=False)
+
+    def hand_over(self, pairs):
+        """Follow task swaps made by traffic control, pairs of (from robot, to robot)"""
+        moved = [(self.active.pop(giver.id, None), taker) for giver, taker in pairs]
+        for task, taker in moved:
+            if task is not None:
+                task.robot = taker
+                self.active[taker.id] = task
+
+    def state(self):
+        """Copy of the queued and active tasks and the metrics, for a snapshot"""
+        return {
+            'window': self.window,
+            # Queued tasks are unassigned, so their id, vertices and submission tick say it all
+            'queue': [(task.id, task.pickup, task.dropoff, task.submitted_tick) for task in self.queue.values()],
+            'active': [(task.id, task.pickup, task.dropoff, task.status, robot_id, task.submitted_tick,
+                        task.assigned_tick, task.completed_tick) for robot_id, task in self.active.items()],
+            'counters': (self.tasks_submitted, self.tasks_completed, self.tasks_failed,
+                         self.total_assigned_distance),
+            'latencies': list(self.latencies),
+            'queue_waits': list(self.queue_waits),
+            'completion_ticks': list(self.completion_ticks),
+        }
+
+    def restore(self, state):
+        """Take over the tasks and metrics of a state() copy"""
+        robots = {robot.id: robot for robot in self.simulator.robots}
+
+        self.window = state['window']
+        self.queue = OrderedDict((task_id, Task(task_id, pickup, dropoff, submitted))
+                                 for task_id, pickup, dropoff, submitted in state['queue'])
+        self.active = {}
+        for task_id, pickup, dropoff, status, robot_id, submitted, assigned, completed in state['active']:
+            task = Task(task_id, pickup, dropoff, submitted)
+            task.status = status
+            task.robot = robots[robot_id]
+            task.assigned_tick = assigned
+            task.completed_tick = completed
+            self.active[robot_id] = task
+        (self.tasks_submitted, self.tasks_completed, self.tasks_failed,
+         self.total_assigned_distance) = state['counters']
+        self.latencies = list(state['latencies'])
+        self.queue_waits = list(state['queue_waits'])
+        self.completion_ticks = list(state['completion_ticks'])
+
+    def on_tick(self, simulator):
+        free = []
+        for robot in simulator.idle_robots():
+            task = self.active.get(robot.id)
+            if task is None:
+                free.append(robot)
+            elif not self._advance(robot, task):
+                free.append(robot)
+        if free and self.queue:
+            self.dispatch(free)
+
+    def _vertex_of(self, robot):
+        return self.simulator.nearest_vertex(robot.x, robot.y)
+
+    def _advance(self, robot, task):
+        """Move a robot's task on by one leg, returns False once the robot is free"""
+        here = self._vertex_of(robot)
+        if here == task.target:
+            if task.status == Task.STATUS_TO_PICKUP and task.dropoff not in (None, here):
+                if math.isinf(self.graph.distance(here, task.dropoff)):
+                    self._finish(robot, task, Task.STATUS_FAILED)
+                    return False
+                task.status = Task.STATUS_TO_DROPOFF
+            else:
+                self._finish(robot, task, Task.STATUS_DONE)
+                return False
+        # Start the next leg, or re-send the current one after a detour
+        self.simulator.assign_task(robot, task.target)
+        return True
+
+    def _finish(self, robot, task, status):
+        del self.active[robot.id]
+        task.status = status
+        task.completed_tick = self.simulator.tick_count
+        if status == Task.STATUS_DONE:
+            self.tasks_completed += 1
+            self.completion_ticks.append(task.completed_tick - task.submitted_tick)
+        else:
+            self.tasks_failed += 1
+
+    def dispatch(self, robots):
+        """Assign queued tasks to the given idle robots, returns the number assigned"""
+        with profiler.phase('dispatch'):
+            return self._dispatch(robots)
+
+    def _dispatch(self, robots):
+        start = time.perf_counter()
+        candidates = []
+        for task in self.queue.values():
+            candidates.append(task)
+            if len(candidates) >= self.window:
+                break
+        origins = [self._vertex_of(robot) for robot in robots]
+        pickups = [task.pickup for task in candidates]
+        cost = self.graph.distance_matrix(origins, pickups)
+        rows, cols = solve_assignment(np.where(np.isfinite(cost), cost, UNREACHABLE_COST))
+        reachable = cost[rows, cols] < UNREACHABLE_COST
+        rows, cols = rows[reachable], cols[reachable]
+
+        now = self.simulator.tick_count
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            robot, task = robots[row], candidates[col]
+            del self.queue[task.id]
+            task.status = Task.STATUS_TO_PICKUP
+            task.robot = robot
+            task.assigned_tick = now
+            self.active[robot.id] = task
+            self.queue_waits.append(now - task.submitted_tick)
+            self.total_assigned_distance += float(cost[row, col])
+            self.simulator.assign_task(robot, task.pickup)
+        self.latencies.append(time.perf_counter() - start)
+        return len(rows)
+
+    def report(self):
+        """Summary of dispatch activity and assignment latency"""
+        latencies = np.asarray(self.latencies) * 1000
+        waits = np.asarray(self.queue_waits)
+        completions = np.asarray(self.completion_ticks)
+        return {
+            'submitted': self.tasks_submitted,
+            'queued': len(self.queue),
+            'active': len(self.active),
+            'completed': self.tasks_completed,
+            'failed': self.tasks_failed,
+            'rounds': len(latencies),
+            'latency_mean_ms': float(latencies.mean()) if len(latencies) else 0.0,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            'latency_max_ms': float(latencies.max()) if len(latencies) else 0.0,
+            'queue_wait_mean_ticks': float(waits.mean()) if len(waits) else 0.0,
+            'completion_mean_ticks': float(completions.mean()) if len(completions) else 0.0,
+            'completion_p95_ticks': float(np.percentile(completions, 95)) if len(completions) else 0.0,
+            'assigned_distance': self.total_assigned_distance,
+        }
@@ -0,0 +1,381 @@
+import copy
+import gzip
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.models.charging import ChargingScheduler
+from src.models.fleet_state import STATUS_FREE, STATUS_NAMES, IDLE
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+
+# Bump when the meaning of logged events changes
+LOG_FORMAT = 1
+
+# Logged inputs: replaying these into an identically configured simulator reproduces a run
+INPUT_EVENTS = ("spawn", "assign", "remove")
+
+def _open_log(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class EventLog:
+    """Append-only JSON-lines event log, written in batches.
+
+    append() only adds the event to an in-memory batch. Once ``batch_size``
+    events have gathered, or on flush(), the batch is handed to a background
+    writer thread that does the JSON encoding and the file I/O, so the tick
+    loop never waits on the disk. With ``background=False`` batches are written
+    inline instead. Paths ending in ``.gz`` are gzip-compressed.
+    """
+
+    def __init__(self, path, batch_size=4096, background=True):
+        self.path = path
+        self.batch_size = batch_size
+        self.events_written = 0
+        self._batch = []
+        self._file = _open_log(path, "w")
+        self._error = None  # First error raised by the writer thread
+        self._queue = None
+        self._thread = None
+        if background:
+            # Bounded, so a stalled disk slows the producer down instead of filling memory
+            self._queue = queue.Queue(maxsize=64)
+            self._thread = threading.Thread(target=self._writer, name="event-log-writer", daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, event):
+        self._batch.append(event)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Hand every pending event to the writer"""
+        if self._error is not None:
+            raise self._error
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        if self._queue is None:
+            self._write(batch)
+        else:
+            self._queue.put(batch)
+
+    def _write(self, batch):
+        self._file.write("".join(json.dumps(event, separators=(",", ":")) + "\n" for event in batch))
+        self.events_written += len(batch)
+
+    def _writer(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is None:
+                try:
+                    self._write(batch)
+                except (OSError, TypeError, ValueError) as e:
+                    # Keep draining the queue so the producer never blocks; flush() re-raises
+                    self._error = e
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+            self._file.close()
+            self._file = None
+        if self._error is not None:
+            raise self._error
+
+
+def read_events(path):
+    """Yield the events of a log in order; a torn last line (from a crash) is skipped"""
+    with _open_log(path, "r") as file:
+        pending = None
+        for line in file:
+            if pending is not None:
+                yield json.loads(pending)
+            pending = line
+        if pending is not None:
+            try:
+                yield json.loads(pending)
+            except json.JSONDecodeError:
+                print(f"Ignoring truncated last event in {path}")
+
+
+class EventRecorder:
+    """Records a simulator's inputs and its robots' status transitions.
+
+    Spawns, task assignments and removals are logged as they are made, tagged
+    with the tick count at the time. After every tick the fleet's status array
+    is diffed against the previous tick and each transition is logged with the
+    robot's position, and every ``snapshot_every`` ticks the position and status
+    of every robot is logged and the log flushed. Recording has to start before
+    the first robot is spawned.
+    """
+
+    def __init__(self, simulator, log, snapshot_every=600):
+        if simulator.robots:
+            raise ValueError("Recording has to start before any robot is spawned")
+        self.simulator = simulator
+        self.log = log
+        self.snapshot_every = snapshot_every
+        self.last_status = np.full(0, STATUS_FREE, dtype=np.int8)  # Per fleet slot
+        graph = simulator.graph
+        log.append({
+            "e": "header",
+            "format": LOG_FORMAT,
+            "created": time.time(),
+            "graph": graph.source.path,
+            "level": graph.level,
+            "directed": graph.directed,
+            "tick_interval": simulator.tick_interval,
+            "robot_speed": simulator.robot_speed,
+            "traffic": simulator.traffic.settings() if simulator.traffic is not None else None,
+            "charging": simulator.charging.settings() if simulator.charging is not None else None,
+            "start_tick": simulator.tick_count,
+            "sim_time": simulator.sim_time,
+        })
+        simulator.recorder = self
+        simulator.add_observer(self.on_tick)
+
+    def _ensure_capacity(self, size):
+        missing = size - len(self.last_status)
+        if missing > 0:
+            grow = max(missing, len(self.last_status))
+            self.last_status = np.concatenate([self.last_status, np.full(grow, STATUS_FREE, dtype=np.int8)])
+
+    def on_spawn(self, robot):
+        self._ensure_capacity(robot.slot + 1)
+        self.last_status[robot.slot] = IDLE
+        self.log.append({"t": self.simulator.tick_count, "e": "spawn", "robot": robot.id,
+                         "x": robot.x, "y": robot.y})
+
+    def on_assign(self, robot, destination_vertex, route=None):
+        vertex = int(destination_vertex) if destination_vertex is not None else None
+        event = {"t": self.simulator.tick_count, "e": "assign", "robot": robot.id, "vertex": vertex}
+        if route is not None:
+            event["route"] = [int(v) for v in route]
+        self.log.append(event)
+
+    def on_remove(self, robot):
+        self.last_status[robot.slot] = STATUS_FREE
+        self.log.append({"t": self.simulator.tick_count, "e": "remove", "robot": robot.id})
+
+    def on_tick(self, simulator):
+        fleet = simulator.fleet
+        n = fleet.size
+        self._ensure_capacity(n)
+        status = fleet.status[:n]
+        changed = np.flatnonzero(status != self.last_status[:n])
+        if len(changed):
+            now = simulator.tick_count
+            views = fleet.views
+            for slot, old, new in zip(changed.tolist(), self.last_status[changed].tolist(),
+                                      status[changed].tolist()):
+                self.log.append({"t": now, "e": "status", "robot": views[slot].id,
+                                 "from": STATUS_NAMES[old], "to": STATUS_NAMES[new],
+                                 "x": float(fleet.x[slot]), "y": float(fleet.y[slot])})
+            self.last_status[:n] = status
+        if simulator.tick_count % self.snapshot_every == 0:
+            self.snapshot()
+            self.log.flush()
+
+    def snapshot(self):
+        """Log the position and status code of every robot"""
+        simulator = self.simulator
+        fleet = simulator.fleet
+        slots = [robot.slot for robot in simulator.robots]
+        self.log.append({"t": simulator.tick_count, "e": "snapshot",
+                         "robots": [robot.id for robot in simulator.robots],
+                         "x": fleet.x[slots].tolist(), "y": fleet.y[slots].tolist(),
+                         "status": fleet.status[slots].tolist()})
+
+    def close(self):
+        """Log a final snapshot, stop recording and close the log"""
+        self.snapshot()
+        self.log.append({"t": self.simulator.tick_count, "e": "end"})
+        self.simulator.remove_observer(self.on_tick)
+        self.simulator.recorder = None
+        self.log.close()
+
+
+class Replay:
+    """Re-drives a simulator from an event log.
+
+    The header rebuilds an identically configured simulator (same graph, tick
+    length, speed, traffic and charging settings) and the logged inputs are applied at
+    the ticks they were recorded at, so the run unfolds exactly as it did live.
+    Logged snapshots are checked along the way and ticks where the replay no
+    longer matches end up in ``divergences``. Every ``checkpoint_every`` ticks a
+    full in-memory copy of the simulator is kept; seek() to any tick restores
+    the nearest checkpoint before it and simulates forward from there, which
+    replaces ``simulator`` with a new object.
+    """
+
+    def __init__(self, path, graph=None, checkpoint_every=600):
+        events = read_events(path)
+        header = next(events, None)
+        if header is None or header.get("e") != "header":
+            raise ValueError(f"{path} is not a fleet event log")
+        if header["format"] != LOG_FORMAT:
+            raise ValueError(f"{path} has event log format {header['format']}, expected {LOG_FORMAT}")
+        self.path = path
+        self.header = header
+        if graph is None:
+            graph = NavGraph(header["graph"], precompute=True, level=header["level"],
+                             directed=header["directed"])
+        self.graph = graph
+        self.start_tick = header["start_tick"]
+        self.end_tick = self.start_tick
+        self.inputs = {}  # tick -> input events applied once that tick is reached
+        self.snapshots = {}  # tick -> (snapshot event, number of that tick's inputs logged before it)
+        self.transitions = []  # Logged status events, for inspection
+        for event in events:
+            kind, tick = event["e"], event["t"]
+            if kind in INPUT_EVENTS:
+                self.inputs.setdefault(tick, []).append(event)
+            elif kind == "snapshot":
+                self.snapshots[tick] = (event, len(self.inputs.get(tick, ())))
+            elif kind == "status":
+                self.transitions.append(event)
+            self.end_tick = max(self.end_tick, tick)
+
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = {}  # tick -> simulator copy
+        self.divergences = []  # Ticks whose logged snapshot did not match the replay
+        self.simulator = FleetSimulator(graph, tick_interval=header["tick_interval"],
+                                        robot_speed=header["robot_speed"],
+                                        traffic_manager=self._traffic_manager())
+        self.simulator.tick_count = self.start_tick
+        self.simulator.sim_time = header["sim_time"]
+        if header.get("charging") is not None:
+            # Charging decisions are not logged; the scheduler makes them again
+            ChargingScheduler(self.simulator, **header["charging"])
+        self.robots = {}  # logged robot id -> robot
+        self._apply_tick()
+
+    def _traffic_manager(self):
+        settings = self.header["traffic"]
+        return TrafficManager(**settings) if settings is not None else None
+
+    @property
+    def finished(self):
+        return self.simulator.tick_count >= self.end_tick
+
+    def step(self):
+        """Advance one tick, returns the input events applied after it"""
+        self.simulator.tick()
+        return self._apply_tick()
+
+    def _apply_tick(self):
+        tick = self.simulator.tick_count
+        inputs = self.inputs.get(tick, [])
+        snapshot, before = self.snapshots.get(tick, (None, 0))
+        for event in inputs[:before]:
+            self._apply(event)
+        if snapshot is not None:
+            self._verify(snapshot)
+        for event in inputs[before:]:
+            self._apply(event)
+        if (tick % self.checkpoint_every == 0 or tick == self.start_tick) and tick not in self.checkpoints:
+            self.checkpoints[tick] = self._copy(self.simulator)
+        return inputs
+
+    def _apply(self, event):
+        kind = event["e"]
+        if kind == "spawn":
+            self.robots[event["robot"]] = self.simulator.spawn_robot(event["x"], event["y"])
+            return
+        robot = self.robots.get(event["robot"])
+        if robot is None:
+            self._diverged()
+        elif kind == "assign":
+            if "route" in event:
+                self.simulator.assign_route(robot, event["route"])
+            else:
+                self.simulator.assign_task(robot, event["vertex"])
+        elif kind == "remove":
+            self.simulator.remove_robot(robot)
+            del self.robots[event["robot"]]
+
+    def _verify(self, snapshot):
+        robots = [self.robots.get(robot_id) for robot_id in snapshot["robots"]]
+        if any(robot is None for robot in robots) or len(robots) != len(self.robots):
+            self._diverged()
+            return
+        fleet = self.simulator.fleet
+        slots = [robot.slot for robot in robots]
+        if (not np.allclose(fleet.x[slots], snapshot["x"], atol=1e-6)
+                or not np.allclose(fleet.y[slots], snapshot["y"], atol=1e-6)
+                or not np.array_equal(fleet.status[slots], snapshot["status"])):
+            self._diverged()
+
+    def _diverged(self):
+        tick = self.simulator.tick_count
+        if not self.divergences or self.divergences[-1] != tick:
+            self.divergences.append(tick)
+
+    def _copy(self, simulator):
+        # The graph, vertex and charger lookups are shared; observers belong to whoever
+        # watches the copy, apart from the charging scheduler that is part of the simulation
+        memo = {id(self.graph): self.graph,
+                id(simulator.vertex_index): simulator.vertex_index,
+                id(simulator.vertex_positions): simulator.vertex_positions,
+                id(simulator.observers): []}
+        charging = simulator.charging
+        if charging is not None:
+            memo[id(charging.charger_distance)] = charging.charger_distance
+            memo[id(charging.nearest_charger)] = charging.nearest_charger
+        duplicate = copy.deepcopy(simulator, memo)
+        if duplicate.charging is not None:
+            duplicate.observers.insert(0, duplicate.charging.on_tick)
+        return duplicate
+
+    def seek(self, tick):
+        """Move to ``tick`` (clamped to the log), returns True if ``simulator`` was replaced"""
+        tick = max(self.start_tick, min(tick, self.end_tick))
+        now = self.simulator.tick_count
+        restore = max((t for t in self.checkpoints if t <= tick), default=None)
+        replaced = False
+        if tick < now or (restore is not None and restore > now):
+            if restore is None:
+                raise ValueError(f"No checkpoint at or before tick {tick}")
+            self.simulator = self._copy(self.checkpoints[restore])
+            self.robots = {robot.id: robot for robot in self.simulator.robots}
+            replaced = True
+        while self.simulator.tick_count < tick:
+            self.step()
+        return replaced
+
+    def run(self, speed=None):
+        """Replay to the end of the log, in real time scaled by ``speed`` or as fast as possible.
+
+        Returns the wall-clock seconds spent.
+        """
+        start = time.perf_counter()
+        next_deadline = start
+        while not self.finished:
+            self.step()
+            if speed:
+                next_deadline += self.simulator.tick_interval / speed
+                delay = next_deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return time.perf_counter() - start
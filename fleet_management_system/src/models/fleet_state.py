@@ -0,0 +1,465 @@
+import numpy as np
+
+from src.models.robot import Robot, WAIT_EPSILON
+
+# Status codes stored in FleetState.status; index into STATUS_NAMES
+STATUS_FREE = -1  # Slot not in use
+STATUS_NAMES = [
+    Robot.STATUS_IDLE,
+    Robot.STATUS_MOVING,
+    Robot.STATUS_WAITING,
+    Robot.STATUS_CHARGING,
+    Robot.STATUS_COMPLETE,
+]
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+IDLE, MOVING, WAITING, CHARGING, COMPLETE = range(len(STATUS_NAMES))
+
+NO_VERTEX = -1
+
+class FleetState:
+    """Array-backed robot store that advances the whole fleet in one vectorized step.
+
+    Every robot owns one slot in a set of contiguous NumPy arrays. Paths live in
+    a shared point buffer; each robot keeps an offset, a length and the index of
+    the segment it is currently driving, so consuming a waypoint is an integer
+    increment instead of ``list.pop(0)``.
+
+    Speeds are in world units per second and step() advances by ``dt`` seconds,
+    driving through as many waypoints as the distance allows. ``last_x``/``last_y``
+    keep each robot's position from before the latest step for interpolation.
+    """
+
+    def __init__(self, capacity=64):
+        self.size = 0  # Slots in use or freed (high-water mark)
+        self.free_slots = []
+        self.views = []
+        self.robot_count = 0
+        self._allocate(capacity)
+        self.path_points = np.zeros((256, 2), dtype=np.float64)
+        self.path_used = 0
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.prev_x = np.full(capacity, np.nan)  # previous_location, NaN when unset
+        self.prev_y = np.full(capacity, np.nan)
+        self.last_x = np.zeros(capacity, dtype=np.float64)  # Position before the latest step
+        self.last_y = np.zeros(capacity, dtype=np.float64)
+        self.spawn_x = np.zeros(capacity, dtype=np.float64)
+        self.spawn_y = np.zeros(capacity, dtype=np.float64)
+        self.speed = np.zeros(capacity, dtype=np.float64)  # World units per second
+        self.battery = np.zeros(capacity, dtype=np.float64)  # Charge fraction, 1.0 is full
+        self.odometer = np.zeros(capacity, dtype=np.float64)  # Total distance driven
+        self.step_distance = np.zeros(capacity, dtype=np.float64)  # Distance driven in the latest step
+        self.status = np.full(capacity, STATUS_FREE, dtype=np.int8)
+        self.previous_status = np.full(capacity, STATUS_FREE, dtype=np.int8)
+        self.wait_time = np.zeros(capacity, dtype=np.float64)  # Seconds left to wait
+        self.path_offset = np.zeros(capacity, dtype=np.int64)
+        self.path_len = np.zeros(capacity, dtype=np.int32)
+        self.path_index = np.zeros(capacity, dtype=np.int32)
+        self.original_path_length = np.zeros(capacity, dtype=np.int32)
+        self.current_vertex = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.destination_vertex = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.source_vertex = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.initial_location = np.full(capacity, NO_VERTEX, dtype=np.int32)
+        self.has_moved_from_spawn = np.zeros(capacity, dtype=bool)
+        self.has_completed_first_move = np.zeros(capacity, dtype=bool)
+
+    ARRAY_FIELDS = (
+        'x', 'y', 'prev_x', 'prev_y', 'last_x', 'last_y', 'spawn_x', 'spawn_y', 'speed',
+        'battery', 'odometer', 'step_distance', 'status',
+        'previous_status', 'wait_time', 'path_offset', 'path_len', 'path_index',
+        'original_path_length', 'current_vertex', 'destination_vertex',
+        'source_vertex', 'initial_location', 'has_moved_from_spawn',
+        'has_completed_first_move',
+    )
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+        old_capacity = self.capacity
+        self._allocate(old_capacity * 2)
+        for name, values in old.items():
+            getattr(self, name)[:old_capacity] = values
+
+    def add_robot(self, x, y, speed=Robot.DEFAULT_SPEED):
+        """Allocate a slot for a new robot and return its RobotView"""
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            slot = self.size
+            self.size += 1
+            self.views.append(None)
+
+        self.x[slot] = self.spawn_x[slot] = self.last_x[slot] = x
+        self.y[slot] = self.spawn_y[slot] = self.last_y[slot] = y
+        self.prev_x[slot] = self.prev_y[slot] = np.nan
+        self.speed[slot] = speed
+        self.battery[slot] = 1.0
+        self.odometer[slot] = self.step_distance[slot] = 0.0
+        self.status[slot] = self.previous_status[slot] = IDLE
+        self.wait_time[slot] = 0
+        self.path_offset[slot] = self.path_len[slot] = self.path_index[slot] = 0
+        self.original_path_length[slot] = 0
+        self.current_vertex[slot] = self.destination_vertex[slot] = NO_VERTEX
+        self.source_vertex[slot] = self.initial_location[slot] = NO_VERTEX
+        self.has_moved_from_spawn[slot] = False
+        self.has_completed_first_move[slot] = False
+
+        self.robot_count += 1
+        view = RobotView(self, slot, f"R{self.robot_count}")
+        self.views[slot] = view
+        return view
+
+    def remove_robot(self, view):
+        slot = view.slot
+        self.status[slot] = STATUS_FREE
+        self.path_len[slot] = 0
+        self.views[slot] = None
+        self.free_slots.append(slot)
+
+    def state(self):
+        """Copies of the live slots and path buffer, for a snapshot; see restore()"""
+        n = self.size
+        return {
+            'arrays': {name: getattr(self, name)[:n].copy() for name in self.ARRAY_FIELDS},
+            'path_points': self.path_points[:self.path_used].copy(),
+            'ids': [None if view is None else view.id for view in self.views],
+            'free_slots': list(self.free_slots),
+            'robot_count': self.robot_count,
+        }
+
+    def restore(self, state):
+        """Replace every robot with those of a state() copy, keeping their slots and ids.
+
+        ``robot_count`` comes back too, so robots spawned afterwards carry on the
+        numbering instead of reusing ids.
+        """
+        ids = state['ids']
+        size = len(ids)
+        self._allocate(max(64, size))
+        for name, values in state['arrays'].items():
+            getattr(self, name)[:size] = values
+        points = state['path_points']
+        self.path_points = np.zeros((max(256, 2 * len(points)), 2), dtype=np.float64)
+        self.path_points[:len(points)] = points
+        self.path_used = len(points)
+        self.size = size
+        self.free_slots = list(state['free_slots'])
+        self.robot_count = state['robot_count']
+        self.views = [None if robot_id is None else RobotView(self, slot, robot_id)
+                      for slot, robot_id in enumerate(ids)]
+
+    def robots_with_status(self, status):
+        """RobotViews whose status equals the given Robot.STATUS_* name"""
+        slots = np.flatnonzero(self.status[:self.size] == STATUS_CODES[status])
+        return [self.views[slot] for slot in slots]
+
+    def set_path(self, slot, points):
+        """Copy a list of (x, y) waypoints into the shared path buffer"""
+        count = len(points)
+        if self.path_used + count > len(self.path_points):
+            self._compact_paths(count)
+        start = self.path_used
+        if count:
+            self.path_points[start:start + count] = points
+        self.path_used += count
+        self.path_offset[slot] = start
+        self.path_len[slot] = count
+        self.path_index[slot] = 0
+
+    def _compact_paths(self, extra):
+        """Drop consumed waypoints, growing the buffer if still too small"""
+        live = np.flatnonzero(self.path_index[:self.size] < self.path_len[:self.size])
+        remaining = self.path_len[live] - self.path_index[live]
+        needed = int(remaining.sum()) + extra
+        capacity = len(self.path_points)
+        while capacity < 2 * needed:
+            capacity *= 2
+        new_points = np.zeros((capacity, 2), dtype=np.float64)
+        cursor = 0
+        for slot, count in zip(live, remaining):
+            start = self.path_offset[slot] + self.path_index[slot]
+            new_points[cursor:cursor + count] = self.path_points[start:start + count]
+            self.path_offset[slot] = cursor
+            self.path_len[slot] = count
+            self.path_index[slot] = 0
+            cursor += count
+        # Finished robots keep an empty path
+        done = np.ones(self.size, dtype=bool)
+        done[live] = False
+        self.path_len[:self.size][done] = 0
+        self.path_index[:self.size][done] = 0
+        self.path_points = new_points
+        self.path_used = cursor
+
+    def remaining_path(self, slot):
+        start = self.path_offset[slot] + self.path_index[slot]
+        end = self.path_offset[slot] + self.path_len[slot]
+        return [tuple(point) for point in self.path_points[start:end].tolist()]
+
+    def step(self, dt=1.0, slots=None):
+        """Advance every robot by dt seconds, equivalent to calling Robot.update(dt) on each.
+
+        ``slots`` limits the step to those fleet slots. Returns the slots that
+        reached the end of their path during this step.
+        """
+        n = self.size
+        self._completed = []
+        stepped = slice(0, n) if slots is None else slots
+        self.last_x[stepped] = self.x[stepped]
+        self.last_y[stepped] = self.y[stepped]
+        self.step_distance[stepped] = 0.0
+        status = self.status[:n]
+        moving = status == MOVING
+        waiting = status == WAITING
+        complete = status == COMPLETE
+        if slots is not None:
+            selected = np.zeros(n, dtype=bool)
+            selected[slots] = True
+            moving &= selected
+            waiting &= selected
+            complete &= selected
+
+        # Moving robots
+        if moving.any():
+            self._step_moving(np.flatnonzero(moving), dt)
+
+        # Waiting robots count down, then resume moving
+        if waiting.any():
+            wait = self.wait_time[:n]
+            counting = waiting & (wait > WAIT_EPSILON)
+            wait[counting] -= dt
+            resume = waiting & ~counting
+            self.previous_status[:n][resume] = WAITING
+            status[resume] = MOVING
+
+        # Completed robots go idle on the following update
+        if complete.any():
+            self.destination_vertex[:n][complete] = NO_VERTEX
+            self.previous_status[:n][complete] = COMPLETE
+            status[complete] = IDLE
+
+        if not self._completed:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(self._completed)
+
+    def _step_moving(self, slots, dt):
+        has_path = self.path_index[slots] < self.path_len[slots]
+
+        # Moving with an exhausted path completes immediately
+        finished = slots[~has_path]
+        if len(finished):
+            self._complete(finished)
+
+        slots = slots[has_path]
+        if not len(slots):
+            return
+        start_x = self.x[slots]
+        start_y = self.y[slots]
+        budget = self.speed[slots] * dt
+        step = budget.copy()  # Full distance of this step, for the spawn check
+
+        # Each pass moves every robot still holding distance to its next waypoint;
+        # robots that reach it consume it and go round again with what is left
+        active = np.arange(len(slots))
+        while len(active):
+            robots = slots[active]
+            target = self.path_points[self.path_offset[robots] + self.path_index[robots]]
+            x = self.x[robots]
+            y = self.y[robots]
+            dx = target[:, 0] - x
+            dy = target[:, 1] - y
+            distance = np.sqrt(dx * dx + dy * dy)
+            arrive = distance <= budget[active]
+
+            # Robots that fall short stop partway along the segment
+            travel = ~arrive
+            if travel.any():
+                cruising = robots[travel]
+                left = budget[active[travel]]
+                new_x = x[travel] + (dx[travel] / distance[travel]) * left
+                new_y = y[travel] + (dy[travel] / distance[travel]) * left
+                self.x[cruising] = new_x
+                self.y[cruising] = new_y
+                reach = step[active[travel]]
+                left_spawn = ((np.abs(new_x - self.spawn_x[cruising]) > reach)
+                              | (np.abs(new_y - self.spawn_y[cruising]) > reach))
+                self.has_moved_from_spawn[cruising[left_spawn]] = True
+                budget[active[travel]] = 0.0
+
+            # The rest land on their waypoint and consume it
+            arrived_at = active[arrive]
+            if not len(arrived_at):
+                break
+            arrived = robots[arrive]
+            budget[arrived_at] -= distance[arrive]
+            self.prev_x[arrived] = start_x[arrived_at]
+            self.prev_y[arrived] = start_y[arrived_at]
+            self.x[arrived] = target[arrive, 0]
+            self.y[arrived] = target[arrive, 1]
+            left_spawn = (self.x[arrived] != self.spawn_x[arrived]) | (self.y[arrived] != self.spawn_y[arrived])
+            self.has_moved_from_spawn[arrived[left_spawn]] = True
+            self.path_index[arrived] += 1
+            more = self.path_index[arrived] < self.path_len[arrived]
+            exhausted = arrived[~more]
+            if len(exhausted):
+                self._complete(exhausted)
+            active = arrived_at[more]
+
+        driven = step - budget
+        self.step_distance[slots] = driven
+        self.odometer[slots] += driven
+
+    def _complete(self, slots):
+        self.previous_status[slots] = MOVING
+        self.status[slots] = COMPLETE
+        self.has_completed_first_move[slots] = True
+        self._completed.append(slots)
+
+
+def _vertex_or_none(value):
+    value = int(value)
+    return None if value == NO_VERTEX else value
+
+def _vertex_field(name):
+    def getter(self):
+        return _vertex_or_none(getattr(self.fleet, name)[self.slot])
+
+    def setter(self, value):
+        getattr(self.fleet, name)[self.slot] = NO_VERTEX if value is None else value
+
+    return property(getter, setter)
+
+def _float_field(name):
+    def getter(self):
+        return float(getattr(self.fleet, name)[self.slot])
+
+    def setter(self, value):
+        getattr(self.fleet, name)[self.slot] = value
+
+    return property(getter, setter)
+
+def _status_field(name):
+    def getter(self):
+        return STATUS_NAMES[getattr(self.fleet, name)[self.slot]]
+
+    def setter(self, value):
+        getattr(self.fleet, name)[self.slot] = STATUS_CODES[value]
+
+    return property(getter, setter)
+
+def _bool_field(name):
+    def getter(self):
+        return bool(getattr(self.fleet, name)[self.slot])
+
+    def setter(self, value):
+        getattr(self.fleet, name)[self.slot] = value
+
+    return property(getter, setter)
+
+
+class RobotView(Robot):
+    """Robot API backed by one FleetState slot, so the GUI keeps working unchanged"""
+
+    x = _float_field('x')
+    y = _float_field('y')
+    spawn_x = _float_field('spawn_x')
+    spawn_y = _float_field('spawn_y')
+    speed = _float_field('speed')
+    wait_time = _float_field('wait_time')
+    battery = _float_field('battery')
+    odometer = _float_field('odometer')
+    status = _status_field('status')
+    previous_status = _status_field('previous_status')
+    current_vertex = _vertex_field('current_vertex')
+    destination_vertex = _vertex_field('destination_vertex')
+    source_vertex = _vertex_field('source_vertex')
+    initial_location = _vertex_field('initial_location')
+    has_moved_from_spawn = _bool_field('has_moved_from_spawn')
+    has_completed_first_move = _bool_field('has_completed_first_move')
+
+    def __init__(self, fleet, slot, robot_id):
+        # Deliberately skips Robot.__init__: all state lives in the fleet arrays
+        self.fleet = fleet
+        self.slot = slot
+        self.id = robot_id
+
+    @property
+    def original_path_length(self):
+        return int(self.fleet.original_path_length[self.slot])
+
+    @original_path_length.setter
+    def original_path_length(self, value):
+        self.fleet.original_path_length[self.slot] = value
+
+    @property
+    def previous_location(self):
+        px = self.fleet.prev_x[self.slot]
+        if np.isnan(px):
+            return None
+        return (float(px), float(self.fleet.prev_y[self.slot]))
+
+    @property
+    def path(self):
+        """Remaining waypoints (a copy; assign a new path with assign_task)"""
+        return self.fleet.remaining_path(self.slot)
+
+    def assign_task(self, destination_vertex, path=None):
+        """Assign a navigation task to the robot"""
+        self.destination_vertex = destination_vertex
+        self.previous_status = self.status
+        self.status = self.STATUS_MOVING
+        if path:
+            self.fleet.set_path(self.slot, path)
+            # Path length is number of edges (vertices - 1)
+            self.original_path_length = len(path) - 1
+            self.source_vertex = self.current_vertex  # Store current vertex as source
+
+    def update(self, dt=1.0):
+        """Advance only this robot by dt seconds; simulators step the whole fleet at once instead"""
+        self.fleet.step(dt, [self.slot])
+
+
+class ChangeTracker:
+    """Reports which fleet slots moved or changed status since the last poll.
+
+    Keeps its own snapshot of positions and status codes, so several consumers
+    (canvas, side panel, ...) can each track changes at their own pace.
+    """
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self.status = np.empty(0, dtype=np.int8)
+
+    def _ensure_capacity(self, size):
+        missing = size - len(self.x)
+        if missing > 0:
+            grow = max(missing, len(self.x))
+            self.x = np.concatenate([self.x, np.full(grow, np.nan)])
+            self.y = np.concatenate([self.y, np.full(grow, np.nan)])
+            self.status = np.concatenate([self.status, np.full(grow, STATUS_FREE, dtype=np.int8)])
+
+    def reset(self, slot):
+        """Forget what was last seen for slot, so it reports as changed on the next poll"""
+        self._ensure_capacity(slot + 1)
+        self.x[slot] = self.y[slot] = np.nan
+
+    def poll(self):
+        """Return (slots, status_changed) for live slots that changed since the last poll"""
+        fleet = self.fleet
+        n = fleet.size
+        self._ensure_capacity(n)
+        x, y, status = fleet.x[:n], fleet.y[:n], fleet.status[:n]
+        status_changed = status != self.status[:n]
+        changed = (x != self.x[:n]) | (y != self.y[:n]) | status_changed
+        changed &= status != STATUS_FREE
+        slots = np.flatnonzero(changed)
+        self.x[:n] = x
+        self.y[:n] = y
+        self.status[:n] = status
+        return slots, status_changed[slots]
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump when the cached array layout changes so stale caches are rebuilt
+CACHE_FORMAT = 1
+CACHE_DIR_NAME = ".navgraph_cache"
+
+class GraphLevel:
+    """One level of a navigation graph held as arrays.
+
+    ``vertex_xy`` is a (V, 2) float array and ``lanes`` an (E, 2) int array of
+    (start, end) pairs exactly as listed in the file. Every attribute found on
+    vertices or lanes becomes one column aligned with those arrays: booleans
+    default to False, numbers to NaN and anything else to a string.
+    """
+
+    def __init__(self, name, vertex_xy, lanes, vertex_attributes, lane_attributes):
+        self.name = name
+        self.vertex_xy = vertex_xy
+        self.lanes = lanes
+        self.vertex_attributes = vertex_attributes
+        self.lane_attributes = lane_attributes
+
+    def __len__(self):
+        return len(self.vertex_xy)
+
+    @classmethod
+    def from_json(cls, name, level):
+        vertices = level.get("vertices", [])
+        lanes = level.get("lanes", [])
+        vertex_xy = np.array([(v[0], v[1]) for v in vertices], dtype=np.float64).reshape(-1, 2)
+        lane_pairs = np.array([(l[0], l[1]) for l in lanes], dtype=np.int32).reshape(-1, 2)
+        if len(lane_pairs) and (lane_pairs.min() < 0 or lane_pairs.max() >= len(vertex_xy)):
+            raise ValueError(f"Level {name!r} has a lane referring to a missing vertex")
+        vertex_attributes = _attribute_columns([v[2] if len(v) > 2 else {} for v in vertices])
+        vertex_attributes.setdefault("name", np.full(len(vertices), "", dtype=str))
+        lane_attributes = _attribute_columns([l[2] if len(l) > 2 else {} for l in lanes])
+        return cls(name, vertex_xy, lane_pairs, vertex_attributes, lane_attributes)
+
+
+def _attribute_columns(records):
+    """Turn a list of attribute dicts into {key: array} columns"""
+    keys = []
+    for record in records:
+        for key in record:
+            if key not in keys:
+                keys.append(key)
+
+    columns = {}
+    for key in keys:
+        values = [record.get(key) for record in records]
+        present = [v for v in values if v is not None]
+        if all(isinstance(v, bool) for v in present):
+            columns[key] = np.array([bool(v) for v in values], dtype=bool)
+        elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            columns[key] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            columns[key] = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    return columns
+
+
+class GraphFile:
+    """A navigation graph file with every level, backed by a binary cache.
+
+    The first open parses the JSON and writes the arrays of all levels to an
+    uncompressed ``.npz`` next to the source (in ``.navgraph_cache/``), named by
+    the SHA-1 of the file contents. Later opens of an unchanged file skip the
+    JSON entirely; each level's arrays are only read from the archive the first
+    time that level is requested.
+    """
+
+    def __init__(self, path, building_name, level_names, source_hash, loader):
+        self.path = path
+        self.building_name = building_name
+        self.level_names = level_names
+        self.source_hash = source_hash
+        self.from_cache = False
+        self._loader = loader  # level name -> GraphLevel
+        self._levels = {}
+
+    @classmethod
+    def open(cls, path, use_cache=True, cache_dir=None):
+        """Open a graph file, through the binary cache unless use_cache is False"""
+        with open(path, 'rb') as file:
+            raw = file.read()
+        source_hash = hashlib.sha1(raw).hexdigest()
+
+        cache_path = None
+        if use_cache:
+            cache_path = cls.cache_path(path, source_hash, cache_dir)
+            if os.path.exists(cache_path):
+                try:
+                    return cls._from_cache(path, cache_path, source_hash)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Ignoring unreadable graph cache {cache_path}: {e}")
+
+        data = json.loads(raw)
+        if not data.get("levels"):
+            raise KeyError("levels")
+        levels = {name: GraphLevel.from_json(name, level) for name, level in data["levels"].items()}
+        graph_file = cls(path, data.get("building_name", ""), list(levels), source_hash, levels.__getitem__)
+        graph_file._levels = levels
+        if cache_path is not None:
+            graph_file._write_cache(cache_path)
+        return graph_file
+
+    @staticmethod
+    def cache_path(path, source_hash, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+        return os.path.join(cache_dir, f"{os.path.basename(path)}.{source_hash[:16]}.npz")
+
+    @classmethod
+    def _from_cache(cls, path, cache_path, source_hash):
+        archive = np.load(cache_path, allow_pickle=False)
+        if int(archive["format"]) != CACHE_FORMAT or str(archive["source_hash"]) != source_hash:
+            raise ValueError("stale cache")
+        level_names = [str(name) for name in archive["level_names"]]
+        files = set(archive.files)
+
+        def load_level(name):
+            prefix = f"level{level_names.index(name)}/"
+            vertex_attributes, lane_attributes = {}, {}
+            for key in files:
+                if key.startswith(prefix + "vertex_attr/"):
+                    vertex_attributes[key[len(prefix) + 12:]] = archive[key]
+                elif key.startswith(prefix + "lane_attr/"):
+                    lane_attributes[key[len(prefix) + 10:]] = archive[key]
+            return GraphLevel(name, archive[prefix + "vertex_xy"], archive[prefix + "lanes"],
+                              vertex_attributes, lane_attributes)
+
+        graph_file = cls(path, str(archive["building_name"]), level_names, source_hash, load_level)
+        graph_file.from_cache = True
+        return graph_file
+
+    def _write_cache(self, cache_path):
+        arrays = {
+            "format": np.array(CACHE_FORMAT),
+            "source_hash": np.array(self.source_hash),
+            "building_name": np.array(self.building_name),
+            "level_names": np.array(self.level_names, dtype=str),
+        }
+        for i, name in enumerate(self.level_names):
+            level = self._levels[name]
+            arrays[f"level{i}/vertex_xy"] = level.vertex_xy
+            arrays[f"level{i}/lanes"] = level.lanes
+            for key, column in level.vertex_attributes.items():
+                arrays[f"level{i}/vertex_attr/{key}"] = column
+            for key, column in level.lane_attributes.items():
+                arrays[f"level{i}/lane_attr/{key}"] = column
+        # Write to a temporary name first so a crash never leaves a torn cache
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not write graph cache {cache_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def level(self, name=None):
+        """GraphLevel by name (the first level by default), loaded on first access"""
+        if name is None:
+            name = self.level_names[0]
+        if name not in self.level_names:
+            raise KeyError(f"Unknown level {name!r}, expected one of {self.level_names}")
+        if name not in self._levels:
+            self._levels[name] = self._loader(name)
+        return self._levels[name]
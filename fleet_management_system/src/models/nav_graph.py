@@ -1,25 +1,133 @@
-import json
-from collections import deque
+import heapq
+import math
+import time
+
+import numpy as np
+
+from src.models.graph_file import GraphFile
+from src.models.profiler import profiler
+from src.models.route_cache import RouteCache
+from src.models.spatial_index import GridIndex
+
+class VertexList:
+    """Read-only sequence of (x, y, name) tuples over the coordinate arrays"""
+
+    def __init__(self, coords, names):
+        self.coords = coords
+        self.names = names
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __getitem__(self, vertex):
+        x, y = self.coords[vertex].tolist()
+        return (x, y, str(self.names[vertex]))
+
+    def __iter__(self):
+        for (x, y), name in zip(self.coords.tolist(), self.names.tolist()):
+            yield (x, y, name)
+
+
+class LaneList:
+    """Read-only sequence of (start, end) tuples over the lane array"""
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, index):
+        start, end = self.pairs[index].tolist()
+        return (start, end)
+
+    def __iter__(self):
+        for start, end in self.pairs.tolist():
+            yield (start, end)
+
+
+class AdjacencyView:
+    """Mapping-style access to CSR adjacency: view[v] -> [(neighbor, lane length)]"""
+
+    def __init__(self, offsets, neighbors, weights):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __contains__(self, vertex):
+        return 0 <= vertex < len(self)
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __getitem__(self, vertex):
+        start, end = self.offsets[vertex], self.offsets[vertex + 1]
+        return list(zip(self.neighbors[start:end].tolist(), self.weights[start:end].tolist()))
+
 
 class NavGraph:
-    def __init__(self, file_path):
-        self.vertices = []
-        self.lanes = []
-        self.adjacency_list = {}  # For efficient path finding
-        self.load_graph(file_path)
+    """One level of a navigation graph with shortest-path queries.
+
+    Coordinates live in a (V, 2) array and lanes in compressed sparse row form:
+    the lanes leaving vertex v are ``adj_neighbors[adj_offsets[v]:adj_offsets[v + 1]]``
+    with lengths in ``adj_weights``, each listed once. By default every lane can be
+    driven both ways, as before; with ``directed=True`` lanes are one-way as listed
+    in the file. ``vertices``, ``lanes`` and ``adjacency_list`` remain available as
+    read-only views over those arrays.
+
+    Lanes can be blocked or given a cost above their length at runtime. Routes
+    from find_path() are kept in a RouteCache; while any lane is overridden the
+    precomputed all-pairs tables are bypassed, since they only know lengths.
+    Each change drops only the cached routes it can affect.
+    """
+
+    # All-pairs tables take one Dijkstra per vertex and 12 bytes per vertex pair, so
+    # they are only built while both fit these budgets (a few hundred grid vertices);
+    # larger maps route with A* and the route cache instead
+    ALL_PAIRS_MAX_BYTES = 16 * 2**20
+    ALL_PAIRS_MAX_SECONDS = 0.5
+
+    def __init__(self, file_path, precompute=False, level=None, use_cache=True, directed=False,
+                 route_cache_size=4096):
+        self.source = None  # GraphFile holding every level of the map
+        self.level = None  # Name of the level this graph navigates
+        self.directed = directed
+        self.coords = np.empty((0, 2))  # Vertex world coordinates
+        self.vertex_names = np.empty(0, dtype=str)
+        self.lane_pairs = np.empty((0, 2), dtype=np.int32)  # Lanes as listed in the file
+        self.vertex_attributes = {}  # attribute -> array aligned with vertices (is_charger, ...)
+        self.lane_attributes = {}  # attribute -> array aligned with lanes (speed_limit, ...)
+        # CSR adjacency, plus the reversed lanes for searches rooted at a goal
+        self.adj_offsets = self.adj_neighbors = self.adj_weights = None
+        self.rev_offsets = self.rev_neighbors = self.rev_weights = None
+        self.next_hop = None  # All-pairs next-hop table, next_hop[goal][v] is the step from v towards goal
+        self.distances = None  # All-pairs lane-length distances, distances[goal][v]
+        self.lane_overrides = {}  # (a, b) -> routing cost replacing the lane length, inf when blocked
+        self.cost_version = 0  # Bumped by reset_lane_costs(), retiring every cached route at once
+        self.route_cache = RouteCache(route_cache_size)
+        self.load_graph(file_path, level, use_cache)
         self.build_adjacency_list()
+        self.spatial_index = GridIndex.from_points(dict(enumerate(map(tuple, self.coords.tolist()))))
+        if precompute:
+            self.precompute_all_pairs()
 
-    def load_graph(self, file_path):
-        """Load graph data from JSON file"""
+    def load_graph(self, file_path, level=None, use_cache=True):
+        """Load one level (the first by default) of a graph file, via the binary cache"""
         try:
-            with open(file_path, 'r') as file:
-                data = json.load(file)
-                # Get the first available level from the levels dictionary
-                if not data.get("levels"):
-                    raise KeyError("levels")
-                first_level = next(iter(data["levels"].values()))
-                self.vertices = [(v[0], v[1], v[2].get("name", "")) for v in first_level["vertices"]]
-                self.lanes = [(l[0], l[1]) for l in first_level["lanes"]]
+            if isinstance(file_path, GraphFile):
+                self.source = file_path
+            else:
+                self.source = GraphFile.open(file_path, use_cache=use_cache)
+            graph_level = self.source.level(level)
+            self.level = graph_level.name
+            self.coords = np.asarray(graph_level.vertex_xy, dtype=np.float64)
+            self.vertex_names = graph_level.vertex_attributes["name"]
+            self.lane_pairs = np.asarray(graph_level.lanes, dtype=np.int32)
+            self.vertex_attributes = graph_level.vertex_attributes
+            self.lane_attributes = graph_level.lane_attributes
         except FileNotFoundError:
             print(f"Error: Could not find navigation graph file at {file_path}")
             raise
@@ -30,33 +138,395 @@ class NavGraph:
             print(f"Error loading graph file: {e}")
             raise
 
+    @property
+    def vertices(self):
+        return VertexList(self.coords, self.vertex_names)
+
+    @property
+    def lanes(self):
+        return LaneList(self.lane_pairs)
+
+    @property
+    def adjacency_list(self):
+        return AdjacencyView(self.adj_offsets, self.adj_neighbors, self.adj_weights)
+
+    @property
+    def levels(self):
+        return self.source.level_names
+
+    def level_graph(self, level, precompute=False):
+        """NavGraph for another level of the same file, sharing its cache"""
+        return NavGraph(self.source, precompute=precompute, level=level)
+
+    @property
+    def chargers(self):
+        """Vertices flagged with is_charger"""
+        flags = self.vertex_attributes.get("is_charger")
+        return [] if flags is None else np.flatnonzero(flags.astype(bool)).tolist()
+
     def build_adjacency_list(self):
-        """Build adjacency list for efficient path finding"""
-        self.adjacency_list = {i: [] for i in range(len(self.vertices))}
-        for start, end in self.lanes:
-            self.adjacency_list[start].append(end)
-            self.adjacency_list[end].append(start)  # Undirected graph
+        """Build the CSR adjacency arrays, each directed lane listed once"""
+        count = len(self.coords)
+        pairs = self.lane_pairs.astype(np.int64)
+        if not self.directed:
+            pairs = np.concatenate([pairs, pairs[:, ::-1]])
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        # Sorting the packed (start, end) keys groups lanes by start and lines up duplicates
+        keys = np.sort(pairs[:, 0] * count + pairs[:, 1])
+        if len(keys):
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        starts, ends = keys // count, keys % count
+        self.adj_offsets, self.adj_neighbors, self.adj_weights = self._csr(starts, ends, count)
+        if self.directed:
+            order = np.lexsort((starts, ends))
+            self.rev_offsets, self.rev_neighbors, self.rev_weights = \
+                self._csr(ends[order], starts[order], count)
+        else:
+            self.rev_offsets, self.rev_neighbors, self.rev_weights = \
+                self.adj_offsets, self.adj_neighbors, self.adj_weights
+
+    def _csr(self, starts, ends, count):
+        """(offsets, neighbors, weights) for lanes already sorted by start"""
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(starts, minlength=count), out=offsets[1:])
+        delta = self.coords[starts] - self.coords[ends]
+        weights = np.hypot(delta[:, 0], delta[:, 1])
+        return offsets, ends.astype(np.int32), weights
+
+    def neighbors(self, vertex):
+        """(neighbor array, lane length array) of the lanes leaving vertex"""
+        start, end = self.adj_offsets[vertex], self.adj_offsets[vertex + 1]
+        return self.adj_neighbors[start:end], self.adj_weights[start:end]
+
+    def memory_bytes(self):
+        """Bytes held by the coordinate, lane and adjacency arrays"""
+        arrays = {id(a): a for a in (self.coords, self.vertex_names, self.lane_pairs,
+                                     self.adj_offsets, self.adj_neighbors, self.adj_weights,
+                                     self.rev_offsets, self.rev_neighbors, self.rev_weights)}
+        return sum(a.nbytes for a in arrays.values())
+
+    def nearest_vertex(self, x, y):
+        """Vertex closest to world coordinates (x, y)"""
+        return self.spatial_index.nearest(x, y)
+
+    def euclidean_distance(self, a, b):
+        """Straight-line distance between two vertices in world units"""
+        ax, ay = self.coords[a].tolist()
+        bx, by = self.coords[b].tolist()
+        return math.hypot(ax - bx, ay - by)
+
+    def path_length(self, path):
+        """Total lane length along a vertex path"""
+        if not path:
+            return 0.0
+        return sum(self.euclidean_distance(a, b) for a, b in zip(path, path[1:]))
+
+    def path_cost(self, path):
+        """Total routing cost along a vertex path, honouring lane overrides"""
+        if not self.lane_overrides:
+            return self.path_length(path)
+        return sum(self.lane_cost(a, b) for a, b in zip(path, path[1:]))
 
     def find_path(self, start_vertex, end_vertex):
-        """Find shortest path between two vertices using BFS"""
+        """Find shortest path between two vertices by lane cost, through the route cache"""
         if start_vertex is None or end_vertex is None:
             return None
-            
-        # Initialize BFS
-        queue = deque([(start_vertex, [start_vertex])])
-        visited = {start_vertex}
-        
-        while queue:
-            current, path = queue.popleft()
-            
+
+        with profiler.phase('route.find_path'):
+            key = (start_vertex, end_vertex, self.cost_version)
+            hit, path = self.route_cache.get(key)
+            if hit:
+                return path
+            profiler.count('paths_computed')
+            if self._tables_current():
+                path = self.lookup_path(start_vertex, end_vertex)
+            else:
+                path = self.astar(start_vertex, end_vertex)
+            self.route_cache.put(key, path, self.path_cost(path) if path else math.inf)
+            return path
+
+    def _tables_current(self):
+        """Whether the all-pairs tables exist and still match the lane costs"""
+        return self.next_hop is not None and not self.lane_overrides
+
+    def _lane_slots(self, a, b):
+        """CSR positions of lane a -> b in the forward and reverse arrays"""
+        lo, hi = self.adj_offsets[a], self.adj_offsets[a + 1]
+        forward = np.flatnonzero(self.adj_neighbors[lo:hi] == b)
+        if not len(forward):
+            raise ValueError(f"No lane from {a} to {b}")
+        if not self.directed:
+            return lo + forward[0], None
+        lo, hi = self.rev_offsets[b], self.rev_offsets[b + 1]
+        return self.adj_offsets[a] + forward[0], lo + np.flatnonzero(self.rev_neighbors[lo:hi] == a)[0]
+
+    def _set_lane_cost(self, a, b, cost):
+        """Write a lane's routing cost into the CSR arrays and fix up the route cache"""
+        directions = [(a, b)] if self.directed else [(a, b), (b, a)]
+        for start, end in directions:
+            previous = self.lane_cost(start, end)
+            forward, reverse = self._lane_slots(start, end)
+            self.adj_weights[forward] = cost
+            if reverse is not None:
+                self.rev_weights[reverse] = cost
+            if cost == self.euclidean_distance(start, end):
+                self.lane_overrides.pop((start, end), None)
+            else:
+                self.lane_overrides[(start, end)] = cost
+            if cost > previous:
+                # Only routes through this lane can get worse
+                self.route_cache.invalidate_lane(start, end)
+            elif cost < previous:
+                self.route_cache.invalidate_shortcut(self.coords, start, end, cost)
+
+    def lane_cost(self, a, b):
+        """Current routing cost of lane a -> b (inf while blocked)"""
+        cost = self.lane_overrides.get((a, b))
+        return self.euclidean_distance(a, b) if cost is None else cost
+
+    def reset_lane_costs(self):
+        """Reopen every lane at its plain length and retire all cached routes"""
+        for start, end in list(self.lane_overrides):
+            forward, reverse = self._lane_slots(start, end)
+            length = self.euclidean_distance(start, end)
+            self.adj_weights[forward] = length
+            if reverse is not None:
+                self.rev_weights[reverse] = length
+        self.lane_overrides.clear()
+        self.cost_version += 1
+
+    def block_lane(self, a, b):
+        """Close lane a -> b (both directions unless the graph is directed)"""
+        self._set_lane_cost(a, b, math.inf)
+
+    def unblock_lane(self, a, b):
+        """Reopen a blocked lane at its plain length"""
+        self._set_lane_cost(a, b, self.euclidean_distance(a, b))
+
+    def set_lane_cost(self, a, b, cost=None):
+        """Route over lane a -> b as if it were ``cost`` long; None restores its length.
+
+        Costs may not undercut the lane length, so A*'s straight-line heuristic
+        stays admissible.
+        """
+        length = self.euclidean_distance(a, b)
+        if cost is None:
+            cost = length
+        if cost < length:
+            raise ValueError(f"Lane cost {cost} is below the lane length {length}")
+        self._set_lane_cost(a, b, cost)
+
+    def astar(self, start_vertex, end_vertex, blocked=None):
+        """A* search with a straight-line heuristic and parent-pointer reconstruction.
+
+        Vertices in ``blocked`` (other than the goal) are never entered.
+        """
+        # Memoryviews hand back plain Python numbers without per-element NumPy overhead
+        coords = memoryview(self.coords)
+        offsets = memoryview(self.adj_offsets)
+        neighbors = memoryview(self.adj_neighbors)
+        weights = memoryview(self.adj_weights)
+        goal_x, goal_y = coords[end_vertex, 0], coords[end_vertex, 1]
+        hypot = math.hypot
+
+        parents = {start_vertex: None}
+        g_score = {start_vertex: 0.0}
+        closed = set()
+        open_heap = [(hypot(coords[start_vertex, 0] - goal_x, coords[start_vertex, 1] - goal_y), start_vertex)]
+
+        while open_heap:
+            _, current = heapq.heappop(open_heap)
+
             # Check if we reached the destination
             if current == end_vertex:
-                return path
-                
+                return self._reconstruct_path(parents, current)
+            if current in closed:
+                continue  # Stale heap entry
+            closed.add(current)
+
             # Explore neighbors
-            for neighbor in self.adjacency_list[current]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        
+            current_g = g_score[current]
+            lo, hi = offsets[current], offsets[current + 1]
+            for neighbor, length in zip(neighbors[lo:hi], weights[lo:hi]):
+                if blocked and neighbor in blocked and neighbor != end_vertex:
+                    continue
+                tentative_g = current_g + length
+                if tentative_g < g_score.get(neighbor, math.inf):
+                    g_score[neighbor] = tentative_g
+                    parents[neighbor] = current
+                    nx, ny = coords[neighbor, 0], coords[neighbor, 1]
+                    heapq.heappush(open_heap, (tentative_g + hypot(nx - goal_x, ny - goal_y), neighbor))
+
         return None  # No path found
+
+    def _reconstruct_path(self, parents, vertex):
+        """Walk parent pointers back from vertex to the search root"""
+        path = []
+        while vertex is not None:
+            path.append(vertex)
+            vertex = parents[vertex]
+        path.reverse()
+        return path
+
+    def precompute_all_pairs(self):
+        """Build next-hop and distance tables so repeat queries are O(path length).
+
+        Returns False, leaving routing to A*, when the tables would exceed
+        ALL_PAIRS_MAX_BYTES or are estimated to take over ALL_PAIRS_MAX_SECONDS.
+        """
+        count = len(self.coords)
+        if self.lane_overrides:
+            print("Skipping all-pairs precomputation: lane costs are overridden")
+            return False
+        table_bytes = count * count * (np.dtype(np.int32).itemsize + np.dtype(np.float64).itemsize)
+        if table_bytes > self.ALL_PAIRS_MAX_BYTES:
+            return False
+        if not count:
+            return False
+        # Time the first tree to estimate the whole build
+        start = time.perf_counter()
+        first = self._dijkstra_tree(0, reverse=True)
+        if (time.perf_counter() - start) * count > self.ALL_PAIRS_MAX_SECONDS:
+            return False
+
+        next_hop = np.full((count, count), -1, dtype=np.int32)
+        distances = np.full((count, count), np.inf, dtype=np.float64)
+        # A Dijkstra tree over the reversed lanes rooted at the goal gives every
+        # vertex its first step towards that goal
+        for goal in range(count):
+            hops, dist = first if goal == 0 else self._dijkstra_tree(goal, reverse=True)
+            next_hop[goal] = hops
+            distances[goal] = dist
+
+        self.next_hop = next_hop
+        self.distances = distances
+        return True
+
+    def _dijkstra_tree(self, root, reverse=False):
+        """Shortest-path tree rooted at root as (parent array, distance array).
+
+        Follows lanes out of root, or into it with ``reverse`` (distances to root).
+        """
+        count = len(self.coords)
+        if reverse:
+            offsets, neighbors, weights = self.rev_offsets, self.rev_neighbors, self.rev_weights
+        else:
+            offsets, neighbors, weights = self.adj_offsets, self.adj_neighbors, self.adj_weights
+        offsets, neighbors, weights = memoryview(offsets), memoryview(neighbors), memoryview(weights)
+        parents = [-1] * count
+        dist = [math.inf] * count
+        dist[root] = 0.0
+        parents[root] = root
+        heap = [(0.0, root)]
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            lo, hi = offsets[current], offsets[current + 1]
+            for neighbor, length in zip(neighbors[lo:hi], weights[lo:hi]):
+                candidate = d + length
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    parents[neighbor] = current
+                    heapq.heappush(heap, (candidate, neighbor))
+        return parents, dist
+
+    def multi_source_distances(self, sources, reverse=False):
+        """Distance from the nearest of ``sources`` to every vertex, in one Dijkstra.
+
+        With ``reverse`` lanes are followed backwards, giving each vertex's
+        distance to its nearest source instead. Returns (distances, nearest)
+        arrays; nearest is the source reached, -1 where none is reachable.
+        """
+        count = len(self.coords)
+        if reverse:
+            offsets, neighbors, weights = self.rev_offsets, self.rev_neighbors, self.rev_weights
+        else:
+            offsets, neighbors, weights = self.adj_offsets, self.adj_neighbors, self.adj_weights
+        offsets, neighbors, weights = memoryview(offsets), memoryview(neighbors), memoryview(weights)
+        dist = [math.inf] * count
+        nearest = [-1] * count
+        heap = []
+        for source in sources:
+            dist[source] = 0.0
+            nearest[source] = source
+            heap.append((0.0, source))
+        heapq.heapify(heap)
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            lo, hi = offsets[current], offsets[current + 1]
+            for neighbor, length in zip(neighbors[lo:hi], weights[lo:hi]):
+                candidate = d + length
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    nearest[neighbor] = nearest[current]
+                    heapq.heappush(heap, (candidate, neighbor))
+        return np.array(dist), np.array(nearest, dtype=np.int64)
+
+    def nearest_of(self, start_vertex, targets):
+        """Closest of ``targets`` by lane cost as (vertex, distance), or (None, inf).
+
+        Dijkstra out of start_vertex that stops at the first target it settles,
+        so it only explores as far as that target.
+        """
+        targets = set(targets)
+        offsets = memoryview(self.adj_offsets)
+        neighbors = memoryview(self.adj_neighbors)
+        weights = memoryview(self.adj_weights)
+        dist = {start_vertex: 0.0}
+        heap = [(0.0, start_vertex)]
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            if current in targets:
+                return current, d
+            lo, hi = offsets[current], offsets[current + 1]
+            for neighbor, length in zip(neighbors[lo:hi], weights[lo:hi]):
+                candidate = d + length
+                if candidate < dist.get(neighbor, math.inf):
+                    dist[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return None, math.inf
+
+    def lookup_path(self, start_vertex, end_vertex):
+        """Follow the precomputed next-hop table from start to end"""
+        hops = self.next_hop[end_vertex]
+        if hops[start_vertex] < 0:
+            return None  # No path found
+        path = [start_vertex]
+        current = start_vertex
+        while current != end_vertex:
+            current = int(hops[current])
+            path.append(current)
+        return path
+
+    def distance_matrix(self, sources, targets):
+        """Shortest lane-cost distances (current costs, so blocked lanes are avoided) as a
+        len(sources) x len(targets) array; inf where a target cannot be reached"""
+        sources = np.asarray(sources, dtype=np.intp)
+        targets = np.asarray(targets, dtype=np.intp)
+        if self._tables_current():
+            # distances[goal][v] is the distance from v to goal
+            return self.distances[np.ix_(targets, sources)].T
+
+        # One Dijkstra tree per distinct vertex on the smaller side, over the
+        # reversed lanes when the trees are rooted at the targets
+        if len(np.unique(sources)) <= len(np.unique(targets)):
+            roots, columns, transpose = sources, targets, False
+        else:
+            roots, columns, transpose = targets, sources, True
+        trees = {root: np.asarray(self._dijkstra_tree(root, reverse=transpose)[1])
+                 for root in np.unique(roots).tolist()}
+        matrix = np.stack([trees[root][columns] for root in roots.tolist()]) if len(roots) else \
+            np.empty((0, len(columns)))
+        return matrix.T if transpose else matrix
+
+    def distance(self, start_vertex, end_vertex):
+        """Shortest lane-cost distance between two vertices (inf if unreachable)"""
+        if self._tables_current():
+            return float(self.distances[end_vertex][start_vertex])
+        path = self.find_path(start_vertex, end_vertex)
+        return self.path_cost(path) if path else math.inf
@@ -0,0 +1,322 @@
+import heapq
+import math
+import time
+
+import numpy as np
+
+from src.models.traffic import ReservationTable, lane_key, vertex_key
+
+class PlanResult:
+    """Timed routes for a batch of tasks.
+
+    ``plans[i]`` is the list of (vertex, tick) states of agent i, one per tick
+    it waits and one per vertex it reaches, or None if no route was found.
+    """
+
+    def __init__(self, plans, method, elapsed, expansions, fell_back=False):
+        self.plans = plans
+        self.method = method  # 'prioritized', 'cbs' or 'independent'
+        self.elapsed = elapsed  # Wall seconds spent planning
+        self.expansions = expansions  # Space-time states expanded, over all searches
+        self.fell_back = fell_back  # CBS ran out of time and prioritized plans were used
+
+    @property
+    def failed(self):
+        return [i for i, plan in enumerate(self.plans) if plan is None]
+
+    @property
+    def cost(self):
+        """Sum of arrival ticks over the agents that have a plan"""
+        return sum(plan[-1][1] - plan[0][1] for plan in self.plans if plan is not None)
+
+    @property
+    def makespan(self):
+        return max((plan[-1][1] - plan[0][1] for plan in self.plans if plan is not None), default=0)
+
+    def routes(self):
+        """Vertex route of every agent with the waits left out (None where planning failed)"""
+        routes = []
+        for plan in self.plans:
+            if plan is None:
+                routes.append(None)
+                continue
+            route = [plan[0][0]]
+            for vertex, _ in plan[1:]:
+                if vertex != route[-1]:
+                    route.append(vertex)
+            routes.append(route)
+        return routes
+
+
+def occupancy(plan):
+    """(resource, first tick, last tick) held along a timed plan.
+
+    Agents wait to start, and stop at their goal, parked beside the lane (as
+    with the TrafficManager), so only the tick they leave the start vertex and
+    the tick they reach the goal hold those vertices.
+    """
+    held = []
+    started = False
+    for (vertex, tick), (following, arrival) in zip(plan, plan[1:]):
+        if vertex == following:
+            if started:
+                held.append((vertex_key(vertex), tick, arrival))
+            continue
+        if not started:
+            held.append((vertex_key(vertex), tick, tick))
+            started = True
+        held.append((lane_key(vertex, following), tick, arrival - 1))
+        held.append((vertex_key(following), arrival, arrival))
+    return held
+
+def find_conflicts(plans, first_only=False):
+    """(resource, tick, agent, other agent) for every resource two plans hold at the same tick"""
+    holders = {}
+    conflicts = []
+    for agent, plan in enumerate(plans):
+        if plan is None:
+            continue
+        for resource, start, end in occupancy(plan):
+            for tick in range(start, end + 1):
+                other = holders.setdefault((resource, tick), agent)
+                if other != agent:
+                    conflicts.append((resource, tick, other, agent))
+    if first_only:
+        return min(conflicts, key=lambda conflict: conflict[1], default=None)
+    return conflicts
+
+
+class MultiRobotPlanner:
+    """Collision-free routes for a batch of (start, goal) tasks over a NavGraph.
+
+    Time advances in steps and a lane takes its length / ``step_length`` steps
+    (at least one). Like the TrafficManager, a robot holds a lane exclusively
+    while on it and a vertex while standing on it, so plans free of shared
+    (resource, step) pairs are free of collisions and head-on swaps.
+
+    Prioritized planning routes the agents one at a time, longest task first,
+    with space-time A* around the reservations of the agents before it; each
+    agent then reserves its plan in a ReservationTable. It is fast but may
+    fail an agent boxed in by earlier ones, or return longer plans than needed.
+    With ``method='cbs'`` groups of up to ``cbs_max_agents`` use conflict-based
+    search instead, which finds plans with the lowest total arrival time by
+    branching on one conflict at a time. CBS can blow up with many conflicts,
+    so once ``time_budget`` seconds have gone the prioritized plans are used.
+    """
+
+    METHODS = ('prioritized', 'cbs')
+
+    def __init__(self, graph, step_length=None, method='prioritized', cbs_max_agents=8, time_budget=1.0,
+                 max_delay=64):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown planning method {method!r}, expected one of {self.METHODS}")
+        self.graph = graph
+        if step_length is None:
+            # Median lane length: typical lanes take a step or two
+            lengths = graph.adj_weights[np.isfinite(graph.adj_weights)]
+            step_length = float(np.median(lengths)) if len(lengths) else 1.0
+        self.step_length = step_length
+        self.method = method
+        self.cbs_max_agents = cbs_max_agents
+        self.time_budget = time_budget  # Wall seconds CBS may take before falling back
+        self.max_delay = max_delay  # Steps an agent may lose to waiting or detours
+        self.durations = None
+        self._lanes = self._reverse_lanes = None
+        self.heuristics = {}  # goal -> steps from every vertex to goal, ignoring other agents
+        self.expansions = 0
+
+    def _update_durations(self):
+        """Steps per lane from the graph's current lane costs (blocked lanes stay inf)"""
+        graph = self.graph
+        durations = self._steps(graph.adj_weights)
+        if self.durations is None or not np.array_equal(durations, self.durations):
+            self.durations = durations
+            # Plain lists: the searches index them one lane at a time
+            self._lanes = (graph.adj_offsets.tolist(), graph.adj_neighbors.tolist(), durations.tolist())
+            self._reverse_lanes = (graph.rev_offsets.tolist(), graph.rev_neighbors.tolist(),
+                                   self._steps(graph.rev_weights).tolist())
+            self.heuristics.clear()
+
+    def _steps(self, weights):
+        with np.errstate(invalid='ignore'):
+            steps = np.maximum(1.0, np.ceil(weights / self.step_length - 1e-9))
+        return np.where(np.isfinite(weights), steps, math.inf)
+
+    def _heuristic(self, goal):
+        """Fewest steps from every vertex to goal: Dijkstra over the reversed lanes"""
+        distances = self.heuristics.get(goal)
+        if distances is not None:
+            return distances
+        offsets, neighbors, durations = self._reverse_lanes
+        distances = [math.inf] * len(self.graph.coords)
+        distances[goal] = 0
+        heap = [(0, goal)]
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > distances[current]:
+                continue
+            lo, hi = offsets[current], offsets[current + 1]
+            for neighbor, steps in zip(neighbors[lo:hi], durations[lo:hi]):
+                candidate = d + steps
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        self.heuristics[goal] = distances
+        return distances
+
+    def search(self, start, goal, start_tick=0, blocked=None):
+        """Space-time A* from start to goal, returns a timed plan or None.
+
+        ``blocked(resource, first tick, last tick)`` says whether the agent may
+        not hold a resource over those ticks. The agent may wait parked at the
+        start for as long as it likes before setting off.
+        """
+        heuristic = self._heuristic(goal)
+        if math.isinf(heuristic[start]):
+            return None
+        if start == goal:
+            return [(start, start_tick)]
+        offsets, neighbors, durations = self._lanes
+        deadline = start_tick + int(heuristic[start]) + self.max_delay
+
+        # States are (vertex, tick, set off); parked at the start, nothing is held
+        origin = (start, start_tick, False)
+        parents = {origin: None}
+        heap = [(heuristic[start], -start_tick, start, start_tick, False)]
+        while heap:
+            _, _, vertex, tick, moving = heapq.heappop(heap)
+            self.expansions += 1
+            if vertex == goal and moving:
+                plan = []
+                state = (vertex, tick, moving)
+                while state is not None:
+                    plan.append(state[:2])
+                    state = parents[state]
+                plan.reverse()
+                return plan
+            if tick >= deadline:
+                continue
+            state = (vertex, tick, moving)
+
+            # Wait in place; a moving agent keeps holding its vertex
+            waited = (vertex, tick + 1, moving)
+            if waited not in parents and not (moving and blocked is not None
+                                              and blocked(vertex_key(vertex), tick, tick + 1)):
+                parents[waited] = state
+                heapq.heappush(heap, (tick + 1 + heuristic[vertex], -(tick + 1), vertex, tick + 1, moving))
+
+            # Set off along each lane
+            if not moving and blocked is not None and blocked(vertex_key(vertex), tick, tick):
+                continue  # Start vertex taken this tick, try again after waiting
+            lo, hi = offsets[vertex], offsets[vertex + 1]
+            for neighbor, steps in zip(neighbors[lo:hi], durations[lo:hi]):
+                if steps == math.inf:
+                    continue
+                arrival = tick + int(steps)
+                following = (neighbor, arrival, True)
+                if following in parents or arrival + heuristic[neighbor] > deadline:
+                    continue
+                if blocked is not None and (blocked(lane_key(vertex, neighbor), tick, arrival - 1)
+                                            or blocked(vertex_key(neighbor), arrival, arrival)):
+                    continue
+                parents[following] = state
+                heapq.heappush(heap, (arrival + heuristic[neighbor], -arrival, neighbor, arrival, True))
+        return None
+
+    def plan(self, tasks, start_tick=0):
+        """Plan every (start, goal) task, returns a PlanResult"""
+        started = time.perf_counter()
+        self._update_durations()
+        self.expansions = 0
+        if self.method == 'cbs' and 1 < len(tasks) <= self.cbs_max_agents:
+            plans = self._conflict_based(tasks, start_tick, started + self.time_budget)
+            if plans is not None:
+                return PlanResult(plans, 'cbs', time.perf_counter() - started, self.expansions)
+            result = self._prioritized(tasks, start_tick, started)
+            result.fell_back = True
+            return result
+        return self._prioritized(tasks, start_tick, started)
+
+    def plan_independent(self, tasks, start_tick=0):
+        """Each task planned as if it were alone, as plain routing does (for comparison)"""
+        started = time.perf_counter()
+        self._update_durations()
+        self.expansions = 0
+        plans = [self.search(start, goal, start_tick) for start, goal in tasks]
+        return PlanResult(plans, 'independent', time.perf_counter() - started, self.expansions)
+
+    def _prioritized(self, tasks, start_tick, started):
+        table = ReservationTable()
+        plans = [None] * len(tasks)
+        # Longest tasks first: they have the fewest alternatives
+        order = sorted(range(len(tasks)), key=lambda i: -self._heuristic(tasks[i][1])[tasks[i][0]])
+        for agent in order:
+            start, goal = tasks[agent]
+
+            def blocked(resource, first, last):
+                return table.conflict(resource, first, last, agent) is not None
+
+            plan = self.search(start, goal, start_tick, blocked)
+            if plan is None:
+                continue
+            plans[agent] = plan
+            for resource, first, last in occupancy(plan):
+                table.reserve(resource, first, last, agent)
+        return PlanResult(plans, 'prioritized', time.perf_counter() - started, self.expansions)
+
+    def _conflict_based(self, tasks, start_tick, deadline):
+        """Optimal plans by conflict-based search, None if out of time or unsolvable"""
+
+        def replan(agent, constraints):
+            forbidden = constraints.get(agent, {})
+
+            def blocked(resource, first, last):
+                ticks = forbidden.get(resource)
+                return ticks is not None and any(first <= tick <= last for tick in ticks)
+
+            start, goal = tasks[agent]
+            return self.search(start, goal, start_tick, blocked if forbidden else None)
+
+        plans = [replan(agent, {}) for agent in range(len(tasks))]
+        if any(plan is None for plan in plans):
+            return None
+        counter = 0  # Tie-breaker, so the heap never compares constraint dicts
+        heap = [(self._total(plans), counter, {}, plans)]
+        while heap:
+            if time.perf_counter() > deadline:
+                return None
+            _, _, constraints, plans = heapq.heappop(heap)
+            conflict = find_conflicts(plans, first_only=True)
+            if conflict is None:
+                return plans
+            resource, tick, first_agent, second_agent = conflict
+            # One branch keeps each agent off the resource at that tick
+            for agent in (first_agent, second_agent):
+                branch = {a: {r: set(ticks) for r, ticks in forbidden.items()} for a, forbidden in constraints.items()}
+                branch.setdefault(agent, {}).setdefault(resource, set()).add(tick)
+                plan = replan(agent, branch)
+                if plan is None:
+                    continue
+                child = list(plans)
+                child[agent] = plan
+                counter += 1
+                heapq.heappush(heap, (self._total(child), counter, branch, child))
+        return None
+
+    @staticmethod
+    def _total(plans):
+        return sum(plan[-1][1] - plan[0][1] for plan in plans)
+
+    def assign(self, simulator, robots, goals):
+        """Plan routes from each idle robot's vertex to its goal and send the robots along them.
+
+        Robots without a plan get the usual shortest route. Returns the PlanResult.
+        """
+        tasks = [(simulator.nearest_vertex(robot.x, robot.y), goal) for robot, goal in zip(robots, goals)]
+        result = self.plan(tasks, simulator.tick_count)
+        for robot, route, (_, goal) in zip(robots, result.routes(), tasks):
+            if route is None or len(route) < 2:
+                simulator.assign_task(robot, goal)
+            else:
+                simulator.assign_route(robot, route)
+        return result
@@ -0,0 +1,143 @@
+import math
+import time
+
+class PhaseStats:
+    """Call count, total and a log-scale histogram of one phase's durations.
+
+    Buckets are 1/8 of an octave wide starting at 100 ns, so percentiles are
+    accurate to about 9% with constant memory however long the run.
+    """
+
+    MIN_SECONDS = 1e-7
+    BUCKETS_PER_OCTAVE = 8
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}  # bucket index -> samples
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = int(math.log2(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_OCTAVE) if seconds > self.MIN_SECONDS else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (0-100), in seconds"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.MIN_SECONDS * 2 ** ((bucket + 1) / self.BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+
+class _Phase:
+    __slots__ = ('stats', 'start')
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add(time.perf_counter() - self.start)
+
+
+class _NullPhase:
+    """Shared do-nothing phase handed out while profiling is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL_PHASE = _NullPhase()
+
+
+class Profiler:
+    """Per-phase timers and event counters, off by default.
+
+    Instrumented code wraps work in ``with profiler.phase(name):`` and bumps
+    counters with ``profiler.count(name)``. While disabled, phase() returns a
+    shared no-op context manager and count() returns at once, so leaving the
+    instrumentation in costs a method call per site.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}  # name -> PhaseStats
+        self.counters = {}  # name -> count
+        self.started = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.phases.clear()
+        self.counters.clear()
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        """Context manager timing one run of phase ``name``"""
+        if not self.enabled:
+            return _NULL_PHASE
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats()
+        return _Phase(stats)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """{'phases': {name: stats in ms}, 'counters': {...}, 'wall_s': ...}"""
+        phases = {}
+        for name, stats in sorted(self.phases.items()):
+            phases[name] = {
+                'count': stats.count,
+                'total_ms': stats.total * 1000,
+                'mean_ms': stats.total / stats.count * 1000 if stats.count else 0.0,
+                'p50_ms': stats.percentile(50) * 1000,
+                'p95_ms': stats.percentile(95) * 1000,
+                'p99_ms': stats.percentile(99) * 1000,
+                'max_ms': stats.max * 1000,
+            }
+        return {'phases': phases, 'counters': dict(sorted(self.counters.items())),
+                'wall_s': time.perf_counter() - self.started}
+
+    def report(self):
+        """Summary as a text table"""
+        summary = self.summary()
+        lines = [f"Profile over {summary['wall_s']:.1f}s wall time (times in ms)",
+                 f"{'phase':<24}{'count':>9}{'total':>10}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+        for name, s in summary['phases'].items():
+            lines.append(f"{name:<24}{s['count']:>9}{s['total_ms']:>10.1f}{s['mean_ms']:>9.3f}"
+                         f"{s['p50_ms']:>9.3f}{s['p95_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['max_ms']:>9.3f}")
+        if summary['counters']:
+            lines.append(f"{'counter':<24}{'value':>9}")
+            for name, value in summary['counters'].items():
+                lines.append(f"{name:<24}{value:>9}")
+        return "\n".join(lines)
+
+
+# Process-wide profiler shared by the simulator, the graph and the GUI
+profiler = Profiler()
@@ -1,3 +1,6 @@
+# Waits are float seconds; anything below this counts as done
+WAIT_EPSILON = 1e-9
+
 class Robot:
     robot_count = 0
     
@@ -7,6 +10,8 @@ class Robot:
     STATUS_CHARGING = "CHARGING"
     STATUS_COMPLETE = "COMPLETE"
 
+    DEFAULT_SPEED = 1.0  # World units per second
+
     def __init__(self, x, y):
         Robot.robot_count += 1
         self.id = f"R{Robot.robot_count}"
@@ -18,8 +23,10 @@ class Robot:
         self.destination_vertex = None
         self.path = []
         self.original_path_length = 0  # Store original path length
-        self.speed = 2  # pixels per update
+        self.speed = self.DEFAULT_SPEED
         self.wait_time = 0
+        self.battery = 1.0  # Charge fraction, 1.0 is full
+        self.odometer = 0.0  # Total distance driven
         self.previous_location = None
         self.initial_location = None  # Store the initial spawn location
         self.source_vertex = None  # Store the source vertex when task is assigned
@@ -39,43 +46,52 @@ class Robot:
             self.original_path_length = len(path) - 1 if len(path) > 0 else 0
             self.source_vertex = self.current_vertex  # Store current vertex as source
 
-    def update(self):
-        """Update robot state"""
+    def update(self, dt=1.0):
+        """Update robot state, driving speed * dt world units along the path"""
         if self.status == self.STATUS_MOVING:
             if self.path:
-                # Move towards next point in path
-                next_x, next_y = self.path[0]
-                dx = next_x - self.x
-                dy = next_y - self.y
-                distance = (dx**2 + dy**2)**0.5
-                
-                if distance < self.speed:
-                    self.previous_location = (self.x, self.y)
-                    self.x = next_x
-                    self.y = next_y
-                    # Check if moved from spawn location
-                    if not self.has_moved_from_spawn and (self.x != self.spawn_x or self.y != self.spawn_y):
-                        self.has_moved_from_spawn = True
-                    self.path.pop(0)
-                    if not self.path:
-                        self.previous_status = self.status
-                        self.status = self.STATUS_COMPLETE
-                        if not self.has_completed_first_move:
-                            self.has_completed_first_move = True
-                else:
-                    self.x += (dx/distance) * self.speed
-                    self.y += (dy/distance) * self.speed
-                    # Check if moved from spawn location
-                    if not self.has_moved_from_spawn and (abs(self.x - self.spawn_x) > self.speed or abs(self.y - self.spawn_y) > self.speed):
-                        self.has_moved_from_spawn = True
+                step = self.speed * dt
+                budget = step
+                start = (self.x, self.y)
+                while self.path:
+                    # Move towards next point in path
+                    next_x, next_y = self.path[0]
+                    dx = next_x - self.x
+                    dy = next_y - self.y
+                    distance = (dx**2 + dy**2)**0.5
+
+                    if distance <= budget:
+                        # Reach the waypoint and carry the leftover distance on to the next one
+                        budget -= distance
+                        self.previous_location = start
+                        self.x = next_x
+                        self.y = next_y
+                        # Check if moved from spawn location
+                        if not self.has_moved_from_spawn and (self.x != self.spawn_x or self.y != self.spawn_y):
+                            self.has_moved_from_spawn = True
+                        self.path.pop(0)
+                        if not self.path:
+                            self.previous_status = self.status
+                            self.status = self.STATUS_COMPLETE
+                            if not self.has_completed_first_move:
+                                self.has_completed_first_move = True
+                    else:
+                        self.x += (dx/distance) * budget
+                        self.y += (dy/distance) * budget
+                        # Check if moved from spawn location
+                        if not self.has_moved_from_spawn and (abs(self.x - self.spawn_x) > step or abs(self.y - self.spawn_y) > step):
+                            self.has_moved_from_spawn = True
+                        budget = 0.0
+                        break
+                self.odometer += step - budget
             else:
                 self.previous_status = self.status
                 self.status = self.STATUS_COMPLETE
                 if not self.has_completed_first_move:
                     self.has_completed_first_move = True
         elif self.status == self.STATUS_WAITING:
-            if self.wait_time > 0:
-                self.wait_time -= 1
+            if self.wait_time > WAIT_EPSILON:
+                self.wait_time -= dt
             else:
                 self.previous_status = self.status
                 self.status = self.STATUS_MOVING
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+import numpy as np
+
+class RouteCache:
+    """Bounded LRU cache of vertex paths keyed by (start, goal, cost version).
+
+    Every cached path is also indexed by the directed lanes it drives, so a
+    lane that gets closed or more expensive only drops the routes through it.
+    A lane that reopens or gets cheaper only drops the routes it could shorten,
+    judged by a straight-line lower bound. Bulk resets bump the graph's cost
+    version instead; entries from older versions are never hit again and age out.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()  # key -> (path tuple or None for "no path", route cost)
+        self.lane_routes = {}  # (a, b) -> keys of cached paths driving that lane
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """(hit, path); path is a fresh list, or None when no route exists"""
+        if key not in self.entries:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        path = self.entries[key][0]
+        return True, None if path is None else list(path)
+
+    def put(self, key, path, cost):
+        if self.capacity <= 0:
+            return
+        if key in self.entries:
+            self._drop(key)
+        path = None if path is None else tuple(path)
+        self.entries[key] = (path, cost)
+        if path:
+            for lane in zip(path, path[1:]):
+                self.lane_routes.setdefault(lane, set()).add(key)
+        while len(self.entries) > self.capacity:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        path = self.entries.pop(key)[0]
+        if path:
+            for lane in zip(path, path[1:]):
+                keys = self.lane_routes.get(lane)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.lane_routes[lane]
+
+    def invalidate_lane(self, a, b):
+        """Drop every cached route that drives from a to b, returns how many"""
+        keys = list(self.lane_routes.get((a, b), ()))
+        for key in keys:
+            self._drop(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_shortcut(self, coords, a, b, cost):
+        """Drop cached routes that lane a -> b at ``cost`` might now beat.
+
+        A route from s to g through the lane costs at least
+        |s - a| + cost + |b - g| in straight-line terms, so routes already
+        cheaper than that are kept. Returns how many were dropped.
+        """
+        if not self.entries:
+            return 0
+        keys = list(self.entries)
+        starts = np.fromiter((key[0] for key in keys), dtype=np.intp, count=len(keys))
+        goals = np.fromiter((key[1] for key in keys), dtype=np.intp, count=len(keys))
+        costs = np.fromiter((entry[1] for entry in self.entries.values()), dtype=np.float64, count=len(keys))
+        to_a = np.hypot(coords[starts, 0] - coords[a, 0], coords[starts, 1] - coords[a, 1])
+        from_b = np.hypot(coords[goals, 0] - coords[b, 0], coords[goals, 1] - coords[b, 1])
+        stale = np.flatnonzero(to_a + cost + from_b < costs - 1e-9)
+        for index in stale.tolist():
+            self._drop(keys[index])
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self.entries.clear()
+        self.lane_routes.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,247 @@
+import copy
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from src.models.charging import ChargingScheduler
+from src.models.dispatcher import TaskDispatcher
+from src.models.nav_graph import NavGraph
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+
+DEFAULT_SCENARIO = {
+    "level": None,
+    "duration": 300.0,  # Simulated seconds
+    "tick_interval": 0.1,
+    "robots": 10,
+    "spawn": "random",  # "random", "chargers" or a list of vertices
+    "robot_speed": 1.0,  # World units per second
+    "traffic": "reroute",  # "none", "wait" or "reroute"
+    "charging": None,  # None for unlimited batteries, or ChargingScheduler settings ({} for defaults)
+    # One stream or a list of them; pickups/dropoffs default to every vertex
+    "tasks": {"rate": 30.0, "initial": 0, "pickups": None, "dropoffs": None},
+}
+
+def load_scenario(path):
+    """Scenario spec from a JSON file, with defaults filled in"""
+    with open(path, 'r') as file:
+        spec = json.load(file)
+    unknown = set(spec) - set(DEFAULT_SCENARIO) - {"graph"}
+    if unknown:
+        raise ValueError(f"Unknown scenario keys: {sorted(unknown)}")
+    scenario = copy.deepcopy(DEFAULT_SCENARIO)
+    scenario.update(spec)
+    return scenario
+
+def expand_grid(grid):
+    """Every combination of a {parameter: [values]} grid, in a stable order"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def apply_params(scenario, params):
+    """Copy of scenario with dotted parameters overridden.
+
+    "tasks.rate" sets the rate of every task stream, "tasks.1.rate" only the second.
+    """
+    scenario = copy.deepcopy(scenario)
+    for key, value in params.items():
+        _set_path(scenario, key.split("."), value, key)
+    return scenario
+
+def _set_path(target, parts, value, key):
+    part, rest = parts[0], parts[1:]
+    if isinstance(target, list):
+        if part.isdigit():
+            index = int(part)
+            if index >= len(target):
+                raise KeyError(f"Unknown scenario parameter {key!r}")
+            if not rest:
+                target[index] = value
+                return
+            targets = [target[index]]
+            part, rest = rest[0], rest[1:]
+        else:
+            targets = target
+    else:
+        targets = [target]
+    for item in targets:
+        if not isinstance(item, dict) or part not in item:
+            raise KeyError(f"Unknown scenario parameter {key!r}")
+        if rest:
+            _set_path(item[part], rest, value, key)
+        else:
+            item[part] = value
+
+def run_seed(base_seed, params, repeat):
+    """Seed for one run, fixed by the base seed, its parameters and repeat number"""
+    key = f"{base_seed}:{json.dumps(params, sort_keys=True)}:{repeat}"
+    return random.Random(key).getrandbits(32)
+
+def _resolve_vertices(graph, refs):
+    """Vertex ids from a list of ids or names (None means every vertex)"""
+    if refs is None:
+        return np.arange(len(graph.vertices))
+    names = {name: i for i, name in enumerate(graph.vertex_names.tolist()) if name}
+    resolved = []
+    for ref in refs:
+        if isinstance(ref, str):
+            if ref not in names:
+                raise ValueError(f"No vertex named {ref!r}")
+            resolved.append(names[ref])
+        else:
+            resolved.append(int(ref))
+    return np.asarray(resolved)
+
+def _spawn_vertices(graph, scenario, rng):
+    count = scenario["robots"]
+    spawn = scenario["spawn"]
+    vertex_count = len(graph.vertices)
+    if spawn == "random":
+        if count <= vertex_count:
+            return rng.sample(range(vertex_count), count)
+        return [rng.randrange(vertex_count) for _ in range(count)]
+    candidates = graph.chargers if spawn == "chargers" else _resolve_vertices(graph, spawn).tolist()
+    if not candidates:
+        raise ValueError(f"No vertices to spawn robots on for spawn={spawn!r}")
+    return [candidates[i % len(candidates)] for i in range(count)]
+
+def run_scenario(graph, scenario, seed):
+    """Run one scenario headlessly, returns its metrics"""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    traffic = TrafficManager(policy=scenario["traffic"]) if scenario["traffic"] != "none" else None
+    simulator = FleetSimulator(graph, tick_interval=scenario["tick_interval"],
+                               robot_speed=scenario["robot_speed"], traffic_manager=traffic)
+    for vertex in _spawn_vertices(graph, scenario, rng):
+        simulator.spawn_robot_at_vertex(vertex)
+    dispatcher = TaskDispatcher(simulator)
+    charging = ChargingScheduler(simulator, **scenario["charging"]) if scenario["charging"] is not None else None
+
+    streams = scenario["tasks"]
+    if isinstance(streams, dict):
+        streams = [streams]
+    streams = [(stream.get("rate", 0.0) / 60.0 * scenario["tick_interval"],
+                _resolve_vertices(graph, stream.get("pickups")),
+                _resolve_vertices(graph, stream.get("dropoffs")),
+                stream.get("initial", 0)) for stream in streams]
+
+    def submit(count, pickups, dropoffs):
+        if count:
+            dispatcher.submit_many(zip(np_rng.choice(pickups, count).tolist(),
+                                       np_rng.choice(dropoffs, count).tolist()))
+
+    for _, pickups, dropoffs, initial in streams:
+        submit(initial, pickups, dropoffs)
+
+    def arrivals(sim):
+        for per_tick, pickups, dropoffs, _ in streams:
+            submit(int(np_rng.poisson(per_tick)), pickups, dropoffs)
+
+    # Arrivals run before the charging scheduler and dispatcher see the tick, so new tasks go out at once
+    simulator.observers.insert(0, arrivals)
+    elapsed = simulator.run(duration=scenario["duration"])
+
+    dt = scenario["tick_interval"]
+    completions = np.asarray(dispatcher.completion_ticks) * dt
+    waits = np.asarray(dispatcher.queue_waits) * dt
+    minutes = simulator.sim_time / 60.0
+    charge = charging.report() if charging is not None else None
+    return {
+        "robots": len(simulator.robots),
+        "tasks_submitted": dispatcher.tasks_submitted,
+        "tasks_completed": dispatcher.tasks_completed,
+        "throughput_per_min": dispatcher.tasks_completed / minutes if minutes > 0 else 0.0,
+        "completion_mean_s": float(completions.mean()) if len(completions) else float("nan"),
+        "completion_p95_s": float(np.percentile(completions, 95)) if len(completions) else float("nan"),
+        "queue_wait_mean_s": float(waits.mean()) if len(waits) else float("nan"),
+        "traffic_wait_s": traffic.wait_ticks * dt if traffic else 0.0,
+        "backlog": dispatcher.pending(),
+        "charging_lost": charge["utilization_lost"] if charge else 0.0,
+        "depletions": charge["depletions"] if charge else 0,
+        "wall_s": elapsed,
+    }
+
+# Graphs shared by every run in a worker process, one per level, each loaded on first use
+_worker_graph_path = None
+_worker_graphs = {}
+
+def _init_worker(graph_path):
+    global _worker_graph_path
+    _worker_graph_path = graph_path
+    _worker_graphs.clear()
+
+def _worker_graph(level):
+    graph = _worker_graphs.get(level)
+    if graph is None:
+        graph = _worker_graphs[level] = NavGraph(_worker_graph_path, level=level)
+    return graph
+
+def _run_job(job):
+    index, params, repeat, seed, scenario = job
+    metrics = run_scenario(_worker_graph(scenario["level"]), scenario, seed)
+    return index, {**params, "repeat": repeat, "seed": seed, **metrics}
+
+def run_sweep(graph_path, scenario, grid=None, repeats=1, jobs=None, base_seed=0):
+    """Run every grid combination ``repeats`` times across a process pool.
+
+    Returns one metrics row per run, in grid order regardless of which worker
+    finished first.
+    """
+    combinations = expand_grid(grid or {})
+    work = []
+    for params in combinations:
+        run_scenario_spec = apply_params(scenario, params)
+        for repeat in range(repeats):
+            work.append((len(work), params, repeat, run_seed(base_seed, params, repeat), run_scenario_spec))
+
+    jobs = jobs or os.cpu_count() or 1
+    rows = [None] * len(work)
+    if jobs == 1:
+        _init_worker(graph_path)
+        for job in work:
+            index, row = _run_job(job)
+            rows[index] = row
+        return rows
+
+    with multiprocessing.Pool(min(jobs, len(work)), initializer=_init_worker,
+                              initargs=(graph_path,)) as pool:
+        for index, row in pool.imap_unordered(_run_job, work):
+            rows[index] = row
+    return rows
+
+METRIC_KEYS = ("throughput_per_min", "completion_mean_s", "completion_p95_s", "queue_wait_mean_s",
+               "traffic_wait_s", "charging_lost", "depletions", "tasks_completed", "backlog")
+
+def summarize(rows, param_keys):
+    """Mean of every metric over the repeats of each parameter combination"""
+    groups = {}
+    for row in rows:
+        key = tuple(json.dumps(row[k], sort_keys=True) for k in param_keys)
+        groups.setdefault(key, []).append(row)
+    summary = []
+    for members in groups.values():
+        entry = {k: members[0][k] for k in param_keys}
+        entry["runs"] = len(members)
+        for metric in METRIC_KEYS:
+            values = np.array([m[metric] for m in members], dtype=np.float64)
+            entry[metric] = float(np.nanmean(values)) if np.isfinite(values).any() else float("nan")
+        summary.append(entry)
+    return summary
+
+def write_results(path, rows, summary, scenario, grid):
+    """Write per-run rows as CSV, or rows plus summary as JSON, by file extension"""
+    if path.endswith(".json"):
+        with open(path, 'w') as file:
+            json.dump({"scenario": scenario, "grid": grid, "summary": summary, "runs": rows}, file, indent=2)
+        return
+    fields = list(rows[0]) if rows else []
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in row.items()})
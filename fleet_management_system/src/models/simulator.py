@@ -0,0 +1,279 @@
+import time
+
+import numpy as np
+
+from src.models.robot import Robot
+from src.models.fleet_state import FleetState, ChangeTracker, NO_VERTEX, STATUS_FREE
+from src.models.spatial_index import GridIndex
+from src.models.profiler import profiler
+
+class FleetSimulator:
+    """Headless fleet simulation: owns the graph, the robots and the tick loop.
+
+    Robots move through ``vertex_positions`` (world coordinates by default); a GUI
+    can pass its own screen mapping and register an observer to redraw after
+    every tick. Robot state is kept in a FleetState and advanced in one
+    vectorized step; ``robots`` holds the RobotView of every robot, in spawn
+    order until robots are removed (each removal moves the last robot into the gap).
+    With a TrafficManager, robots only drive lanes and vertices they have reserved.
+    """
+
+    def __init__(self, graph, vertex_positions=None, tick_interval=0.1, robot_speed=None,
+                 traffic_manager=None):
+        self.graph = graph
+        if vertex_positions is None:
+            self.vertex_positions = {i: (x, y) for i, (x, y, _) in enumerate(graph.vertices)}
+            self.vertex_index = graph.spatial_index
+        else:
+            self.vertex_positions = vertex_positions
+            self.vertex_index = GridIndex.from_points(vertex_positions)
+        # Robot positions are re-synced into this index lazily, on the first query after a tick
+        self.robot_index = GridIndex(self.vertex_index.cell_size)
+        self._robot_index_dirty = False
+        self._indexed_x = np.empty(0)
+        self._indexed_y = np.empty(0)
+        self.tick_interval = tick_interval  # Simulated seconds per tick
+        self.robot_speed = robot_speed  # Units per second, overrides Robot.DEFAULT_SPEED when set
+        self.fleet = FleetState()
+        self.robots = []
+        self._robot_positions = {}  # robot id -> index in robots
+        self.tick_count = 0
+        self.sim_time = 0.0
+        self.completed_tasks = 0
+        self.observers = []
+        self.traffic = traffic_manager
+        self.dispatcher = None  # Set by a TaskDispatcher attached to this simulator
+        self.recorder = None  # Set by an EventRecorder logging this simulator
+        self.charging = None  # Set by a ChargingScheduler managing batteries
+        if traffic_manager is not None:
+            traffic_manager.attach(self)
+
+    def add_observer(self, callback):
+        """Register callback(simulator) to be called after every tick"""
+        self.observers.append(callback)
+
+    def remove_observer(self, callback):
+        if callback in self.observers:
+            self.observers.remove(callback)
+
+    def nearest_vertex(self, x, y):
+        """Find the nearest vertex to given coordinates"""
+        with profiler.phase('route.nearest_vertex'):
+            return self.vertex_index.nearest(x, y)
+
+    def vertex_at(self, x, y, radius):
+        """Closest vertex within radius of (x, y) on both axes, or None"""
+        return self.vertex_index.nearest_in_box(x, y, radius)
+
+    def robot_at(self, x, y, radius):
+        """Closest robot within radius of (x, y) on both axes, or None"""
+        self._sync_robot_index()
+        return self.robot_index.nearest_in_box(x, y, radius)
+
+    def robots_near(self, x, y, radius):
+        """Robots within radius of (x, y) on both axes"""
+        self._sync_robot_index()
+        return self.robot_index.query_box(x - radius, y - radius, x + radius, y + radius)
+
+    def _ensure_indexed_capacity(self):
+        missing = self.fleet.size - len(self._indexed_x)
+        if missing > 0:
+            grow = max(missing, len(self._indexed_x))
+            self._indexed_x = np.concatenate([self._indexed_x, np.full(grow, np.nan)])
+            self._indexed_y = np.concatenate([self._indexed_y, np.full(grow, np.nan)])
+
+    def _sync_robot_index(self):
+        """Move robots whose position changed since the last sync"""
+        if not self._robot_index_dirty:
+            return
+        fleet = self.fleet
+        n = fleet.size
+        active = fleet.status[:n] != STATUS_FREE
+        moved = active & ((fleet.x[:n] != self._indexed_x[:n]) | (fleet.y[:n] != self._indexed_y[:n]))
+        for slot in np.flatnonzero(moved):
+            self.robot_index.move(fleet.views[slot], float(fleet.x[slot]), float(fleet.y[slot]))
+        self._indexed_x[:n] = fleet.x[:n]
+        self._indexed_y[:n] = fleet.y[:n]
+        self._robot_index_dirty = False
+
+    def spawn_robot(self, x, y):
+        """Create a robot at the given position and place it on the nearest vertex"""
+        speed = self.robot_speed if self.robot_speed is not None else Robot.DEFAULT_SPEED
+        robot = self.fleet.add_robot(x, y, speed)
+        current_vertex = self.nearest_vertex(x, y)
+        if current_vertex is not None:
+            robot.set_initial_location(current_vertex)
+        self._robot_positions[robot.id] = len(self.robots)
+        self.robots.append(robot)
+        self._ensure_indexed_capacity()
+        self._indexed_x[robot.slot] = x
+        self._indexed_y[robot.slot] = y
+        self.robot_index.insert(robot, x, y)
+        if self.recorder is not None:
+            self.recorder.on_spawn(robot)
+        return robot
+
+    def spawn_robot_at_vertex(self, vertex):
+        x, y = self.vertex_positions[vertex]
+        return self.spawn_robot(x, y)
+
+    def remove_robot(self, robot):
+        position = self._robot_positions.get(robot.id)
+        if position is not None and self.robots[position] is robot:
+            if self.recorder is not None:
+                self.recorder.on_remove(robot)
+            del self._robot_positions[robot.id]
+            last = self.robots.pop()
+            if last is not robot:
+                self.robots[position] = last
+                self._robot_positions[last.id] = position
+            self.robot_index.remove(robot)
+            if self.traffic is not None:
+                self.traffic.remove_robot(robot)
+            if self.dispatcher is not None:
+                self.dispatcher.remove_robot(robot)
+            if self.charging is not None:
+                self.charging.remove_robot(robot)
+            self.fleet.remove_robot(robot)
+
+    def state(self):
+        """Copy of the clock, counters and fleet, for a snapshot; traffic, dispatcher
+        and charging state are taken separately"""
+        return {
+            'tick_interval': self.tick_interval,
+            'robot_speed': self.robot_speed,
+            'tick_count': self.tick_count,
+            'sim_time': self.sim_time,
+            'completed_tasks': self.completed_tasks,
+            'fleet': self.fleet.state(),
+            'robots': [robot.slot for robot in self.robots],
+        }
+
+    def restore(self, state):
+        """Replace the fleet and clock with those of a state() copy"""
+        self.tick_count = state['tick_count']
+        self.sim_time = state['sim_time']
+        self.completed_tasks = state['completed_tasks']
+        self.fleet.restore(state['fleet'])
+        self.robots = [self.fleet.views[slot] for slot in state['robots']]
+        self._robot_positions = {robot.id: position for position, robot in enumerate(self.robots)}
+        self.robot_index = GridIndex(self.vertex_index.cell_size)
+        self._indexed_x = np.empty(0)
+        self._indexed_y = np.empty(0)
+        self._ensure_indexed_capacity()
+        fleet = self.fleet
+        self._indexed_x[:fleet.size] = fleet.x[:fleet.size]
+        self._indexed_y[:fleet.size] = fleet.y[:fleet.size]
+        for robot, x, y in zip(self.robots, fleet.x[state['robots']].tolist(), fleet.y[state['robots']].tolist()):
+            self.robot_index.insert(robot, x, y)
+        self._robot_index_dirty = False
+
+    def track_changes(self):
+        """New ChangeTracker reporting robots that moved or changed status"""
+        return ChangeTracker(self.fleet)
+
+    def idle_robots(self):
+        return self.fleet.robots_with_status(Robot.STATUS_IDLE)
+
+    def assign_task(self, robot, destination_vertex):
+        """Route an idle robot to destination_vertex, returns True if a path was found"""
+        if self.recorder is not None:
+            self.recorder.on_assign(robot, destination_vertex)
+        if robot.status != Robot.STATUS_IDLE:
+            return False
+        start_vertex = self.nearest_vertex(robot.x, robot.y)
+        if start_vertex is None or destination_vertex is None:
+            return False
+        path = self.graph.find_path(start_vertex, destination_vertex)
+        if path:
+            self._send(robot, path)
+            return True
+        # Left idle: a wait with no path behind it would end as a completed task
+        return False
+
+    def assign_route(self, robot, path):
+        """Send an idle robot along a given vertex path (e.g. from the MultiRobotPlanner)
+        instead of the shortest one, returns True if it set off"""
+        if self.recorder is not None:
+            self.recorder.on_assign(robot, path[-1] if path else None, path)
+        if robot.status != Robot.STATUS_IDLE or not path:
+            return False
+        self._send(robot, path)
+        return True
+
+    def _send(self, robot, path):
+        # Convert path vertices to simulation coordinates
+        robot.assign_task(path[-1], [self.vertex_positions[v] for v in path])
+        if self.traffic is not None and len(path) > 1:
+            self.traffic.add_route(robot, path)
+
+    def tick(self):
+        """Advance every robot by one tick_interval and notify observers"""
+        with profiler.phase('tick'):
+            if self.traffic is not None:
+                with profiler.phase('tick.traffic_before'):
+                    self.traffic.before_step(self.tick_count)
+            with profiler.phase('tick.fleet_step'):
+                completed = self.fleet.step(self.tick_interval)
+            if self.traffic is not None:
+                with profiler.phase('tick.traffic_after'):
+                    completed = self.traffic.after_step(completed)
+            # Only robots that still had a destination finished a task
+            self.completed_tasks += int(np.count_nonzero(self.fleet.destination_vertex[completed] != NO_VERTEX))
+            self._robot_index_dirty = True
+            self.tick_count += 1
+            self.sim_time += self.tick_interval
+            with profiler.phase('tick.observers'):
+                for callback in self.observers:
+                    callback(self)
+
+    def interpolated_positions(self, alpha, slots=None):
+        """(x, y) arrays blended between the previous and current tick.
+
+        ``alpha`` is the fraction of a tick elapsed since the latest one, 0 giving
+        the positions before it and 1 the positions after; for smooth rendering
+        between ticks. ``slots`` limits the result to those fleet slots.
+        """
+        fleet = self.fleet
+        if slots is None:
+            slots = slice(0, fleet.size)
+        alpha = min(max(alpha, 0.0), 1.0)
+        last_x, last_y = fleet.last_x[slots], fleet.last_y[slots]
+        return (last_x + alpha * (fleet.x[slots] - last_x),
+                last_y + alpha * (fleet.y[slots] - last_y))
+
+    def throughput(self):
+        """Routes driven to their end per simulated minute; a dispatched task with a
+        pickup and a dropoff counts twice, see TaskDispatcher.tasks_completed"""
+        if self.sim_time <= 0:
+            return 0.0
+        return self.completed_tasks / (self.sim_time / 60.0)
+
+    def run(self, ticks=None, duration=None, realtime=False, until=None):
+        """Run the tick loop headlessly.
+
+        Stops after ``ticks`` ticks, ``duration`` simulated seconds, or when
+        ``until(simulator)`` returns True. With ``realtime`` the loop sleeps to
+        hold one tick per ``tick_interval``; otherwise it runs as fast as the CPU
+        allows. Returns the wall-clock seconds spent.
+        """
+        if ticks is None and duration is None and until is None:
+            raise ValueError("run() needs ticks, duration or until")
+        if duration is not None:
+            duration_ticks = int(round(duration / self.tick_interval))
+            ticks = duration_ticks if ticks is None else min(ticks, duration_ticks)
+
+        start = time.perf_counter()
+        next_deadline = start
+        done = 0
+        while ticks is None or done < ticks:
+            if until is not None and until(self):
+                break
+            self.tick()
+            done += 1
+            if realtime:
+                next_deadline += self.tick_interval
+                delay = next_deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return time.perf_counter() - start
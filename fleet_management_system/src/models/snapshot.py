@@ -0,0 +1,307 @@
+import gc
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.models.charging import ChargingScheduler
+from src.models.dispatcher import Task, TaskDispatcher
+from src.models.fleet_state import FleetState
+from src.models.nav_graph import NavGraph
+from src.models.profiler import profiler
+from src.models.simulator import FleetSimulator
+from src.models.traffic import TrafficManager
+
+# Bump when the layout of snapshot files changes
+SNAPSHOT_FORMAT = 1
+
+TASK_STATUSES = (Task.STATUS_QUEUED, Task.STATUS_TO_PICKUP, Task.STATUS_TO_DROPOFF,
+                 Task.STATUS_DONE, Task.STATUS_FAILED)
+
+@contextmanager
+def _gc_paused():
+    """Hold off the cyclic garbage collector while building many small objects.
+
+    Capturing or restoring a large fleet allocates hundreds of thousands of
+    tuples, which would otherwise trigger repeated full collections of a heap
+    that holds nothing but live simulator state, multiplying the time taken.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+@_gc_paused()
+def capture(simulator):
+    """Copy everything a snapshot needs out of a simulator.
+
+    Only copies arrays and bookkeeping, so it is cheap enough to run between
+    two ticks; encode() turns the copy into file contents later, on any thread.
+    """
+    graph = simulator.graph
+    return {
+        'created': time.time(),
+        'graph': {
+            'path': graph.source.path,
+            'source_hash': graph.source.source_hash,
+            'level': graph.level,
+            'directed': graph.directed,
+            'vertices': len(graph.coords),
+        },
+        'lane_overrides': [(a, b, cost) for (a, b), cost in graph.lane_overrides.items()],
+        'simulator': simulator.state(),
+        'traffic': simulator.traffic.state() if simulator.traffic is not None else None,
+        'dispatcher': simulator.dispatcher.state() if simulator.dispatcher is not None else None,
+        'charging': simulator.charging.state() if simulator.charging is not None else None,
+    }
+
+def _or_missing(value):
+    return -1 if value is None else value
+
+def _or_none(value):
+    return None if value < 0 else value
+
+def encode(captured):
+    """Arrays of a snapshot file for a capture() copy.
+
+    Fleet arrays are stored as they are; reservations, routes and tasks become
+    integer tables with robots referred to by fleet slot. The rest is a small
+    JSON document.
+    """
+    simulator = captured['simulator']
+    fleet = simulator['fleet']
+    ids = fleet['ids']
+    slot_of = {robot_id: slot for slot, robot_id in enumerate(ids) if robot_id is not None}
+    state = {
+        'created': captured['created'],
+        'graph': captured['graph'],
+        'lane_overrides': captured['lane_overrides'],
+        'simulator': {key: simulator[key] for key in
+                      ('tick_interval', 'robot_speed', 'tick_count', 'sim_time', 'completed_tasks')},
+        'fleet': {'ids': ids, 'free_slots': fleet['free_slots'], 'robot_count': fleet['robot_count']},
+        'traffic': None,
+        'dispatcher': None,
+        'charging': captured['charging'],
+    }
+    arrays = {f"fleet/{name}": values for name, values in fleet['arrays'].items()}
+    arrays["fleet/path_points"] = fleet['path_points']
+    arrays["fleet/robots"] = np.array(simulator['robots'], dtype=np.int64)
+
+    traffic = captured['traffic']
+    if traffic is not None:
+        state['traffic'] = {key: traffic[key] for key in ('settings', 'pruned_until', 'metrics', 'open_deadlocks')}
+        state['traffic']['locks'] = list(traffic['locks'].items())
+        arrays["traffic/reservations"] = np.array(
+            [(1, resource[1], resource[2], slot, slot_of.get(owner, -1)) if resource[0] == 'lane'
+             else (0, resource[1], -1, slot, slot_of.get(owner, -1))
+             for (resource, slot), owner in traffic['reservations'].items()], dtype=np.int64).reshape(-1, 5)
+        routes = traffic['routes']
+        arrays["traffic/routes"] = np.array(
+            [(slot_of[robot_id], len(vertices), pos, granted, arrival, on_lane, slot_of.get(blocked_by, -1),
+              wait_ticks, yield_index, yield_until)
+             for robot_id, vertices, pos, granted, arrival, on_lane, blocked_by, wait_ticks, yield_index,
+             yield_until in routes], dtype=np.int64).reshape(-1, 10)
+        arrays["traffic/route_vertices"] = np.array(
+            [vertex for route in routes for vertex in route[1]], dtype=np.int64)
+
+    dispatcher = captured['dispatcher']
+    if dispatcher is not None:
+        state['dispatcher'] = {'window': dispatcher['window'], 'counters': dispatcher['counters']}
+        arrays["dispatcher/queue"] = np.array(
+            [(task_id, pickup, _or_missing(dropoff), submitted)
+             for task_id, pickup, dropoff, submitted in dispatcher['queue']], dtype=np.int64).reshape(-1, 4)
+        arrays["dispatcher/active"] = np.array(
+            [(task_id, pickup, _or_missing(dropoff), TASK_STATUSES.index(status), slot_of[robot_id], submitted,
+              _or_missing(assigned), _or_missing(completed))
+             for task_id, pickup, dropoff, status, robot_id, submitted, assigned, completed
+             in dispatcher['active']], dtype=np.int64).reshape(-1, 8)
+        for name in ('latencies', 'queue_waits', 'completion_ticks'):
+            arrays[f"dispatcher/{name}"] = np.array(dispatcher[name])
+
+    arrays["format"] = np.array(SNAPSHOT_FORMAT)
+    arrays["state"] = np.array(json.dumps(state, separators=(",", ":")))
+    return arrays
+
+def write_snapshot(arrays, path):
+    """Write encoded snapshot arrays to path, replacing any previous snapshot only once complete"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def save_snapshot(simulator, path):
+    """Write a snapshot of a simulator to path, on the calling thread"""
+    write_snapshot(encode(capture(simulator)), path)
+
+
+class SnapshotWriter:
+    """Keeps a snapshot file of a running simulator up to date.
+
+    Every ``every`` ticks the simulator is copied with capture(), which is all
+    the tick loop waits for; encoding and writing happen on a background
+    thread. If the writer is still busy when the next snapshot is due, the
+    newer copy replaces the one waiting, so a slow disk skips snapshots rather
+    than piling them up. Each file is written under a temporary name and then
+    moved over ``path``, so a crash mid-write leaves the previous snapshot.
+    close() writes a final snapshot and waits for it.
+    """
+
+    def __init__(self, simulator, path, every=600, background=True):
+        self.simulator = simulator
+        self.path = path
+        self.every = every
+        self.snapshots_written = 0
+        self.last_tick = None  # Tick of the latest snapshot on disk
+        self._pending = None  # Capture waiting for the writer thread
+        self._closed = False
+        self._error = None  # First error raised by the writer thread
+        self._condition = threading.Condition()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._writer, name="snapshot-writer", daemon=True)
+            self._thread.start()
+        simulator.add_observer(self.on_tick)
+
+    def on_tick(self, simulator):
+        if simulator.tick_count % self.every == 0:
+            self.save()
+
+    def save(self):
+        """Snapshot the simulator as it is now"""
+        if self._error is not None:
+            raise self._error
+        with profiler.phase('snapshot.capture'):
+            captured = capture(self.simulator)
+        if self._thread is None:
+            self._write(captured)
+            return
+        with self._condition:
+            self._pending = captured
+            self._condition.notify()
+
+    def _write(self, captured):
+        write_snapshot(encode(captured), self.path)
+        self.snapshots_written += 1
+        self.last_tick = captured['simulator']['tick_count']
+
+    def _writer(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                captured, self._pending = self._pending, None
+            if captured is None:
+                return
+            if self._error is None:
+                try:
+                    self._write(captured)
+                except (OSError, TypeError, ValueError) as e:
+                    # save() re-raises on the tick thread
+                    self._error = e
+
+    def close(self):
+        if self._closed:
+            return
+        self.simulator.remove_observer(self.on_tick)
+        try:
+            self.save()
+        finally:
+            self._closed = True
+            if self._thread is not None:
+                with self._condition:
+                    self._condition.notify()
+                self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+@_gc_paused()
+def load_snapshot(path, graph=None):
+    """Rebuild a simulator, with its traffic manager, dispatcher and charging
+    scheduler, from a snapshot file.
+
+    The graph is loaded from the path stored in the snapshot unless one is
+    given (without all-pairs routing tables), and has to match the file the
+    snapshot was taken on. Lane closures and cost changes are re-applied.
+    Observers other than the dispatcher and the charging scheduler are not
+    part of a snapshot and have to be added again.
+    """
+    archive = np.load(path, allow_pickle=False)
+    if "format" not in archive.files or "state" not in archive.files:
+        raise ValueError(f"{path} is not a fleet snapshot")
+    if int(archive["format"]) != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path} has snapshot format {int(archive['format'])}, expected {SNAPSHOT_FORMAT}")
+    state = json.loads(str(archive["state"]))
+
+    source = state['graph']
+    if graph is None:
+        # No all-pairs tables, so the fleet can tick right away; A* and the route cache take over
+        graph = NavGraph(source['path'], level=source['level'], directed=source['directed'])
+    if (graph.source.source_hash != source['source_hash'] or graph.level != source['level']
+            or len(graph.coords) != source['vertices']):
+        raise ValueError(f"{path} was taken on a different graph than {graph.source.path} ({graph.level})")
+    for a, b, cost in state['lane_overrides']:
+        graph.set_lane_cost(a, b, cost)
+
+    settings = state['simulator']
+    traffic = state['traffic']
+    simulator = FleetSimulator(graph, tick_interval=settings['tick_interval'], robot_speed=settings['robot_speed'],
+                               traffic_manager=TrafficManager(**traffic['settings']) if traffic else None)
+    fleet = state['fleet']
+    simulator.restore({
+        **settings,
+        'fleet': {
+            'arrays': {name: archive[f"fleet/{name}"] for name in FleetState.ARRAY_FIELDS},
+            'path_points': archive["fleet/path_points"],
+            'ids': fleet['ids'],
+            'free_slots': fleet['free_slots'],
+            'robot_count': fleet['robot_count'],
+        },
+        'robots': archive["fleet/robots"].tolist(),
+    })
+    ids = fleet['ids']
+
+    if traffic:
+        reservations = {}
+        for is_lane, a, b, slot, owner in archive["traffic/reservations"].tolist():
+            if owner >= 0:
+                reservations[(('lane', a, b) if is_lane else ('vertex', a), slot)] = ids[owner]
+        vertices = archive["traffic/route_vertices"].tolist()
+        routes = []
+        cursor = 0
+        for slot, count, pos, granted, arrival, on_lane, blocked_by, wait_ticks, yield_index, yield_until \
+                in archive["traffic/routes"].tolist():
+            routes.append((ids[slot], vertices[cursor:cursor + count], pos, granted, arrival, bool(on_lane),
+                           None if blocked_by < 0 else ids[blocked_by], wait_ticks, yield_index, yield_until))
+            cursor += count
+        simulator.traffic.restore({**traffic, 'reservations': reservations, 'routes': routes})
+
+    dispatcher = state['dispatcher']
+    if dispatcher is not None:
+        TaskDispatcher(simulator).restore({
+            'window': dispatcher['window'],
+            'counters': dispatcher['counters'],
+            'queue': [(task_id, pickup, _or_none(dropoff), submitted)
+                      for task_id, pickup, dropoff, submitted in archive["dispatcher/queue"].tolist()],
+            'active': [(task_id, pickup, _or_none(dropoff), TASK_STATUSES[status], ids[robot], submitted,
+                        _or_none(assigned), _or_none(completed))
+                       for task_id, pickup, dropoff, status, robot, submitted, assigned, completed
+                       in archive["dispatcher/active"].tolist()],
+            **{name: archive[f"dispatcher/{name}"].tolist()
+               for name in ('latencies', 'queue_waits', 'completion_ticks')},
+        })
+
+    charging = state['charging']
+    if charging is not None:
+        ChargingScheduler(simulator, **charging['settings']).restore(charging)
+    return simulator
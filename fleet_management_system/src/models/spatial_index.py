@@ -0,0 +1,162 @@
+import math
+
+class GridIndex:
+    """Uniform-grid spatial index over keyed 2D points.
+
+    Points are bucketed into square cells of ``cell_size``; nearest-neighbour
+    and box queries only visit the cells around the query point. Points can be
+    moved in place, which only touches the buckets when the cell changes.
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = float(cell_size)
+        self.cells = {}  # (cx, cy) -> set of keys
+        self.positions = {}  # key -> (x, y)
+        self.key_cells = {}  # key -> (cx, cy)
+        self.min_cell = None
+        self.max_cell = None
+
+    @classmethod
+    def from_points(cls, points, cell_size=None):
+        """Build an index from a {key: (x, y)} mapping.
+
+        Without an explicit cell size, aims for roughly one point per cell.
+        """
+        if cell_size is None:
+            cell_size = cls.suggest_cell_size(points.values())
+        index = cls(cell_size)
+        for key, (x, y) in points.items():
+            index.insert(key, x, y)
+        return index
+
+    @staticmethod
+    def suggest_cell_size(coordinates):
+        coordinates = list(coordinates)
+        if len(coordinates) < 2:
+            return 1.0
+        xs = [c[0] for c in coordinates]
+        ys = [c[1] for c in coordinates]
+        width = max(xs) - min(xs)
+        height = max(ys) - min(ys)
+        area = max(width, 1e-9) * max(height, 1e-9)
+        size = math.sqrt(area / len(coordinates))
+        # Degenerate (collinear) layouts fall back to spacing along the long side
+        if width == 0 or height == 0:
+            size = max(width, height) / len(coordinates)
+        return size if size > 0 else 1.0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def cell_of(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _add_to_cell(self, key, cell):
+        self.cells.setdefault(cell, set()).add(key)
+        self.key_cells[key] = cell
+        if self.min_cell is None:
+            self.min_cell = cell
+            self.max_cell = cell
+        else:
+            self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+            self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+
+    def _remove_from_cell(self, key):
+        cell = self.key_cells.pop(key)
+        bucket = self.cells[cell]
+        bucket.discard(key)
+        if not bucket:
+            del self.cells[cell]
+
+    def insert(self, key, x, y):
+        if key in self.positions:
+            self.move(key, x, y)
+            return
+        self.positions[key] = (x, y)
+        self._add_to_cell(key, self.cell_of(x, y))
+
+    def remove(self, key):
+        if key in self.positions:
+            del self.positions[key]
+            self._remove_from_cell(key)
+
+    def move(self, key, x, y):
+        """Update a point's position, re-bucketing only if it changed cell"""
+        self.positions[key] = (x, y)
+        cell = self.cell_of(x, y)
+        if self.key_cells.get(key) != cell:
+            if key in self.key_cells:
+                self._remove_from_cell(key)
+            self._add_to_cell(key, cell)
+
+    def nearest(self, x, y, max_distance=None):
+        """Key of the point closest to (x, y), or None if the index is empty
+        (or nothing lies within max_distance)"""
+        if not self.positions:
+            return None
+        cx, cy = self.cell_of(x, y)
+        # Rings beyond this cover no occupied cell
+        max_ring = max(abs(cx - self.min_cell[0]), abs(cx - self.max_cell[0]),
+                       abs(cy - self.min_cell[1]), abs(cy - self.max_cell[1]))
+        if max_distance is not None:
+            max_ring = min(max_ring, int(math.ceil(max_distance / self.cell_size)) + 1)
+        best_key = None
+        best_dist = math.inf if max_distance is None else max_distance * max_distance
+
+        ring = 0
+        while ring <= max_ring:
+            for cell in self._ring_cells(cx, cy, ring):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                for key in bucket:
+                    px, py = self.positions[key]
+                    dist = (px - x)**2 + (py - y)**2
+                    if dist < best_dist:
+                        best_dist = dist
+                        best_key = key
+            # Every unvisited cell is at least ring * cell_size away
+            if best_key is not None and (ring * self.cell_size)**2 >= best_dist:
+                break
+            ring += 1
+        return best_key
+
+    def _ring_cells(self, cx, cy, ring):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
+
+    def query_box(self, min_x, min_y, max_x, max_y):
+        """Keys of all points inside the axis-aligned box (exclusive bounds)"""
+        min_cx, min_cy = self.cell_of(min_x, min_y)
+        max_cx, max_cy = self.cell_of(max_x, max_y)
+        found = []
+        # Iterate whichever is smaller: the covered cells or the occupied ones
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) <= len(self.cells):
+            cells = ((i, j) for i in range(min_cx, max_cx + 1) for j in range(min_cy, max_cy + 1))
+        else:
+            cells = (c for c in self.cells if min_cx <= c[0] <= max_cx and min_cy <= c[1] <= max_cy)
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                px, py = self.positions[key]
+                if min_x < px < max_x and min_y < py < max_y:
+                    found.append(key)
+        return found
+
+    def nearest_in_box(self, x, y, half_size):
+        """Closest key whose point lies within half_size of (x, y) on both axes"""
+        candidates = self.query_box(x - half_size, y - half_size, x + half_size, y + half_size)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda k: (self.positions[k][0] - x)**2 + (self.positions[k][1] - y)**2)
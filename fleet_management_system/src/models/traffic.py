@@ -0,0 +1,480 @@
+import math
+from collections import defaultdict
+
+from src.models.robot import Robot
+
+class ReservationTable:
+    """Time-indexed reservations of vertices and lanes.
+
+    Time is split into slots of ``slot_ticks`` ticks and every (resource, slot)
+    key maps to the robot holding it, so checking a window is a handful of dict
+    lookups. Slots that fall behind the current tick are dropped by prune().
+    """
+
+    def __init__(self, slot_ticks=1):
+        self.slot_ticks = slot_ticks
+        self.owners = {}  # (resource, slot) -> robot id
+        self.keys_by_owner = defaultdict(set)
+        self.keys_by_slot = defaultdict(list)
+        self.pruned_until = 0  # Slots below this have been dropped
+
+    def __len__(self):
+        return len(self.owners)
+
+    def _slots(self, start, end):
+        return range(start // self.slot_ticks, end // self.slot_ticks + 1)
+
+    def conflict(self, resource, start, end, owner):
+        """Robot holding resource at any tick in [start, end] other than owner, or None"""
+        owners = self.owners
+        for slot in self._slots(start, end):
+            holder = owners.get((resource, slot))
+            if holder is not None and holder != owner:
+                return holder
+        return None
+
+    def reserve(self, resource, start, end, owner):
+        """Reserve resource for ticks [start, end]; returns False (reserving nothing) on conflict"""
+        if self.conflict(resource, start, end, owner) is not None:
+            return False
+        owned = self.keys_by_owner[owner]
+        for slot in self._slots(start, end):
+            key = (resource, slot)
+            if key not in self.owners:
+                self.owners[key] = owner
+                owned.add(key)
+                self.keys_by_slot[slot].append(key)
+        return True
+
+    def release(self, owner):
+        """Drop every reservation held by owner"""
+        for key in self.keys_by_owner.pop(owner, ()):
+            if self.owners.get(key) == owner:
+                del self.owners[key]
+
+    def prune(self, now):
+        """Drop reservations for slots that ended before tick now"""
+        current = now // self.slot_ticks
+        for slot in range(self.pruned_until, current):
+            for key in self.keys_by_slot.pop(slot, ()):
+                owner = self.owners.pop(key, None)
+                if owner is not None:
+                    owned = self.keys_by_owner.get(owner)
+                    if owned is not None:
+                        owned.discard(key)
+                        if not owned:
+                            del self.keys_by_owner[owner]
+        self.pruned_until = max(self.pruned_until, current)
+
+    def restore(self, owners, pruned_until):
+        """Refill the table from a {(resource, slot): owner} mapping"""
+        self.owners = dict(owners)
+        self.keys_by_owner = defaultdict(set)
+        self.keys_by_slot = defaultdict(list)
+        for key, owner in self.owners.items():
+            self.keys_by_owner[owner].add(key)
+            self.keys_by_slot[key[1]].append(key)
+        self.pruned_until = pruned_until
+
+
+def lane_key(a, b):
+    """Lanes are undirected resources, so a head-on pair maps to the same key"""
+    return ('lane', a, b) if a < b else ('lane', b, a)
+
+def vertex_key(v):
+    return ('vertex', v)
+
+
+class RouteState:
+    """Traffic bookkeeping for one robot following a vertex route"""
+
+    __slots__ = ('robot', 'vertices', 'pos', 'granted', 'granted_arrival', 'on_lane',
+                 'blocked_by', 'wait_ticks', 'yield_index', 'yield_until')
+
+    def __init__(self, robot, vertices, now):
+        self.robot = robot
+        self.vertices = vertices
+        self.pos = 0  # Route index of the last vertex reached
+        self.granted = 0  # Route index of the furthest vertex the robot may drive to
+        self.granted_arrival = now  # Estimated tick of arrival at vertices[granted]
+        self.on_lane = False  # Holds the lock on its current vertex
+        self.blocked_by = None  # Robot id holding the resource we are waiting for
+        self.wait_ticks = 0
+        self.yield_index = 0  # After a side-step, grant no further than this index...
+        self.yield_until = now  # ...until this tick
+
+    @property
+    def stopped(self):
+        return self.pos == self.granted
+
+    @property
+    def goal(self):
+        return self.vertices[-1]
+
+
+class TrafficManager:
+    """Gates robot movement so robots never share a lane or a vertex.
+
+    Two structures back every grant: vertex locks, held from the moment a robot
+    is granted a vertex until it has driven past it (however long it ends up
+    standing there), and a time-indexed ReservationTable recording which ticks
+    each lane and vertex arrival is booked for. Robots are only handed the next
+    ``horizon`` segments of their route once both are secured. A robot that
+    cannot get its next segment waits at its vertex; with the ``reroute`` policy
+    it looks for a detour after ``reroute_after`` ticks. Cycles in the wait-for
+    graph are deadlocks and are broken by rerouting, or side-stepping, one robot
+    in the cycle; when every robot in the cycle is boxed in (a corridor full of
+    robots facing each other) the robots swap tasks instead, each one taking
+    over the remaining route of the robot that was waiting for it.
+
+    Robots waiting to start a task or idle after finishing one are parked beside
+    the lane and do not hold a lock.
+    """
+
+    POLICIES = ('wait', 'reroute')
+
+    def __init__(self, policy='reroute', horizon=2, reroute_after=20, slot_ticks=1, clearance=2,
+                 yield_ticks=10):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown traffic policy {policy!r}, expected one of {self.POLICIES}")
+        self.policy = policy
+        self.horizon = horizon
+        self.reroute_after = reroute_after
+        self.clearance = clearance  # Extra ticks a vertex arrival stays booked
+        self.yield_ticks = yield_ticks  # How long a side-stepping robot lets others pass
+        self.reservations = ReservationTable(slot_ticks)
+        self.locks = {}  # vertex -> robot id
+        self.routes = {}  # robot id -> RouteState
+        self.simulator = None
+        self.lane_ticks = {}
+        # Metrics
+        self.wait_ticks = 0
+        self.reroutes = 0
+        self.deadlocks = 0
+        self.task_swaps = 0
+        self._open_deadlocks = {}  # Cycle -> tick first seen, so each is counted once
+
+    def attach(self, simulator):
+        self.simulator = simulator
+
+    def settings(self):
+        """Constructor arguments that rebuild an identically configured manager"""
+        return {
+            'policy': self.policy,
+            'horizon': self.horizon,
+            'reroute_after': self.reroute_after,
+            'slot_ticks': self.reservations.slot_ticks,
+            'clearance': self.clearance,
+            'yield_ticks': self.yield_ticks,
+        }
+
+    def state(self):
+        """Copy of the locks, reservations, routes and metrics, for a snapshot.
+
+        The tables are copied as dicts, which is much quicker than listing
+        their items. Route vertex lists are shared rather than copied; they are
+        replaced, never changed in place.
+        """
+        return {
+            'settings': self.settings(),
+            'reservations': self.reservations.owners.copy(),
+            'pruned_until': self.reservations.pruned_until,
+            'locks': self.locks.copy(),
+            'routes': [(robot_id, route.vertices, route.pos, route.granted, route.granted_arrival,
+                        route.on_lane, route.blocked_by, route.wait_ticks, route.yield_index,
+                        route.yield_until) for robot_id, route in self.routes.items()],
+            'metrics': (self.wait_ticks, self.reroutes, self.deadlocks, self.task_swaps),
+            'open_deadlocks': [(sorted(cycle), tick) for cycle, tick in self._open_deadlocks.items()],
+        }
+
+    def restore(self, state):
+        """Take over the traffic state of a state() copy; robots are looked up by id
+        among the attached simulator's robots"""
+        robots = {robot.id: robot for robot in self.simulator.robots}
+        self.reservations.restore(state['reservations'], state['pruned_until'])
+        self.locks = dict(state['locks'])
+        self.routes = {}
+        for robot_id, vertices, *fields in state['routes']:
+            route = RouteState(robots[robot_id], list(vertices), 0)
+            (route.pos, route.granted, route.granted_arrival, route.on_lane, route.blocked_by,
+             route.wait_ticks, route.yield_index, route.yield_until) = fields
+            self.routes[robot_id] = route
+        self.wait_ticks, self.reroutes, self.deadlocks, self.task_swaps = state['metrics']
+        self._open_deadlocks = {frozenset(cycle): tick for cycle, tick in state['open_deadlocks']}
+
+    def segment_ticks(self, a, b):
+        """Ticks needed to drive lane a-b, cached per lane"""
+        key = (a, b) if a < b else (b, a)
+        ticks = self.lane_ticks.get(key)
+        if ticks is None:
+            positions = self.simulator.vertex_positions
+            (ax, ay), (bx, by) = positions[a], positions[b]
+            speed = self.simulator.robot_speed or Robot.DEFAULT_SPEED
+            per_tick = speed * self.simulator.tick_interval
+            ticks = max(1, math.ceil(math.hypot(ax - bx, ay - by) / per_tick))
+            self.lane_ticks[key] = ticks
+        return ticks
+
+    def add_route(self, robot, vertices):
+        """Take over a robot that has been given a multi-vertex route"""
+        self.remove_robot(robot)
+        route = RouteState(robot, list(vertices), self.simulator.tick_count)
+        self.routes[robot.id] = route
+        self._hold(route)
+
+    def remove_robot(self, robot):
+        route = self.routes.pop(robot.id, None)
+        if route is not None:
+            self._release_all(route)
+
+    def _release_all(self, route):
+        owner = route.robot.id
+        for vertex in set(route.vertices[route.pos:route.granted + 1]):
+            if self.locks.get(vertex) == owner:
+                del self.locks[vertex]
+        self.reservations.release(owner)
+        route.on_lane = False
+
+    def _hold(self, route):
+        """Stop the robot at its current vertex until a segment is granted"""
+        robot = route.robot
+        if robot.status != Robot.STATUS_WAITING:
+            robot.previous_status = robot.status
+            robot.status = Robot.STATUS_WAITING
+        robot.wait_time = self.simulator.tick_interval  # Re-armed every tick while held
+        robot.fleet.set_path(robot.slot, [])
+
+    def _lock_holder(self, vertex, owner):
+        holder = self.locks.get(vertex)
+        return holder if holder != owner else None
+
+    def _try_extend(self, route, now):
+        """Secure as many of the next ``horizon`` segments as are free; returns how many"""
+        owner = route.robot.id
+        table = self.reservations
+        if not route.on_lane:
+            # Entering the lane network: the start vertex must be free first
+            start = route.vertices[route.pos]
+            holder = self._lock_holder(start, owner) or table.conflict(vertex_key(start), now, now + 1, owner)
+            if holder is not None:
+                route.blocked_by = holder
+                return 0
+
+        extended = 0
+        while route.granted < len(route.vertices) - 1 and route.granted - route.pos < self.horizon:
+            if route.granted >= route.yield_index and now < route.yield_until:
+                break
+            a = route.vertices[route.granted]
+            b = route.vertices[route.granted + 1]
+            depart = max(route.granted_arrival, now)
+            arrive = depart + self.segment_ticks(a, b)
+
+            holder = (self._lock_holder(b, owner)
+                      or table.conflict(lane_key(a, b), depart, arrive, owner)
+                      or table.conflict(vertex_key(b), arrive - 1, arrive + self.clearance, owner))
+            if holder is not None:
+                route.blocked_by = holder
+                break
+
+            if not route.on_lane:
+                self.locks[route.vertices[route.pos]] = owner
+                route.on_lane = True
+            self.locks[b] = owner
+            table.reserve(lane_key(a, b), depart, arrive, owner)
+            table.reserve(vertex_key(b), arrive - 1, arrive + self.clearance, owner)
+            route.granted += 1
+            route.granted_arrival = arrive
+            extended += 1
+        return extended
+
+    def _hand_out_path(self, route):
+        """Give the fleet the waypoints from the robot's last vertex up to the granted one"""
+        robot = route.robot
+        positions = self.simulator.vertex_positions
+        points = [positions[v] for v in route.vertices[route.pos + 1:route.granted + 1]]
+        robot.fleet.set_path(robot.slot, points)
+        if robot.status != Robot.STATUS_MOVING:
+            robot.previous_status = robot.status
+            robot.status = Robot.STATUS_MOVING
+
+    def before_step(self, now):
+        """Grant reservations and start or hold robots ahead of the fleet step"""
+        self.reservations.prune(now)
+        for route in list(self.routes.values()):
+            was_stopped = route.stopped
+            if self._try_extend(route, now):
+                route.blocked_by = None
+                route.wait_ticks = 0
+                self._hand_out_path(route)
+            elif was_stopped:
+                route.wait_ticks += 1
+                self.wait_ticks += 1
+                route.robot.wait_time = self.simulator.tick_interval
+                if self.policy == 'reroute' and route.wait_ticks >= self.reroute_after:
+                    self._reroute(route, now)
+        self._break_deadlocks(now)
+
+    def after_step(self, completed):
+        """Track route progress; returns the completed slots that really finished their task"""
+        fleet = self.simulator.fleet
+        for route in self.routes.values():
+            # The fleet path always ends at the granted vertex
+            slot = route.robot.slot
+            pos = route.granted - int(fleet.path_len[slot] - fleet.path_index[slot])
+            if pos != route.pos:
+                self._advance(route, pos)
+
+        finished = []
+        views = fleet.views
+        for slot in completed.tolist():
+            robot = views[slot]
+            route = self.routes.get(robot.id) if robot is not None else None
+            if route is None:
+                finished.append(slot)
+            elif route.pos >= len(route.vertices) - 1:
+                # Arrived: leave the lane network
+                self.routes.pop(robot.id)
+                self._release_all(route)
+                finished.append(slot)
+            else:
+                # Reached the end of what was granted, not of the route
+                robot.status = Robot.STATUS_WAITING
+                robot.previous_status = Robot.STATUS_MOVING
+                self._hold(route)
+        return finished
+
+    def _advance(self, route, pos):
+        """Release the locks on vertices the robot has driven past"""
+        owner = route.robot.id
+        ahead = set(route.vertices[pos:route.granted + 1])
+        for vertex in route.vertices[route.pos:pos]:
+            if vertex not in ahead and self.locks.get(vertex) == owner:
+                del self.locks[vertex]
+        route.pos = pos
+
+    def _blocked_vertices(self, route):
+        """Vertices locked by other robots"""
+        owner = route.robot.id
+        return {vertex for vertex, holder in self.locks.items() if holder != owner}
+
+    def _replace_route(self, route, vertices, now):
+        """Swap in a new route starting at the robot's current vertex"""
+        owner = route.robot.id
+        current = route.vertices[route.pos]
+        for vertex in set(route.vertices[route.pos:route.granted + 1]):
+            if vertex != current and self.locks.get(vertex) == owner:
+                del self.locks[vertex]
+        self.reservations.release(owner)
+        route.vertices = vertices
+        route.pos = route.granted = 0
+        route.granted_arrival = now
+        route.blocked_by = None
+        route.wait_ticks = 0
+        self._hold(route)
+
+    def _reroute(self, route, now):
+        """Plan around the vertices that are currently in the way"""
+        current = route.vertices[route.pos]
+        path = self.simulator.graph.astar(current, route.goal, blocked=self._blocked_vertices(route))
+        if not path or path == route.vertices[route.pos:]:
+            route.wait_ticks = 0  # No better detour yet, wait another round
+            return False
+        self.reroutes += 1
+        self._replace_route(route, path, now)
+        return True
+
+    def _sidestep(self, route, now):
+        """Back off to a free neighbouring vertex, then head for the goal again"""
+        graph = self.simulator.graph
+        current = route.vertices[route.pos]
+        blocked = self._blocked_vertices(route)
+        next_vertex = route.vertices[route.pos + 1] if route.pos + 1 < len(route.vertices) else None
+        for neighbor in graph.neighbors(current)[0].tolist():
+            if neighbor in blocked or neighbor == next_vertex:
+                continue
+            onward = graph.astar(neighbor, route.goal)
+            if onward:
+                self.reroutes += 1
+                self._replace_route(route, [current] + onward, now)
+                # Wait on the side vertex so the robots we were blocking can pass
+                route.yield_index = 1
+                route.yield_until = now + self.segment_ticks(current, neighbor) + self.yield_ticks
+                return True
+        return False
+
+    def _break_deadlocks(self, now):
+        """Find cycles of robots waiting on each other and make one of them give way"""
+        waits_for = {
+            robot_id: route.blocked_by
+            for robot_id, route in self.routes.items()
+            if route.stopped and route.on_lane and route.blocked_by is not None
+        }
+        visited = set()
+        cycles = {}
+        for start in waits_for:
+            if start in visited:
+                continue
+            chain = []
+            on_chain = set()
+            current = start
+            while current in waits_for and current not in visited:
+                visited.add(current)
+                chain.append(current)
+                on_chain.add(current)
+                current = waits_for[current]
+                if current in on_chain:
+                    ordered = chain[chain.index(current):]
+                    cycle = frozenset(ordered)
+                    first_seen = self._open_deadlocks.get(cycle)
+                    if first_seen is None:
+                        self.deadlocks += 1
+                        first_seen = now
+                    cycles[cycle] = first_seen
+                    # A cycle nobody could leave is retried every reroute_after ticks
+                    if (now - first_seen) % self.reroute_after == 0:
+                        # Robots in higher fleet slots give way first
+                        for victim in sorted((self.routes[rid] for rid in cycle), key=lambda r: -r.robot.slot):
+                            if self._reroute(victim, now) or self._sidestep(victim, now):
+                                break
+                        else:
+                            self._rotate_tasks(ordered, now)
+                    break
+        self._open_deadlocks = cycles
+
+    def _rotate_tasks(self, ordered, now):
+        """Resolve a cycle by handing each robot the rest of its waiter's route.
+
+        ``ordered[i]`` waits for ``ordered[i + 1]``, which stands on the next
+        vertex of ``ordered[i]``'s route, so it can simply carry on along it.
+        Robots are interchangeable, so the tasks still get done.
+        """
+        routes = [self.routes[rid] for rid in ordered]
+        handovers = []
+        for waiter, holder in zip(routes, routes[1:] + routes[:1]):
+            suffix = waiter.vertices[waiter.pos + 1:]
+            if not suffix or suffix[0] != holder.vertices[holder.pos]:
+                return False  # Blocked by a timed reservation rather than a robot in place
+            handovers.append((holder, suffix, waiter.robot.destination_vertex))
+
+        pairs = [(waiter.robot, holder.robot) for waiter, holder in zip(routes, routes[1:] + routes[:1])]
+        if self.simulator.dispatcher is not None:
+            self.simulator.dispatcher.hand_over(pairs)
+        if self.simulator.charging is not None:
+            self.simulator.charging.hand_over(pairs)
+
+        for holder, suffix, destination in handovers:
+            robot = holder.robot
+            robot.destination_vertex = destination
+            robot.original_path_length = len(suffix) - 1
+            if len(suffix) == 1:
+                # Already standing on the goal: finish on the next step
+                self.routes.pop(robot.id)
+                self._release_all(holder)
+                robot.fleet.set_path(robot.slot, [self.simulator.vertex_positions[suffix[0]]])
+                robot.previous_status = robot.status
+                robot.status = Robot.STATUS_MOVING
+            else:
+                self._replace_route(holder, suffix, now)
+        self.task_swaps += 1
+        return True
+
@@ -0,0 +1,76 @@
+import sys
+import os
+import argparse
+import json
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.models.scenarios import load_scenario, run_sweep, summarize, write_results
+
+def parse_grid(args):
+    """Parameter grid from --grid-file and repeated --set key=v1,v2 options"""
+    grid = {}
+    if args.grid_file:
+        with open(args.grid_file, 'r') as file:
+            grid.update(json.load(file))
+    for item in args.set or []:
+        key, _, values = item.partition("=")
+        if not values:
+            raise SystemExit(f"--set expects key=value[,value...], got {item!r}")
+        grid[key] = [parse_value(v) for v in values.split(",")]
+    return grid
+
+def parse_value(text):
+    """JSON value if it parses as one (numbers, null, lists), else the bare string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def main():
+    parser = argparse.ArgumentParser(description='Run headless fleet scenarios over a parameter grid')
+    parser.add_argument('scenario',
+                      help='Scenario spec JSON (robots, spawn, tasks, duration, traffic, ...)')
+    parser.add_argument('--graph', default=None,
+                      help='Graph file (defaults to the "graph" entry of the scenario, relative to it)')
+    parser.add_argument('--grid-file', default=None,
+                      help='JSON object mapping parameters (dotted, e.g. "tasks.rate") to lists of values')
+    parser.add_argument('--set', action='append', metavar='KEY=V1,V2',
+                      help='Add a grid axis, e.g. --set robots=10,20,40 (repeatable)')
+    parser.add_argument('--repeats', type=int, default=1,
+                      help='Runs per parameter combination, each with its own seed')
+    parser.add_argument('--seed', type=int, default=0,
+                      help='Base seed; every run derives a fixed seed from it and its parameters')
+    parser.add_argument('--jobs', type=int, default=None,
+                      help='Worker processes (defaults to the number of CPUs)')
+    parser.add_argument('--out', default='scenario_results.csv',
+                      help='Output file, .csv for one row per run or .json for runs plus summary')
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    graph_path = args.graph
+    if graph_path is None:
+        if "graph" not in scenario:
+            raise SystemExit("No graph given: pass --graph or set \"graph\" in the scenario")
+        graph_path = os.path.join(os.path.dirname(os.path.abspath(args.scenario)), scenario["graph"])
+    grid = parse_grid(args)
+
+    start = time.perf_counter()
+    rows = run_sweep(graph_path, scenario, grid, repeats=args.repeats, jobs=args.jobs, base_seed=args.seed)
+    elapsed = time.perf_counter() - start
+    summary = summarize(rows, list(grid))
+    write_results(args.out, rows, summary, scenario, grid)
+
+    print(f"{len(rows)} runs in {elapsed:.1f}s, results written to {args.out}")
+    header = list(grid) + ["tasks/min", "mean s", "p95 s", "queue s", "charging %", "backlog"]
+    print("".join(f"{h:>14}" for h in header))
+    for entry in summary:
+        values = [str(entry[k]) for k in grid] + [
+            f"{entry['throughput_per_min']:.1f}", f"{entry['completion_mean_s']:.1f}",
+            f"{entry['completion_p95_s']:.1f}", f"{entry['queue_wait_mean_s']:.1f}",
+            f"{entry['charging_lost'] * 100:.1f}", f"{entry['backlog']:.0f}"]
+        print("".join(f"{v:>14}" for v in values))
+
+if __name__ == "__main__":
+    main()